@@ -0,0 +1,57 @@
+"""
+Bulk array datatypes against per-element Long/VarInt decoding
+
+Run from the repository root with `python -m benchmarks.arrays`
+"""
+
+import random
+import timeit
+from io import BytesIO
+
+from src.packets.datatypes import Long, VarInt, PrefixedArray
+
+def bench(name, func, elements):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{name:<36} {elements / seconds / 1e6:8.2f} M elements/s")
+
+def main(count=4096, repeat=20):
+    rng = random.Random(0)
+    longs = [rng.randint(-2 ** 63, 2 ** 63 - 1) for _ in range(count)]
+    entity_ids = [rng.randrange(1, 200_000) for _ in range(count)]
+    long_data = PrefixedArray[Long].encode(longs)
+    varint_data = PrefixedArray[VarInt].encode(entity_ids)
+    assert PrefixedArray[Long].decode(long_data)[0].tolist() == longs
+    assert PrefixedArray[VarInt].decode(varint_data)[0] == entity_ids
+
+    def long_deserialize_loop():
+        stream = BytesIO(long_data)
+        length = VarInt.deserialize(stream).value
+        return [Long.deserialize(stream).value for _ in range(length)]
+
+    def long_decode_loop():
+        length, offset = VarInt.decode(long_data)
+        values = []
+        for _ in range(length):
+            value, offset = Long.decode(long_data, offset)
+            values.append(value)
+        return values
+
+    def varint_deserialize_loop():
+        stream = BytesIO(varint_data)
+        length = VarInt.deserialize(stream).value
+        return [VarInt.deserialize(stream).value for _ in range(length)]
+
+    elements = count * repeat
+    print(f"{count} Longs")
+    bench("Long.deserialize loop", lambda: [long_deserialize_loop() for _ in range(repeat)], elements)
+    bench("Long.decode loop", lambda: [long_decode_loop() for _ in range(repeat)], elements)
+    bench("PrefixedArray[Long].decode", lambda: [PrefixedArray[Long].decode(long_data) for _ in range(repeat)], elements)
+    bench("Long(value).serialize loop", lambda: [b"".join([Long(v).serialize() for v in longs]) for _ in range(repeat)], elements)
+    bench("PrefixedArray[Long].encode", lambda: [PrefixedArray[Long].encode(longs) for _ in range(repeat)], elements)
+    print(f"{count} VarInt entity ids")
+    bench("VarInt.deserialize loop", lambda: [varint_deserialize_loop() for _ in range(repeat)], elements)
+    bench("PrefixedArray[VarInt].decode", lambda: [PrefixedArray[VarInt].decode(varint_data) for _ in range(repeat)], elements)
+    bench("PrefixedArray[VarInt].encode", lambda: [PrefixedArray[VarInt].encode(entity_ids) for _ in range(repeat)], elements)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Hundreds of AsyncClient connections against a loopback server on one event loop
+
+Run from the repository root with `python -m benchmarks.async_client`
+"""
+
+import asyncio
+import time
+
+from src.auth.profile import Profile
+from src.client import AsyncClient
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+from src.packets.handshaking import Handshake
+from src.packets.login import LoginStart, LoginSuccess
+from src.packets.play import ClientboundKeepAlive, ServerboundKeepAlive
+
+class LoopbackServer(asyncio.Protocol):
+    """
+    Accepts offline logins, then sends keepalives and times the responses
+    """
+    latencies: list[float] = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.reader = FrameReader()
+        self.sent = {}
+        self.frames = 0
+
+    def data_received(self, data):
+        self.reader.feed(data)
+        for frame in self.reader.frames():
+            packet_id, offset = VarInt.decode(frame)
+            self.frames += 1
+            if self.frames == 1:
+                assert packet_id == Handshake.ID
+            elif self.frames == 2:
+                start = LoginStart.decode(frame, offset)[0]
+                self.transport.write(FrameReader.frame(LoginSuccess(start.player_uuid, start.name).serialize()))
+                asyncio.get_running_loop().create_task(self.keep_alive())
+            elif packet_id == ServerboundKeepAlive.ID:
+                keep_alive_id = ServerboundKeepAlive.decode(frame, offset)[0].keep_alive_id
+                self.latencies.append(time.perf_counter() - self.sent.pop(keep_alive_id))
+
+    async def keep_alive(self, count=5, interval=0.1):
+        for keep_alive_id in range(count):
+            await asyncio.sleep(interval)
+            if self.transport.is_closing():
+                return
+            self.sent[keep_alive_id] = time.perf_counter()
+            self.transport.write(FrameReader.frame(ClientboundKeepAlive(keep_alive_id).serialize()))
+
+async def main(connections=500):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(LoopbackServer, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    clients = [AsyncClient(Profile.offline(f"Bot{i}")) for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client.connect("127.0.0.1", port, timeout=30) for client in clients))
+    print(f"{connections} logins in {time.perf_counter() - start:.3f}s")
+
+    await asyncio.sleep(0.7)
+    latencies = sorted(LoopbackServer.latencies)
+    print(f"{len(latencies)} keepalives answered, "
+          f"p50 {latencies[len(latencies) // 2] * 1e3:.2f}ms, p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f}ms")
+
+    for client in clients:
+        client.close()
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    asyncio.run(main())
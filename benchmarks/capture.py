@@ -0,0 +1,135 @@
+"""
+Capture recording and mmap replay
+
+Records a Client session against a loopback server, then writes a large synthetic capture and replays
+it through the dispatcher, reporting throughput and peak memory.
+
+Run from the repository root with `python -m benchmarks.capture [size in MB]`
+"""
+
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.dispatch import gameplay
+from src.auth.profile import Profile
+from src.client import Client
+from src.packets.capture import CaptureReader, CaptureWriter
+from src.packets.compression import Compression
+from src.packets.datatypes import VarInt
+from src.packets.dispatch import Dispatcher
+from src.packets.frame import FrameReader
+from src.packets.login import LoginStart, LoginSuccess, SetCompression
+from src.packets.play import TeleportEntity, UpdateEntityPosition
+from src.packets.state import State
+
+THRESHOLD = 256
+
+def serve(listener: socket.socket, packets: list[bytes]):
+    """
+    Logs one client in with compression enabled, sends packets and hangs up
+    """
+    connection, _ = listener.accept()
+    reader = FrameReader()
+    received = []
+    while len(received) < 2 and reader.recv_into(connection):
+        received.extend(bytes(frame) for frame in reader.frames())
+    start = LoginStart.decode(received[1], VarInt.decode(received[1])[1])[0]
+
+    compression = Compression(THRESHOLD)
+    connection.sendall(
+        FrameReader.frame(SetCompression(THRESHOLD).serialize())
+        + FrameReader.frame(compression.compress(LoginSuccess(start.player_uuid, start.name).serialize()))
+        + b"".join([FrameReader.frame(compression.compress(packet)) for packet in packets])
+    )
+    connection.close()
+
+def record(path: str, packets: list[bytes]):
+    listener = socket.create_server(("127.0.0.1", 0))
+    server = threading.Thread(target=serve, args=(listener, packets))
+    server.start()
+
+    client = Client(Profile.offline("Bot"))
+    client.record(path)
+    client.connect("127.0.0.1", listener.getsockname()[1])
+    start = time.perf_counter()
+    received = sum(1 for _ in client.packets())
+    elapsed = time.perf_counter() - start
+    client.close()
+    server.join()
+    listener.close()
+    print(f"recorded {received} play packets in {elapsed:.2f}s ({received / elapsed:,.0f} packets/s), "
+          f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+def synthesize(path: str, size: int, packets: list[bytes]):
+    """
+    Repeats the packets until the capture is size bytes, compressed like a real session
+    """
+    compression = Compression(THRESHOLD)
+    frames = [compression.compress(packet) for packet in packets]
+    start = time.perf_counter()
+    with CaptureWriter(path) as capture:
+        timestamp = 0
+        while capture.bytes < size:
+            for frame in frames:
+                capture.write(frame, State.PLAY, True, timestamp)
+                timestamp += 50_000
+    elapsed = time.perf_counter() - start
+    print(f"wrote {capture.frames:,} frames, {capture.bytes / 1e6:.0f} MB in {elapsed:.2f}s "
+          f"({capture.bytes / elapsed / 1e6:.0f} MB/s)")
+
+def replay(path: str):
+    with CaptureReader(path) as capture:
+        start = time.perf_counter()
+        frames = 0
+        for _ in capture:
+            frames += 1
+        elapsed = time.perf_counter() - start
+        print(f"iterated {frames:,} frames in {elapsed:.2f}s ({frames / elapsed:,.0f} frames/s)")
+
+        dispatcher = Dispatcher()
+        dispatcher.register(State.PLAY, UpdateEntityPosition, lambda packet: packet.entity_id)
+        dispatcher.register(State.PLAY, TeleportEntity, lambda packet: packet.x)
+        dispatch = dispatcher.dispatch
+        start = time.perf_counter()
+        for state, data in capture.packets():
+            dispatch(state, data)
+        elapsed = time.perf_counter() - start
+        print(f"inflated and dispatched {frames:,} frames in {elapsed:.2f}s ({frames / elapsed:,.0f} frames/s)")
+
+        start = time.perf_counter()
+        paced = sum(1 for _ in zip(range(2000), capture.replay()))
+        print(f"paced replay of {paced} frames recorded 50us apart took {time.perf_counter() - start:.3f}s")
+
+def anonymous_memory() -> str:
+    """
+    Memory not backed by a file, which is what loading the capture would show up in
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("RssAnon:"):
+                    return line.split(":")[1].strip()
+    except OSError:
+        pass
+    return "unknown"
+
+def main(size_mb=512):
+    packets = gameplay(20_000)
+    with tempfile.TemporaryDirectory() as directory:
+        recorded = os.path.join(directory, "recorded.sscap")
+        record(recorded, packets)
+        replay(recorded)
+
+        synthetic = os.path.join(directory, "synthetic.sscap")
+        synthesize(synthetic, size_mb * 1_000_000, packets)
+        replay(synthetic)
+        print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB "
+              f"(mapped pages included), anonymous memory {anonymous_memory()}")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
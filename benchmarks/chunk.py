@@ -0,0 +1,81 @@
+"""
+Chunk sections decoded per second, numpy against a per-long scalar loop
+
+Run from the repository root with `python -m benchmarks.chunk`
+"""
+
+import time
+
+import numpy as np
+
+from src.packets.datatypes import BlockStates, Biomes, ChunkSection, Section, Long, VarInt
+
+def sections(count: int) -> bytes:
+    """
+    A view-distance-like mix: air above the surface, 4-8 bit terrain below it, some direct-palette sections
+    """
+    rng = np.random.default_rng(0)
+    out = []
+    for i in range(count):
+        kind = i % 24
+        if kind >= 12:
+            blocks = np.zeros((16, 16, 16), dtype=np.uint16)
+        elif kind == 0:
+            blocks = rng.choice(rng.choice(24000, 400, replace=False), 4096).astype(np.uint16).reshape(16, 16, 16)
+        else:
+            palette = rng.choice(24000, 6 if kind < 8 else 60, replace=False)
+            blocks = rng.choice(palette, 4096).astype(np.uint16).reshape(16, 16, 16)
+        biomes = rng.choice(rng.choice(64, 3, replace=False), 64).astype(np.uint16).reshape(4, 4, 4)
+        out.append(ChunkSection.encode(Section(int(np.count_nonzero(blocks)), blocks, biomes)))
+    return b"".join(out)
+
+def scalar_container(cls, buffer, offset):
+    bits = buffer[offset]
+    offset += 1
+    palette = None
+    if bits == 0:
+        value, offset = VarInt.decode(buffer, offset)
+        length, offset = VarInt.decode(buffer, offset)
+        return [value] * cls.ENTRIES, offset + 8 * length
+    if bits <= cls.MAX_INDIRECT:
+        palette_length, offset = VarInt.decode(buffer, offset)
+        palette, offset = VarInt.decode_many(buffer, palette_length, offset)
+        bits = max(bits, cls.MIN_INDIRECT)
+    length, offset = VarInt.decode(buffer, offset)
+    mask = (1 << bits) - 1
+    entries = []
+    for _ in range(length):
+        value, offset = Long.decode(buffer, offset)
+        for shift in range(0, 64 // bits * bits, bits):
+            entries.append(value >> shift & mask)
+    entries = entries[:cls.ENTRIES]
+    return ([palette[entry] for entry in entries] if palette else entries), offset
+
+def scalar_section(buffer, offset):
+    offset += 2
+    blocks, offset = scalar_container(BlockStates, buffer, offset)
+    biomes, offset = scalar_container(Biomes, buffer, offset)
+    return blocks, biomes, offset
+
+def main(count=2_400):
+    data = sections(count)
+
+    start = time.perf_counter()
+    decoded, end = ChunkSection.decode_many(data, count)
+    elapsed = time.perf_counter() - start
+    assert end == len(data)
+    print(f"numpy   {count / elapsed:10.0f} sections/s ({len(data) / elapsed / 1e6:.1f} MB/s)")
+
+    scalar_count = count // 10
+    start = time.perf_counter()
+    offset = 0
+    scalar = []
+    for _ in range(scalar_count):
+        blocks, biomes, offset = scalar_section(data, offset)
+        scalar.append(blocks)
+    elapsed = time.perf_counter() - start
+    print(f"scalar  {scalar_count / elapsed:10.0f} sections/s")
+    assert all(blocks == section.blocks.reshape(-1).tolist() for blocks, section in zip(scalar, decoded))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Plain codec functions against Type wrapper objects
+
+Compares the memory of a wrapper with a __dict__ and __getattr__ forwarder (what Type used to be) against the
+__slots__ Type, then decodes a stream of entity movement records by deserializing wrappers, through the Type
+classes and through the plain read_ functions.
+
+Run from the repository root with `python -m benchmarks.codec [records]`
+"""
+
+import gc
+import random
+import sys
+import timeit
+import tracemalloc
+from io import BytesIO
+
+from src.packets.datatypes import Bool, Byte, Int, Short, VarInt
+from src.packets.datatypes.codec import read_bool, read_byte, read_short, read_varint, write_bool, write_byte, write_short, write_varint
+
+class DictType:
+    """
+    The previous Type: an instance __dict__ and attribute access forwarded to the value
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def __getattr__(self, item):
+        return getattr(self.value, item)
+
+def allocated(make, count=100_000) -> float:
+    """
+    Bytes per object still held after creating count of them
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = [make(i) for i in range(count)]
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return held / count
+
+def memory():
+    legacy = DictType(1000)
+    current = Int(1000)
+    print(f"{'dict wrapper':<14} getsizeof {sys.getsizeof(legacy) + sys.getsizeof(legacy.__dict__)} B, "
+          f"{allocated(lambda i: DictType(i + 1000)):.0f} B per object held")
+    print(f"{'slots Type':<14} getsizeof {sys.getsizeof(current)} B, {allocated(lambda i: Int(i + 1000)):.0f} B per object held")
+    print(f"{'plain int':<14} getsizeof {sys.getsizeof(1000)} B, {allocated(lambda i: i + 1000):.0f} B per object held")
+
+def records(count: int) -> bytes:
+    """
+    Update Entity Position bodies: entity id, three deltas, on ground
+    """
+    rng = random.Random(0)
+    out = bytearray()
+    for _ in range(count):
+        write_varint(out, rng.randrange(1, 5000))
+        for _ in range(3):
+            write_short(out, rng.randrange(-800, 800))
+        write_byte(out, rng.randrange(-128, 128))
+        write_bool(out, rng.random() < 0.5)
+    return bytes(out)
+
+def wrappers(data: bytes, count: int) -> list:
+    stream = BytesIO(data)
+    return [(VarInt.deserialize(stream).value, Short.deserialize(stream).value, Short.deserialize(stream).value,
+             Short.deserialize(stream).value, Byte.deserialize(stream).value, Bool.deserialize(stream).value)
+            for _ in range(count)]
+
+def types(data: bytes, count: int) -> list:
+    result = []
+    offset = 0
+    for _ in range(count):
+        entity_id, offset = VarInt.decode(data, offset)
+        dx, offset = Short.decode(data, offset)
+        dy, offset = Short.decode(data, offset)
+        dz, offset = Short.decode(data, offset)
+        rotation, offset = Byte.decode(data, offset)
+        on_ground, offset = Bool.decode(data, offset)
+        result.append((entity_id, dx, dy, dz, rotation, on_ground))
+    return result
+
+def functions(data: bytes, count: int) -> list:
+    result = []
+    offset = 0
+    for _ in range(count):
+        entity_id, offset = read_varint(data, offset)
+        dx, offset = read_short(data, offset)
+        dy, offset = read_short(data, offset)
+        dz, offset = read_short(data, offset)
+        rotation, offset = read_byte(data, offset)
+        on_ground, offset = read_bool(data, offset)
+        result.append((entity_id, dx, dy, dz, rotation, on_ground))
+    return result
+
+def main(count=100_000):
+    memory()
+    data = records(count)
+    assert wrappers(data, count) == types(data, count) == functions(data, count)
+    for name, decode in (("deserialize wrappers", wrappers), ("Type.decode", types), ("read_ functions", functions)):
+        seconds = min(timeit.repeat(lambda: decode(data, count), number=1, repeat=5))
+        print(f"{name:<22} {count / seconds / 1e6:6.2f} M records/s")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""
+Event-loop latency while inflating chunk-sized frames, with and without the thread pool offload
+
+Run from the repository root with `python -m benchmarks.compression`
+"""
+
+import asyncio
+import random
+import time
+
+from src.auth.profile import Profile
+from src.client import AsyncClient
+from src.packets.compression import Compression
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+from src.packets.play import ChunkData
+from src.packets.state import State
+
+def chunk_frames(compression: Compression, count: int, size=200_000) -> list[bytes]:
+    """
+    Low-entropy payloads compress about as well as real chunk sections
+    """
+    rng = random.Random(0)
+    frames = []
+    for _ in range(count):
+        payload = VarInt.encode(ChunkData.ID) + bytes(rng.choices(range(12), k=size))
+        frames.append(FrameReader.frame(compression.compress(payload)))
+    return frames
+
+async def ticker(lags: list[float], stop: asyncio.Event, interval=0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def run(frames: list[bytes], offload_size: int, clients=4, handled=True):
+    """
+    Without a handler the frames are dropped after inflating just the packet id
+    """
+    loop = asyncio.get_running_loop()
+    bots = []
+    for i in range(clients):
+        bot = AsyncClient(Profile.offline(f"Bot{i}"), offload_size=offload_size)
+        bot.state = State.PLAY
+        bot.compression = Compression(256, offload_size=offload_size)
+        bot.closed = loop.create_future()
+        if handled:
+            bot.on(ChunkData, lambda packet: None)
+        bots.append(bot)
+
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    start = time.perf_counter()
+    for frame in frames:
+        for bot in bots:
+            bot.data_received(frame)
+        await asyncio.sleep(0)
+    while any(bot.inflating is not None for bot in bots):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+
+    lags.sort()
+    stats = bots[0].compression.stats()
+    print(f"{'handled' if handled else 'skipped'}, offload at {offload_size:>10} bytes: {elapsed:.2f}s, loop lag p50 {lags[len(lags) // 2] * 1e3:.2f}ms "
+          f"p99 {lags[int(len(lags) * 0.99)] * 1e3:.2f}ms max {lags[-1] * 1e3:.2f}ms, "
+          f"{stats['compressed_in']} compressed / {stats['raw_in']} raw bytes per client")
+
+async def main():
+    frames = chunk_frames(Compression(256), 100)
+    await run(frames, Compression.MAX_DATA_LENGTH + 1)
+    await run(frames, Compression.OFFLOAD_SIZE)
+    await run(frames, Compression.OFFLOAD_SIZE, handled=False)
+
+if __name__ == "__main__":
+    asyncio.run(main())
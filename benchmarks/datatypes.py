@@ -0,0 +1,335 @@
+"""
+Benchmark suite and regression gate for src/packets/datatypes
+
+Every datatype is encoded and decoded over values drawn like real traffic (small VarInts, coordinates near
+spawn, short strings, ...). Each case reports ops/sec, and the allocations and bytes per op still alive
+after the op (its results), measured with tracemalloc. Results are saved as JSON and compared against a
+baseline, the command exits with 1 when a case is slower or allocates more than the threshold allows.
+Regressed cases are measured again before failing, since a busy machine can slow down any single run.
+
+Run from the repository root with `python -m benchmarks.datatypes`:
+
+    python -m benchmarks.datatypes                      compare against benchmarks/baseline.json
+    python -m benchmarks.datatypes --save-baseline      record a new baseline
+    python -m benchmarks.datatypes --threshold 0.2 -k VarInt --output results.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pynbt
+
+from benchmarks.nbt import heightmaps, item
+from src.packets.datatypes import *
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+@dataclass
+class Case:
+    name: str
+    values: list
+    encode: Callable[[object], bytes]
+    decode: Callable[[bytes, int], tuple]
+
+def cases(count: int) -> list[Case]:
+    rng = random.Random(0)
+
+    def small_ints():
+        # Entity ids, lengths and enums are mostly one or two bytes, with the odd large or negative one
+        return [rng.choice((rng.randrange(128), rng.randrange(128), rng.randrange(16384), rng.randrange(-2 ** 31, 2 ** 31)))
+                for _ in range(count)]
+
+    def coordinates():
+        return [(rng.randrange(-3000, 3000), rng.randrange(-64, 320), rng.randrange(-3000, 3000)) for _ in range(count)]
+
+    def sections():
+        return [(rng.randrange(-200, 200), rng.randrange(-4, 20), rng.randrange(-200, 200)) for _ in range(count)]
+
+    def strings():
+        names = [f"Player{i}" for i in range(50)] + ["minecraft:stone", "minecraft:overworld", '{"text":"Hello"}']
+        return [rng.choice(names) if rng.random() < 0.8 else "".join(rng.choices("abcdé日本 ", k=rng.randrange(100)))
+                for _ in range(count)]
+
+    def nbt(data: bytes):
+        return [pynbt.NBTFile(name="", value=dict(NBT.decode(data)[0])) for _ in range(count)]
+
+    blocks = np.random.default_rng(0)
+    palette = blocks.choice(24000, 6, replace=False)
+
+    simple = [
+        (Bool, lambda: [rng.random() < 0.5 for _ in range(count)]),
+        (Byte, lambda: [rng.randrange(-128, 128) for _ in range(count)]),
+        (UByte, lambda: [rng.randrange(256) for _ in range(count)]),
+        (Short, lambda: [rng.randrange(-800, 800) for _ in range(count)]),
+        (UShort, lambda: [rng.choice((25565, 25566, 8080)) for _ in range(count)]),
+        (Int, lambda: [rng.randrange(-30_000_000, 30_000_000) for _ in range(count)]),
+        (Long, lambda: [rng.getrandbits(63) - 2 ** 62 for _ in range(count)]),
+        (Float, lambda: [float(np.float32(rng.uniform(-180, 180))) for _ in range(count)]),
+        (Double, lambda: [rng.uniform(-3000, 3000) for _ in range(count)]),
+    ]
+    result = [Case(datatype.__name__, values(), datatype.encode, datatype.decode) for datatype, values in simple]
+
+    fixed_point = FixedPoint(Int)
+    result += [
+        Case("VarInt", small_ints(), VarInt.encode, VarInt.decode),
+        Case("VarLong", [value * rng.choice((1, 2 ** 20)) for value in small_ints()], VarLong.encode, VarLong.decode),
+        Case("Position", coordinates(), Position.encode, Position.decode),
+        Case("SectionPosition", sections(), SectionPosition.encode, SectionPosition.decode),
+        Case("Angle", [rng.randrange(256) * 360 / 256 for _ in range(count)], Angle.encode, Angle.decode),
+        Case("String", strings(), String.encode, String.decode),
+        Case("Identifier", [rng.choice(("minecraft:stone", "minecraft:oak_log", "minecraft:overworld", "c:ingots"))
+                            for _ in range(count)], Identifier.encode, Identifier.decode),
+        Case("ByteArray", [rng.randbytes(rng.randrange(64)) for _ in range(count)], ByteArray.encode, ByteArray.decode),
+        Case("UUID", [uuid.UUID(int=rng.getrandbits(128)) for _ in range(count)], UUID.encode, UUID.decode),
+        Case("FixedPoint", [rng.randrange(-3000 * 32, 3000 * 32) / 32 for _ in range(count)],
+             lambda value: fixed_point.set_value(value).serialize(), fixed_point.decode),
+        Case("NBT", nbt(item()), NBT.encode, NBT.decode),
+        Case("LazyNBT", [LazyNBT.decode(heightmaps())[0]] * count, LazyNBT.encode, LazyNBT.decode),
+        Case("PrefixedArray[Long]", [[rng.getrandbits(63) for _ in range(37)] for _ in range(count // 10)],
+             PrefixedArray[Long].encode, PrefixedArray[Long].decode),
+        Case("PrefixedArray[VarInt]", [small_ints()[:rng.randrange(1, 16)] for _ in range(count // 10)],
+             PrefixedArray[VarInt].encode, PrefixedArray[VarInt].decode),
+        Case("SectionBlocks", [
+            (blocks.integers(0, 24000, n), blocks.integers(0, 16, (n, 3))) for n in (blocks.integers(1, 64, count // 10))
+        ], SectionBlocks.encode, SectionBlocks.decode),
+        Case("BlockStates", [
+            palette[blocks.integers(0, 6, 4096)].astype(np.uint16).reshape(16, 16, 16) for _ in range(count // 100)
+        ], BlockStates.encode, BlockStates.decode),
+    ]
+    return result
+
+# Encodings from the protocol documentation
+KNOWN = {
+    VarInt: [(0, "00"), (1, "01"), (127, "7f"), (128, "8001"), (255, "ff01"), (25565, "dd c7 01"),
+             (2097151, "ff ff 7f"), (2147483647, "ff ff ff ff 07"), (-1, "ff ff ff ff 0f"), (-2147483648, "80 80 80 80 08")],
+    VarLong: [(0, "00"), (127, "7f"), (128, "80 01"), (2147483647, "ff ff ff ff 07"),
+              (9223372036854775807, "ff ff ff ff ff ff ff ff 7f"), (-1, "ff ff ff ff ff ff ff ff ff 01"),
+              (-2147483648, "80 80 80 80 f8 ff ff ff ff 01"), (-9223372036854775808, "80 80 80 80 80 80 80 80 80 01")],
+}
+
+def check_known():
+    for datatype, vectors in KNOWN.items():
+        for value, expected in vectors:
+            expected = bytes.fromhex(expected)
+            if datatype.encode(value) != expected or datatype.decode(expected) != (value, len(expected)):
+                raise AssertionError(f"{datatype.__name__} {value} should be {expected.hex(' ')}")
+
+def same(a: bytes, b: bytes) -> bool:
+    return bytes(a) == bytes(b)
+
+def check(case: Case):
+    """
+    Encoding what was decoded gives the same bytes, so the timed functions are doing real work
+    """
+    for value in case.values[:100]:
+        encoded = case.encode(value)
+        decoded, offset = case.decode(encoded, 0)
+        if offset != len(encoded) or not same(case.encode(decoded), encoded):
+            raise AssertionError(f"{case.name} does not round trip {value!r}")
+
+def calibrate(function, items: list, window: float) -> int:
+    """
+    Number of passes over items that take about window seconds
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(items)
+        if time.perf_counter() - start >= window / 2 or loops >= 1 << 16:
+            return loops
+        loops *= 2
+
+def ops_per_second(function, items: list, repeat: int, budget: float) -> float:
+    """
+    Best rate over repeat short windows taking about budget seconds in total, with the garbage collector off
+
+    Many short windows ride out the bursts of a busy machine better than a few long ones.
+    """
+    loops = calibrate(function, items, budget / repeat)
+    best = float("inf")
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                function(items)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return loops * len(items) / best
+
+def allocations(function, items: list) -> tuple[float, float]:
+    """
+    Blocks and bytes per op still allocated after it, the results are kept so they count
+
+    Objects reused from the interpreter's free lists are not seen by tracemalloc, so the lists are filled by
+    a warm-up pass and enough ops run that the reused ones hardly change the average.
+    """
+    items = items * -(-(10_000 if len(items) >= 100 else 1000) // len(items))
+    results = [None] * len(items)
+    function(items, results)
+    results = [None] * len(items)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        function(items, results)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    statistics = after.filter_traces(filters).compare_to(before.filter_traces(filters), "filename")
+    count = sum(statistic.count_diff for statistic in statistics)
+    size = sum(statistic.size_diff for statistic in statistics)
+    return max(count, 0) / len(items), max(size, 0) / len(items)
+
+def measure(case: Case, repeat: int, budget: float) -> dict:
+    encode = case.encode
+    decode = case.decode
+    encoded = [encode(value) for value in case.values]
+
+    def encode_all(values, results=None):
+        if results is None:
+            for value in values:
+                encode(value)
+        else:
+            for i, value in enumerate(values):
+                results[i] = encode(value)
+
+    def decode_all(buffers, results=None):
+        if results is None:
+            for buffer in buffers:
+                decode(buffer, 0)
+        else:
+            for i, buffer in enumerate(buffers):
+                results[i] = decode(buffer, 0)
+
+    result = {}
+    for direction, function, items in (("encode", encode_all, case.values), ("decode", decode_all, encoded)):
+        count, size = allocations(function, items)
+        result[direction] = {
+            "ops": ops_per_second(function, items, repeat, budget),
+            "allocations": count,
+            "bytes": size,
+        }
+    return result
+
+def run(selected, count: int, repeat: int, budget: float, exact=False) -> dict:
+    """
+    Runs the cases whose name contains one of selected (or equals one if exact), every case if there are none
+    """
+    check_known()
+    results = {}
+    for case in cases(count):
+        if exact and case.name not in selected:
+            continue
+        if selected and not any(name.lower() in case.name.lower() for name in selected):
+            continue
+        check(case)
+        results[case.name] = measure(case, repeat, budget)
+        encode = results[case.name]["encode"]
+        decode = results[case.name]["decode"]
+        print(f"{case.name:<24} encode {encode['ops'] / 1e3:9.1f} kops/s {encode['allocations']:6.2f} allocs {encode['bytes']:8.1f} B"
+              f"   decode {decode['ops'] / 1e3:9.1f} kops/s {decode['allocations']:6.2f} allocs {decode['bytes']:8.1f} B")
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+def merge(results: dict, retried: dict):
+    """
+    Keeps the best of both runs per case, a real regression shows up in every run
+    """
+    for name, directions in retried["results"].items():
+        for direction, current in directions.items():
+            previous = results["results"][name][direction]
+            previous["ops"] = max(previous["ops"], current["ops"])
+            previous["allocations"] = min(previous["allocations"], current["allocations"])
+            previous["bytes"] = min(previous["bytes"], current["bytes"])
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict[str, list[str]]:
+    """
+    Cases that got slower than (1 - threshold) times the baseline, or allocate more than (1 + threshold) times it
+    """
+    regressions = {}
+    for name, directions in results["results"].items():
+        for direction, current in directions.items():
+            previous = baseline["results"].get(name, {}).get(direction)
+            if previous is None:
+                continue
+            if current["ops"] < previous["ops"] * (1 - threshold):
+                regressions.setdefault(name, []).append(
+                    f"{name} {direction}: {current['ops'] / 1e3:.1f} kops/s, baseline {previous['ops'] / 1e3:.1f} kops/s "
+                    f"({current['ops'] / previous['ops'] - 1:+.0%})"
+                )
+            for key, slack in (("allocations", 0.05), ("bytes", 1)):
+                # A little absolute slack, so noise on values near zero does not fail the gate
+                if current[key] > previous[key] * (1 + threshold) + slack:
+                    regressions.setdefault(name, []).append(
+                        f"{name} {direction}: {current[key]:.2f} {key} per op, baseline {previous[key]:.2f}"
+                    )
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.datatypes", description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="selected", action="append", default=[], help="only run cases containing this name")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.3, help="allowed fractional regression (default 0.3)")
+    parser.add_argument("--count", type=int, default=2000, help="values per case")
+    parser.add_argument("--repeat", type=int, default=25, help="timing windows per case and direction")
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds per case and direction")
+    parser.add_argument("--retries", type=int, default=2, help="times to re-measure regressed cases before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args.selected, args.count, args.repeat, args.budget)
+    if args.save_baseline:
+        if args.output:
+            args.output.write_text(json.dumps(results, indent=2))
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    try:
+        baseline = json.loads(args.baseline.read_text())
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        return 0
+    if (baseline.get("python"), baseline.get("machine")) != (results["python"], results["machine"]):
+        print(f"Baseline is from Python {baseline.get('python')} on {baseline.get('machine')}, numbers may not compare")
+
+    regressions = compare(results, baseline, args.threshold)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        print(f"Re-measuring {', '.join(regressions)}")
+        merge(results, run(list(regressions), args.count, args.repeat, args.budget, exact=True))
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    failures = [failure for failures in regressions.values() for failure in failures]
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print(f"{len(failures)} regressions against {args.baseline} at a {args.threshold:.0%} threshold")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
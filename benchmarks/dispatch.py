@@ -0,0 +1,94 @@
+"""
+Dispatch of a gameplay-like packet stream: decoding everything versus the dispatch table
+
+The stream mimics a busy server, mostly entity movement with some chunks, block updates and chat.
+
+Run from the repository root with `python -m benchmarks.dispatch`
+"""
+
+import random
+import time
+import uuid
+
+import numpy as np
+
+from src.packets.datatypes import LazyNBT, VarInt
+from src.packets.dispatch import Dispatcher
+from src.packets.play import *
+from src.packets.state import State
+
+def gameplay(count=100_000, seed=0) -> list[bytes]:
+    """
+    Packet id and data of count packets
+    """
+    rng = random.Random(seed)
+    heightmaps = LazyNBT.decode(b"\x0a\x00\x00\x0c\x00\x0fMOTION_BLOCKING\x00\x00\x00\x25" + bytes(37 * 8) + b"\x00")[0]
+    chunk = bytes(rng.choices(range(16), k=12_000))
+    makers = [
+        (40, lambda: UpdateEntityPosition(rng.randrange(1000), rng.randrange(-99, 99), 0, rng.randrange(-99, 99), True)),
+        (20, lambda: UpdateEntityPositionAndRotation(rng.randrange(1000), 10, -5, 3, 90.0, 0.0, False)),
+        (10, lambda: UpdateEntityRotation(rng.randrange(1000), 45.0, 0.0, True)),
+        (10, lambda: SetHeadRotation(rng.randrange(1000), 180.0)),
+        (8, lambda: SetEntityVelocity(rng.randrange(1000), 0, -100, 0)),
+        (3, lambda: TeleportEntity(rng.randrange(1000), 1.5, 64.0, -3.5, 0.0, 0.0, True)),
+        (3, lambda: BlockUpdate((rng.randrange(-500, 500), rng.randrange(-64, 320), rng.randrange(-500, 500)), 1)),
+        (2, lambda: SpawnEntity(rng.randrange(1000), uuid.uuid4(), 5, 0.0, 64.0, 0.0, 0.0, 0.0, 0.0, 0, 0, 0, 0)),
+        (2, lambda: RemoveEntities(np.arange(rng.randrange(1, 8), dtype=np.int32))),
+        (1, lambda: SystemChat('{"text":"hello"}', False)),
+        (1, lambda: ChunkData(rng.randrange(-20, 20), rng.randrange(-20, 20), heightmaps, chunk)),
+    ]
+    weights = [weight for weight, _ in makers]
+    return [maker().serialize() for (_, maker) in rng.choices(makers, weights, k=count)]
+
+def eager(frames: list[bytes]):
+    """
+    Every packet the client knows is decoded, as when handlers were looked up after decoding
+    """
+    types = {packet_type.ID: packet_type for packet_type in (
+        UpdateEntityPosition, UpdateEntityPositionAndRotation, UpdateEntityRotation, SetHeadRotation,
+        SetEntityVelocity, TeleportEntity, BlockUpdate, SpawnEntity, RemoveEntities, SystemChat, ChunkData,
+    )}
+    for frame in frames:
+        packet_id, offset = VarInt.decode(frame)
+        types[packet_id].decode(frame, offset)
+
+def table(frames: list[bytes], dispatcher: Dispatcher):
+    dispatch = dispatcher.dispatch
+    for frame in frames:
+        dispatch(State.PLAY, frame)
+
+def timed(name: str, function, frames: list[bytes], *args, repeat=3):
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(frames, *args)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{name:<44} {len(frames) / elapsed:>12,.0f} packets/s")
+
+def main():
+    frames = gameplay()
+
+    timed("decode everything", eager, frames)
+
+    dispatcher = Dispatcher()
+    dispatcher.register(State.PLAY, SystemChat, lambda packet: None)
+    dispatcher.register(State.PLAY, TeleportEntity, lambda packet: None)
+    timed("table, 2 handlers, fields unread", table, frames, dispatcher)
+
+    dispatcher = Dispatcher()
+    dispatcher.register(State.PLAY, SystemChat, lambda packet: packet.content)
+    dispatcher.register(State.PLAY, TeleportEntity, lambda packet: packet.entity_id)
+    timed("table, 2 handlers, fields read", table, frames, dispatcher)
+
+    tracked = Dispatcher()
+    for packet_type in (UpdateEntityPosition, UpdateEntityPositionAndRotation, TeleportEntity, SpawnEntity, RemoveEntities):
+        tracked.register(State.PLAY, packet_type, lambda packet: packet.entity_id if packet.packet_type is not RemoveEntities else None)
+    timed("table, entity tracking handlers", table, frames, tracked)
+
+    stats = tracked.stats()
+    for name in ("skipped", "dispatched", "decoded"):
+        counts = stats[name].get("PLAY", {})
+        print(f"{name:>10}: {sum(counts.values()):>7} " + " ".join(f"0x{packet_id:02X}={count}" for packet_id, count in sorted(counts.items())))
+
+if __name__ == "__main__":
+    main()
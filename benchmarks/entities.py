@@ -0,0 +1,155 @@
+"""
+The entity tracker under a crowded server's movement traffic
+
+Spawns thousands of entities spread over a view distance, then replays a stream of relative moves, rotations,
+velocities, teleports, spawns and removals through the dispatch table into the tracker. Reports updates per
+second with and without decoding, what a flush costs, and radius and nearest queries against scanning every
+entity.
+
+Run from the repository root with `python -m benchmarks.entities [entities] [packets]`
+"""
+
+import random
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from src.packets.dispatch import Dispatcher
+from src.packets.packet import Packet
+from src.packets.play import *
+from src.packets.state import State
+from src.world import EntityTracker
+
+TYPES = (EntityTracker.PLAYER, 5, 12, 57, 95, 108)
+SPAN = 512
+
+class Handlers:
+    """
+    Registers what attach() asks for in a bare dispatcher, as a client would
+    """
+    def __init__(self, dispatcher: Dispatcher):
+        self.dispatcher = dispatcher
+
+    def on(self, packet_type, callback, lazy=True):
+        self.dispatcher.register(State.PLAY, packet_type, callback, lazy)
+
+def spawn(entity_id: int, rng: random.Random) -> SpawnEntity:
+    return SpawnEntity(entity_id, uuid.UUID(int=entity_id), rng.choice(TYPES), rng.uniform(-SPAN, SPAN),
+                       rng.uniform(-60, 120), rng.uniform(-SPAN, SPAN), 0.0, 0.0, 0.0, 0, 0, 0, 0)
+
+def traffic(entities: int, count: int, rng: random.Random) -> list[Packet]:
+    """
+    Mostly small moves of existing entities, with a steady trickle of deaths and new spawns
+    """
+    next_id = entities
+    alive = list(range(entities))
+    makers = [
+        (45, lambda entity_id: UpdateEntityPosition(entity_id, rng.randrange(-800, 800), rng.randrange(-80, 80),
+                                                    rng.randrange(-800, 800), True)),
+        (20, lambda entity_id: UpdateEntityPositionAndRotation(entity_id, rng.randrange(-800, 800), 0,
+                                                               rng.randrange(-800, 800), 90.0, 0.0, False)),
+        (12, lambda entity_id: UpdateEntityRotation(entity_id, rng.randrange(256) * 360 / 256, 0.0, True)),
+        (10, lambda entity_id: SetHeadRotation(entity_id, 180.0)),
+        (8, lambda entity_id: SetEntityVelocity(entity_id, 0, -100, 0)),
+        (3, lambda entity_id: TeleportEntity(entity_id, rng.uniform(-SPAN, SPAN), 64.0, rng.uniform(-SPAN, SPAN), 0.0, 0.0, True)),
+    ]
+    weights = [weight for weight, _ in makers]
+    packets = []
+    for _ in range(count):
+        if rng.random() < 0.01:
+            index = rng.randrange(len(alive))
+            packets.append(RemoveEntities(np.array([alive[index]], dtype=np.int32)))
+            alive[index] = next_id
+            packets.append(spawn(next_id, rng))
+            next_id += 1
+            continue
+        maker = rng.choices(makers, weights)[0][1]
+        packets.append(maker(rng.choice(alive)))
+    return packets
+
+def replay(tracker: EntityTracker, packets: list[Packet]):
+    handlers = {
+        SpawnEntity: tracker.spawn_entity, RemoveEntities: tracker.remove_entities,
+        UpdateEntityPosition: tracker.update_position, UpdateEntityPositionAndRotation: tracker.update_position_and_rotation,
+        UpdateEntityRotation: tracker.update_rotation, SetHeadRotation: tracker.head_rotation,
+        SetEntityVelocity: tracker.entity_velocity, TeleportEntity: tracker.teleport_entity,
+    }
+    for packet in packets:
+        handlers[type(packet)](packet)
+    tracker.flush()
+
+def fresh(initial: list[Packet]) -> EntityTracker:
+    tracker = EntityTracker()
+    for packet in initial:
+        tracker.spawn_entity(packet)
+    tracker.flush()
+    return tracker
+
+def latency(function, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        function(*query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def main(entities=10_000, count=200_000):
+    rng = random.Random(0)
+    initial = [spawn(entity_id, rng) for entity_id in range(entities)]
+    packets = traffic(entities, count, rng)
+    frames = [packet.serialize() for packet in packets]
+
+    tracker = fresh(initial)
+    start = time.perf_counter()
+    replay(tracker, packets)
+    elapsed = time.perf_counter() - start
+    print(f"{entities:,} entities, {count:,} packets")
+    print(f"{'handlers only':<24} {len(packets) / elapsed:>12,.0f} updates/s")
+
+    tracker = fresh(initial)
+    dispatcher = Dispatcher()
+    tracker.attach(Handlers(dispatcher))
+    dispatch = dispatcher.dispatch
+    start = time.perf_counter()
+    for frame in frames:
+        dispatch(State.PLAY, frame)
+    tracker.flush()
+    elapsed = time.perf_counter() - start
+    print(f"{'dispatch and decode':<24} {len(frames) / elapsed:>12,.0f} updates/s")
+
+    # A tick's worth of moves, the usual amount between two queries
+    batch = [packet for packet in packets if type(packet) is UpdateEntityPosition][:2000]
+    start = time.perf_counter()
+    for _ in range(10):
+        for packet in batch:
+            tracker.update_position(packet)
+        tracker.flush()
+    print(f"flushing {len(batch)} moves takes {(time.perf_counter() - start) / 10 * 1e3:.2f} ms")
+
+    # Queries from where players are
+    players = np.flatnonzero(tracker.type == EntityTracker.PLAYER)
+    places = [tuple(tracker.position[slot].tolist()) for slot in rng.sample(players.tolist(), 200)]
+    print(f"{tracker.stats()['cells']} grid cells of {tracker.cell_size:.0f} blocks")
+
+    def scan_within(x, y, z, radius):
+        live = tracker.entity_id >= 0
+        offsets = tracker.position[live] - (x, y, z)
+        return tracker.entity_id[live][np.einsum("ij,ij->i", offsets, offsets) <= radius * radius]
+
+    def scan_nearest(x, y, z, entity_type):
+        live = np.flatnonzero(tracker.type == entity_type)
+        offsets = tracker.position[live] - (x, y, z)
+        return int(tracker.entity_id[live[np.argmin(np.einsum("ij,ij->i", offsets, offsets))]])
+
+    for radius in (8, 32, 96):
+        queries = [place + (radius,) for place in places]
+        assert all(sorted(tracker.within(*query).tolist()) == sorted(scan_within(*query).tolist()) for query in queries)
+        print(f"within {radius:>3} blocks      grid {latency(tracker.within, queries):8.1f} us, "
+              f"scan {latency(scan_within, queries):8.1f} us")
+    queries = [place + (57,) for place in places]
+    assert all(tracker.nearest(*query)[0] == scan_nearest(*query) for query in queries)
+    print(f"nearest of a type      grid {latency(tracker.nearest, queries):8.1f} us, "
+          f"scan {latency(scan_nearest, queries):8.1f} us")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
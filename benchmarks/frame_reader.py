@@ -0,0 +1,74 @@
+"""
+FrameReader throughput in MB/s
+
+Run from the repository root with `python -m benchmarks.frame_reader`
+"""
+
+import random
+import socket
+import threading
+import time
+from io import BytesIO
+
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+
+def traffic(size: int) -> bytes:
+    """
+    Mostly small packets (movement, keepalives) with the odd chunk-sized one
+    """
+    rng = random.Random(0)
+    frames = []
+    total = 0
+    while total < size:
+        length = rng.choice((8, 12, 24, 34, 60, 120)) if rng.random() < 0.98 else rng.randrange(8000, 60000)
+        frame = FrameReader.frame(rng.randbytes(length))
+        frames.append(frame)
+        total += len(frame)
+    return b"".join(frames)
+
+def report(name, size, seconds, frames):
+    print(f"{name:<32} {size / seconds / 1e6:8.1f} MB/s {frames / seconds / 1e6:6.2f} Mframes/s")
+
+def bench_bytesio(data: bytes):
+    start = time.perf_counter()
+    stream = BytesIO(data)
+    count = 0
+    while stream.tell() < len(data):
+        stream.read(VarInt.deserialize(stream).value)
+        count += 1
+    report("BytesIO read", len(data), time.perf_counter() - start, count)
+
+def bench_feed(data: bytes, chunk=65536):
+    start = time.perf_counter()
+    reader = FrameReader()
+    count = 0
+    for i in range(0, len(data), chunk):
+        reader.feed(data[i:i + chunk])
+        for _ in reader.frames():
+            count += 1
+    report(f"feed ({chunk} byte reads)", len(data), time.perf_counter() - start, count)
+
+def bench_recv_into(data: bytes):
+    server, client = socket.socketpair()
+    sender = threading.Thread(target=lambda: (server.sendall(data), server.close()))
+    start = time.perf_counter()
+    sender.start()
+    reader = FrameReader()
+    count = 0
+    while reader.recv_into(client):
+        for _ in reader.frames():
+            count += 1
+    sender.join()
+    client.close()
+    report("recv_into (socketpair)", len(data), time.perf_counter() - start, count)
+
+def main(size=64 * 1024 * 1024):
+    data = traffic(size)
+    bench_bytesio(data)
+    bench_feed(data)
+    bench_feed(data, chunk=1500)
+    bench_recv_into(data)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Import time of the package, from `python -X importtime`
+
+Every statement runs in a fresh interpreter a few times and the fastest run counts. Modules the interpreter
+loads before running any code are left out. Statements fail when they take longer than their budget, import
+one of the heavy dependencies that should only load on first use, or write anything to the working directory.
+
+Run from the repository root with `python -m benchmarks.imports [runs]`, it exits with 1 when a check fails
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from typing import NamedTuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statement and its budget in milliseconds. numpy alone is most of the datatypes budget, the array types are
+# numpy backed
+BUDGETS = {
+    "import src.packets.datatypes": 200,
+    "import src.auth": 40,
+    "import src.client": 10,
+    "from src.client import Client": 250,
+    "from src.client import AsyncClient": 300,
+}
+HEAVY = ("requests", "urllib3", "pynbt", "http.server", "webbrowser")
+
+class Entry(NamedTuple):
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+def parse(output: str) -> list[Entry]:
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append(Entry(name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+def importtime(code: str, cwd=ROOT) -> list[Entry]:
+    environment = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=environment,
+                            capture_output=True, text=True, check=True)
+    return parse(result.stderr)
+
+def measure(statement: str, startup: set[str], runs: int) -> tuple[int, list[Entry]]:
+    """
+    Total microseconds of the fastest run and its entries, without the interpreter's own startup imports
+    """
+    best = None
+    for _ in range(runs):
+        entries = [entry for entry in importtime(statement) if entry.name not in startup]
+        total = sum(entry.cumulative_us for entry in entries if entry.depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    return best
+
+def side_effects(statement: str) -> list[str]:
+    """
+    Whatever the statement leaves in an empty working directory
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        importtime(statement, cwd=directory)
+        return sorted(os.listdir(directory))
+
+def report(statement: str, budget: int, total: int, entries: list[Entry], created: list[str]) -> bool:
+    packages = Counter()
+    for entry in entries:
+        packages[entry.name.split(".")[0]] += entry.self_us
+    names = {entry.name for entry in entries}
+    heavy = [name for name in HEAVY if name in names]
+
+    ok = total <= budget * 1000 and not heavy and not created
+    print(f"{'ok  ' if ok else 'FAIL'} {statement:<38} {total / 1000:7.1f} ms of {budget:>4} ms, {len(entries):>4} modules")
+    print("       " + ", ".join(f"{package} {us / 1000:.1f} ms" for package, us in packages.most_common(5)))
+    if heavy:
+        print(f"       imports {', '.join(heavy)}")
+    if created:
+        print(f"       created {', '.join(created)} in the working directory")
+    return ok
+
+def main(runs=5):
+    startup = {entry.name for entry in importtime("pass")}
+    results = {}
+    for statement, budget in BUDGETS.items():
+        total, entries = measure(statement, startup, runs)
+        results[statement] = report(statement, budget, total, entries, side_effects(statement))
+    if not all(results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""
+Per-call cost of logging with the level disabled and enabled
+
+Run from the repository root with `python -m benchmarks.log`
+"""
+
+import pathlib
+import tempfile
+import time
+import timeit
+
+from src.log import Logger, flush, DEBUG, INFO
+
+def bench(name, func, calls):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{name:<40} {seconds / calls * 1e9:8.1f} ns/call")
+
+def main(calls=200_000):
+    directory = pathlib.Path(tempfile.mkdtemp())
+    disabled = Logger("SmoothStone.Disabled", directory=directory, level=INFO)
+    enabled = Logger("SmoothStone.Enabled", directory=directory, level=DEBUG)
+    packet = {"id": 0x2B, "entity_id": 1234, "dx": 12, "dy": 0, "dz": -5}
+
+    def baseline():
+        for _ in range(calls):
+            pass
+
+    def eager():
+        for i in range(calls):
+            disabled.debug(f"Decoded packet {i} {packet}")
+
+    def lazy_disabled():
+        for i in range(calls):
+            disabled.debug("Decoded packet %d %s", i, packet)
+
+    def lazy_enabled():
+        for i in range(calls):
+            enabled.debug("Decoded packet %d %s", i, packet)
+
+    bench("empty loop", baseline, calls)
+    bench("disabled, f-string built eagerly", eager, calls)
+    bench("disabled, lazy arguments", lazy_disabled, calls)
+    bench("enabled, caller side", lazy_enabled, calls)
+
+    start = time.perf_counter()
+    flush()
+    print(f"writer drained the backlog in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
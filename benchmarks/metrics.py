@@ -0,0 +1,90 @@
+"""
+Overhead of per-connection metrics on the receive path
+
+Replays the same gameplay stream into a Client over a socket pair and into an AsyncClient directly,
+alternating metrics on and off, and reports the best time of each.
+
+Run from the repository root with `python -m benchmarks.metrics`
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+from benchmarks.dispatch import gameplay
+from src.auth.profile import Profile
+from src.client import AsyncClient, Client
+from src.packets.compression import Compression
+from src.packets.frame import FrameReader
+from src.packets.play import TeleportEntity, UpdateEntityPosition, UpdateEntityPositionAndRotation
+from src.packets.state import State
+
+THRESHOLD = 256
+
+def stream(count: int) -> bytes:
+    compression = Compression(THRESHOLD)
+    return b"".join([FrameReader.frame(compression.compress(packet)) for packet in gameplay(count)])
+
+def handlers(client):
+    client.on(UpdateEntityPosition, lambda packet: packet.entity_id)
+    client.on(UpdateEntityPositionAndRotation, lambda packet: packet.entity_id)
+    client.on(TeleportEntity, lambda packet: packet.x)
+
+def sync_run(data: bytes, enabled: bool) -> tuple[float, Client]:
+    client = Client(Profile.offline("Bot"))
+    client.socket.close()
+    client.socket, server = socket.socketpair()
+    client.writer.socket = client.socket
+    client.state = State.PLAY
+    client.compression = Compression(THRESHOLD)
+    client.metrics.enabled = enabled
+    handlers(client)
+
+    writer = threading.Thread(target=lambda: (server.sendall(data), server.close()))
+    start = time.perf_counter()
+    writer.start()
+    client.run()
+    elapsed = time.perf_counter() - start
+    writer.join()
+    client.close()
+    return elapsed, client
+
+def async_run(data: bytes, enabled: bool, chunk=65536) -> tuple[float, AsyncClient]:
+    async def run():
+        client = AsyncClient(Profile.offline("Bot"))
+        client.state = State.PLAY
+        client.compression = Compression(THRESHOLD)
+        client.metrics.enabled = enabled
+        handlers(client)
+        start = time.perf_counter()
+        for offset in range(0, len(data), chunk):
+            client.data_received(data[offset:offset + chunk])
+        return time.perf_counter() - start, client
+    return asyncio.run(run())
+
+def compare(name: str, run, data: bytes, repeat=9):
+    best = {False: float("inf"), True: float("inf")}
+    for _ in range(repeat):
+        for enabled in (False, True):
+            elapsed, client = run(data, enabled)
+            best[enabled] = min(best[enabled], elapsed)
+    overhead = best[True] / best[False] - 1
+    print(f"{name:<12} off {best[False]:.3f}s  on {best[True]:.3f}s  overhead {overhead:+.1%}")
+    return client
+
+def main(count=100_000):
+    data = stream(count)
+    print(f"{count} packets, {len(data) / 1e6:.1f} MB compressed")
+    client = compare("Client", sync_run, data)
+    compare("AsyncClient", async_run, data)
+
+    snapshot = client.metrics.snapshot()
+    handler = client.metrics.handler
+    print(f"reads {snapshot['socket']['reads']}, blocked {snapshot['socket']['read_blocked'] * 1e3:.1f}ms, "
+          f"handler p50 <= {handler.quantile(0.5) * 1e6:.1f}us, p99 <= {handler.quantile(0.99) * 1e6:.1f}us, "
+          f"decompress p99 <= {client.metrics.decompress.quantile(0.99) * 1e6:.1f}us")
+    print(client.metrics.prometheus({"bot": "Bot"}).splitlines()[:6])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Lazy NBT against the eager pynbt path on chunk heightmaps and inventory items
+
+Run from the repository root with `python -m benchmarks.nbt`
+"""
+
+import random
+import timeit
+from io import BytesIO
+
+import pynbt
+
+from src.packets.datatypes import NBT, LazyNBT
+
+def encode(value: dict) -> bytes:
+    buffer = BytesIO()
+    pynbt.NBTFile(name="", value=value).save(buffer)
+    return buffer.getvalue()
+
+def heightmaps() -> bytes:
+    """
+    Chunk Data heightmaps: two long arrays of 37 packed 9-bit heights
+    """
+    rng = random.Random(0)
+    return encode({
+        "MOTION_BLOCKING": pynbt.TAG_Long_Array([rng.getrandbits(63) for _ in range(37)]),
+        "WORLD_SURFACE": pynbt.TAG_Long_Array([rng.getrandbits(63) for _ in range(37)]),
+    })
+
+def item() -> bytes:
+    """
+    An enchanted, renamed tool as found in Set Container Content
+    """
+    return encode({
+        "Damage": pynbt.TAG_Int(17),
+        "RepairCost": pynbt.TAG_Int(3),
+        "display": pynbt.TAG_Compound({
+            "Name": pynbt.TAG_String('{"text":"Excavator","italic":false}'),
+            "Lore": pynbt.TAG_List(pynbt.TAG_String, ['{"text":"Found in a dungeon"}', '{"text":"Soulbound"}']),
+        }),
+        "Enchantments": pynbt.TAG_List(pynbt.TAG_Compound, [
+            {"id": pynbt.TAG_String(name), "lvl": pynbt.TAG_Short(level)}
+            for name, level in (("minecraft:efficiency", 5), ("minecraft:unbreaking", 3), ("minecraft:mending", 1), ("minecraft:fortune", 3))
+        ]),
+    })
+
+def bench(name, func, ops):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{name:<32} {ops / seconds / 1e3:10.1f} kops/s")
+
+def main(count=5_000):
+    for label, data, key in (("heightmaps", heightmaps(), "MOTION_BLOCKING"), ("inventory item", item(), "Damage")):
+        expected = pynbt.NBTFile(BytesIO(data))[key].value
+        assert LazyNBT.decode(data)[0].value[key] == (list(expected) if isinstance(expected, tuple) else expected)
+        assert LazyNBT.decode(data)[0].serialize() == data
+
+        print(f"{label} ({len(data)} bytes)")
+        bench("pynbt decode", lambda: [NBT.deserialize(BytesIO(data)) for _ in range(count)], count)
+        bench("lazy skip", lambda: [LazyNBT.skip(data) for _ in range(count)], count)
+        bench("lazy decode", lambda: [LazyNBT.decode(data) for _ in range(count)], count)
+        bench("lazy decode + one key", lambda: [LazyNBT.decode(data)[0].value[key] for _ in range(count)], count)
+        bench("pynbt re-serialize", lambda: [NBT(pynbt.NBTFile(BytesIO(data))).serialize() for _ in range(count)], count)
+        bench("lazy re-serialize", lambda: [LazyNBT.decode(data)[0].serialize() for _ in range(count)], count)
+        print()
+
+if __name__ == "__main__":
+    main()
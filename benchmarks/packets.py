@@ -0,0 +1,54 @@
+"""
+Compiled packet codecs against naive per-field serialization
+
+Run from the repository root with `python -m benchmarks.packets`
+"""
+
+import timeit
+from io import BytesIO
+
+from src.packets.datatypes import Bool, Double, Float, VarInt
+from src.packets.packet import Packet
+
+class SetPlayerPositionAndRotation(Packet):
+    ID = 0x1C
+    x: Double
+    feet_y: Double
+    z: Double
+    yaw: Float
+    pitch: Float
+    on_ground: Bool
+
+NAIVE_FIELDS = SetPlayerPositionAndRotation.FIELDS
+
+def naive_serialize(packet) -> bytes:
+    data = VarInt(packet.ID).serialize()
+    for name, datatype in NAIVE_FIELDS:
+        data += datatype(getattr(packet, name)).serialize()
+    return data
+
+def naive_deserialize(stream: BytesIO) -> dict:
+    VarInt.deserialize(stream)
+    return {name: datatype.deserialize(stream).value for name, datatype in NAIVE_FIELDS}
+
+def bench(name, func, ops):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{name:<32} {ops / seconds / 1e6:8.2f} Mops/s")
+
+def main(count=20_000):
+    packet = SetPlayerPositionAndRotation(12.5, 64.0, -301.25, 90.0, 10.0, True)
+    data = packet.serialize()
+    assert data == naive_serialize(packet)
+    assert SetPlayerPositionAndRotation.decode(data, 1)[0] == packet
+
+    packets = [packet] * count
+    frames = [data] * count
+    print(f"{SetPlayerPositionAndRotation.__name__} ({len(data)} bytes)")
+    bench("naive serialize", lambda: [naive_serialize(p) for p in packets], count)
+    bench("compiled serialize", lambda: [p.serialize() for p in packets], count)
+    bench("naive deserialize", lambda: [naive_deserialize(BytesIO(f)) for f in frames], count)
+    bench("compiled deserialize", lambda: [SetPlayerPositionAndRotation.deserialize(BytesIO(f[1:])) for f in frames], count)
+    bench("compiled decode", lambda: [SetPlayerPositionAndRotation.decode(f, 1) for f in frames], count)
+
+if __name__ == "__main__":
+    main()
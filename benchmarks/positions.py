@@ -0,0 +1,41 @@
+"""
+Block positions encoded and decoded per second, scalar against batch
+
+Run from the repository root with `python -m benchmarks.positions`
+"""
+
+import timeit
+from io import BytesIO
+
+import numpy as np
+
+from src.packets.datatypes import Position, SectionBlocks
+
+def bench(name, func, positions):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{name:<32} {positions / seconds / 1e6:8.2f} M positions/s")
+
+def main(count=100_000):
+    rng = np.random.default_rng(0)
+    positions = np.column_stack((
+        rng.integers(-30_000_000, 30_000_000, count),
+        rng.integers(-64, 320, count),
+        rng.integers(-30_000_000, 30_000_000, count),
+    ))
+    tuples = [tuple(p) for p in positions.tolist()]
+    data = Position.encode_many(positions)
+
+    bench("Position(...).serialize", lambda: [Position(*p).serialize() for p in tuples], count)
+    bench("Position.encode", lambda: [Position.encode(p) for p in tuples], count)
+    bench("Position.encode_many", lambda: Position.encode_many(positions), count)
+    bench("Position.deserialize", lambda: [Position.deserialize(stream) for stream in [BytesIO(data)] for _ in range(count)], count)
+    bench("Position.decode", lambda: [Position.decode(data, offset) for offset in range(0, 8 * count, 8)], count)
+    bench("Position.decode_many", lambda: Position.decode_many(data, count), count)
+
+    states = rng.integers(0, 24000, 4096)
+    local = rng.integers(0, 16, (4096, 3))
+    blocks = SectionBlocks.encode((states, local))
+    bench("SectionBlocks.decode (4096)", lambda: [SectionBlocks.decode(blocks) for _ in range(10)], 4096 * 10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+A loopback stand-in for a Minecraft server, and the Client's end to end throughput against it
+
+FakeServer accepts offline logins, optionally enables compression, then streams play packets (synthetic
+gameplay or the play frames of a capture) in a loop at a fixed rate or as fast as the client reads, with a keep
+alive every interval whose answer it times. Frames are compressed and framed once up front, so the server
+costs little more than the writes. It runs in its own process, the Client gets the interpreter to itself.
+
+The benchmark floods a Client with each traffic source, with and without compression, then sends at a fixed
+rate to show keep alive latency when the client keeps up. When flooding, keep alives wait behind everything
+the server and the kernel have buffered, so their latency is how far behind the client has fallen. A capture
+of the synthetic run is the recorded source unless one is given.
+
+Run from the repository root with `python -m benchmarks.server [--packets 200000] [--rate 50000] [--capture file]`
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.dispatch import gameplay
+from src.auth.profile import Profile
+from src.client import Client, Histogram
+from src.packets.capture import CaptureReader
+from src.packets.compression import Compression
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+from src.packets.handshaking import Handshake
+from src.packets.login import LoginStart, LoginSuccess, SetCompression
+from src.packets.play import ClientboundKeepAlive, PlayDisconnect, ServerboundKeepAlive, UpdateEntityPosition
+from src.packets.state import State
+
+class FakeConnection(asyncio.Protocol):
+    """
+    One client: login, then the stream and keep alives until limit packets are sent
+    """
+    def __init__(self, server: "FakeServer"):
+        self.server = server
+        self.reader = FrameReader()
+        self.compression: Compression = None
+        self.state = State.HANDSHAKING
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.tasks: list[asyncio.Task] = []
+        self.sent_keep_alives: set[int] = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(self.server.high_water)
+
+    def connection_lost(self, exc):
+        self.writable.set()
+        for task in self.tasks:
+            task.cancel()
+        self.server.closed(self)
+
+    def pause_writing(self):
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+    def send(self, data: bytes):
+        if self.compression is not None:
+            data = self.compression.compress(data)
+        self.transport.write(FrameReader.frame(data))
+
+    def data_received(self, data):
+        self.reader.feed(data)
+        for frame in self.reader.frames():
+            if self.compression is not None:
+                length, offset = self.compression.split(frame)
+                frame = frame[offset:] if length == 0 else Compression.inflate(frame[offset:], length)
+            packet_id, offset = VarInt.decode(frame)
+            if self.state == State.PLAY:
+                if packet_id == ServerboundKeepAlive.ID:
+                    self.keep_alive_answered(ServerboundKeepAlive.decode(frame, offset)[0].keep_alive_id)
+            elif self.state == State.HANDSHAKING:
+                self.state = State(Handshake.decode(frame, offset)[0].next_state)
+                if self.state != State.LOGIN:
+                    self.transport.close()
+            elif packet_id == LoginStart.ID:
+                self.login(LoginStart.decode(frame, offset)[0])
+
+    def login(self, start: LoginStart):
+        threshold = self.server.threshold
+        if threshold is not None:
+            self.send(SetCompression(threshold).serialize())
+            self.compression = Compression(threshold)
+        self.send(LoginSuccess(start.player_uuid, start.name).serialize())
+        self.state = State.PLAY
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(self.stream()), loop.create_task(self.keep_alive())]
+
+    async def stream(self):
+        server = self.server
+        batches = server.batches(self.compression is not None)
+        interval = server.batch / server.rate if server.rate else 0
+        sent = 0
+        deadline = time.monotonic()
+        while sent < server.limit:
+            for batch in batches:
+                await self.writable.wait()
+                if self.transport.is_closing():
+                    return
+                self.transport.write(batch)
+                sent += server.batch
+                server.packets_sent += server.batch
+                server.bytes_sent += len(batch)
+                if interval:
+                    deadline += interval
+                    await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+                else:
+                    # Lets keep alives and reads in between writes
+                    await asyncio.sleep(0)
+                if sent >= server.limit:
+                    break
+        self.send(PlayDisconnect('{"text":"done"}').serialize())
+        # Closing with keep alive answers unread would reset the connection, the client hangs up once it has read
+        # everything
+        self.transport.write_eof()
+
+    async def keep_alive(self):
+        while True:
+            await asyncio.sleep(self.server.keep_alive)
+            keep_alive_id = time.perf_counter_ns()
+            self.sent_keep_alives.add(keep_alive_id)
+            self.send(ClientboundKeepAlive(keep_alive_id).serialize())
+
+    def keep_alive_answered(self, keep_alive_id: int):
+        if keep_alive_id in self.sent_keep_alives:
+            self.sent_keep_alives.remove(keep_alive_id)
+            self.server.keep_alive_latency.record(time.perf_counter_ns() - keep_alive_id)
+
+class FakeServer:
+    def __init__(self, packets: list[bytes], rate: float = None, threshold: int = None, keep_alive=0.1,
+                 limit=100_000, batch: int = None, high_water=1 << 20):
+        """
+        packets are packet id and data, sent in a loop until at least limit packets went to a connection. rate is
+        packets per second per connection, None sends whenever the client has read what was sent before. threshold
+        enables compression, keep_alive is the seconds between keep alives.
+        """
+        self.packets = packets
+        self.rate = rate
+        self.threshold = threshold
+        self.keep_alive = keep_alive
+        self.limit = limit
+        # Writes of a few ms of traffic at a fixed rate, the sleeps in between are then long enough to be kept
+        self.batch = batch or (max(1, min(64, int(rate / 200))) if rate else 64)
+        self.high_water = high_water
+
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.keep_alive_latency = Histogram()
+        self.connections: set[FakeConnection] = set()
+        self.served = 0
+        self._batches: dict[bool, list[bytes]] = {}
+
+    def batches(self, compressed: bool) -> list[bytes]:
+        """
+        The packets as frames, joined batch at a time, built once for all connections
+        """
+        if compressed not in self._batches:
+            compression = Compression(self.threshold) if compressed else None
+            frames = [FrameReader.frame(compression.compress(packet) if compressed else packet)
+                      for packet in self.packets]
+            # Whole batches only, the packets are repeated until they divide evenly
+            count = len(frames)
+            while count % self.batch:
+                count += len(frames)
+            frames = [frames[i % len(frames)] for i in range(count)]
+            self._batches[compressed] = [b"".join(frames[i:i + self.batch]) for i in range(0, count, self.batch)]
+        return self._batches[compressed]
+
+    def connection(self) -> FakeConnection:
+        connection = FakeConnection(self)
+        self.connections.add(connection)
+        return connection
+
+    def closed(self, connection: FakeConnection):
+        self.connections.discard(connection)
+        self.served += 1
+
+    async def serve(self, host="127.0.0.1", port=0) -> asyncio.Server:
+        self.batches(False)
+        if self.threshold is not None:
+            self.batches(True)
+        return await asyncio.get_running_loop().create_server(self.connection, host, port)
+
+    def stats(self) -> dict:
+        return {"packets": self.packets_sent, "bytes": self.bytes_sent,
+                "keep_alives": self.keep_alive_latency.count(), "keep_alive_latency": self.keep_alive_latency}
+
+    def run(self, pipe, connections=1):
+        """
+        Serves connections clients then exits, sending the port when listening and stats() at the end to pipe
+        """
+        async def serve():
+            server = await self.serve()
+            pipe.send(server.sockets[0].getsockname()[1])
+            while self.served < connections:
+                await asyncio.sleep(0.01)
+            server.close()
+            pipe.send(self.stats())
+
+        asyncio.run(serve())
+
+    def start(self, connections=1) -> tuple[int, multiprocessing.Process, object]:
+        """
+        Runs the server in a child process, returns its port, the process and the pipe stats() arrive on
+        """
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=self.run, args=(child, connections), daemon=True)
+        process.start()
+        return parent.recv(), process, parent
+
+def consume(server: FakeServer, dispatch=False, capture: str = None) -> dict:
+    """
+    Logs a Client in to the server and reads until the server hangs up
+    """
+    port, process, pipe = server.start()
+    client = Client(Profile.offline("Bot"))
+    if capture is not None:
+        client.record(capture)
+    if dispatch:
+        client.on(UpdateEntityPosition, lambda packet: packet.entity_id)
+    client.connect("127.0.0.1", port)
+    packets = 0
+    start = time.perf_counter()
+    if dispatch:
+        client.run()
+        packets = sum(client.metrics.received[State.PLAY << 8:(State.PLAY + 1) << 8])
+    else:
+        for _ in client.packets():
+            packets += 1
+    elapsed = time.perf_counter() - start
+    client.close()
+    stats = pipe.recv()
+    process.join()
+    return {"packets": packets, "bytes": client.metrics.read_bytes, "seconds": elapsed, **stats}
+
+def report(name: str, result: dict):
+    latency = result["keep_alive_latency"]
+    print(f"{name:<36} {result['packets'] / result['seconds']:>10,.0f} packets/s {result['bytes'] / result['seconds'] / 1e6:7.1f} MB/s, "
+          f"{result['keep_alives']:>3} keep alives p50 {latency.quantile(0.5) * 1e3:7.2f} ms p99 {latency.quantile(0.99) * 1e3:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Client throughput against a loopback fake server")
+    parser.add_argument("--packets", type=int, default=200_000, help="packets per run")
+    parser.add_argument("--rate", type=float, default=50_000, help="packets per second of the paced run")
+    parser.add_argument("--threshold", type=int, default=256, help="compression threshold of compressed runs")
+    parser.add_argument("--capture", help="capture whose play frames are the recorded traffic")
+    args = parser.parse_args()
+
+    synthetic = gameplay(20_000)
+    with tempfile.TemporaryDirectory() as directory:
+        recorded_path = args.capture
+        if recorded_path is None:
+            recorded_path = os.path.join(directory, "recorded.sscap")
+            result = consume(FakeServer(synthetic, limit=len(synthetic)), capture=recorded_path)
+            print(f"recorded {result['packets']:,} packets to a capture")
+        with CaptureReader(recorded_path) as capture:
+            recorded = [bytes(data) for state, data in capture.packets() if state == State.PLAY]
+
+        for source, packets in (("synthetic", synthetic), ("recorded", recorded)):
+            for threshold in (None, args.threshold):
+                server = FakeServer(packets, threshold=threshold, limit=args.packets)
+                report(f"{source}, {'compressed' if threshold is not None else 'uncompressed'}", consume(server))
+        server = FakeServer(synthetic, threshold=args.threshold, limit=args.packets)
+        report("synthetic, compressed, dispatched", consume(server, dispatch=True))
+        server = FakeServer(synthetic, rate=args.rate, threshold=args.threshold, limit=min(args.packets, int(args.rate * 2)))
+        report(f"synthetic, compressed, {args.rate:,.0f}/s", consume(server))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Server list pings of thousands of targets against fake status servers on loopback
+
+The targets mix well behaved servers, ones only reachable through an SRV record, pre 1.7 servers that only
+answer the legacy ping, and servers that misbehave: never answer, send garbage, announce a huge frame, hang up
+straight away, answer the legacy ping with text where numbers go or refuse the connection. A few targets do not
+parse and a few names get a truncated DNS answer. The fake servers and DNS server share the pinger's event loop,
+so the rate includes their work. They come from tests/test_status.py, which checks each of them on its own.
+
+Run from the repository root with `python -m benchmarks.status [targets]`
+"""
+
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from src.client.resolver import Resolver
+from src.client.status import StatusPinger
+from tests.test_status import FakeDNS, UNPARSABLE, check, start_servers
+
+def make_targets(count: int, ports: dict[str, int], srv_names=20) -> list[str]:
+    mix = (("modern", 0.66), ("srv", 0.10), ("legacy", 0.05), ("malformed", 0.02), ("slow", 0.04), ("garbage", 0.03),
+           ("huge", 0.03), ("closing", 0.03), ("refused", 0.01), ("missing", 0.01), ("truncated", 0.01),
+           ("unparsable", 0.01))
+    random.seed(1)
+    kinds = random.choices([kind for kind, _ in mix], [weight for _, weight in mix], k=count)
+    targets = []
+    for kind in kinds:
+        if kind == "srv":
+            targets.append(f"play{random.randrange(srv_names)}.server.test")
+        elif kind == "missing":
+            targets.append("missing.server.test")
+        elif kind == "truncated":
+            targets.append("truncated.server.test")
+        elif kind == "unparsable":
+            targets.append(random.choice(UNPARSABLE))
+        else:
+            targets.append(f"127.0.0.1:{ports[kind]}")
+    return targets
+
+def outcome(result) -> str:
+    if result.ok:
+        return "legacy" if result.legacy else "ok"
+    return f"{result.stage}: {result.error.split(':')[0]}"
+
+async def scan(count: int, concurrency: int, timeout: float):
+    loop = asyncio.get_running_loop()
+    ports, servers = await start_servers()
+    records = {f"_minecraft._tcp.play{i}.server.test": ("localhost", ports["modern"]) for i in range(20)}
+    dns_transport, dns = await loop.create_datagram_endpoint(lambda: FakeDNS(records), local_addr=("127.0.0.1", 0))
+    resolver = Resolver(timeout=timeout, server="127.0.0.1", server_port=dns_transport.get_extra_info("sockname")[1])
+    pinger = StatusPinger(concurrency, timeout, timeout, timeout, timeout, resolver=resolver)
+
+    outcomes = Counter()
+    latencies = []
+    start = time.perf_counter()
+    async for result in pinger.scan(make_targets(count, ports)):
+        check(result)
+        outcomes[outcome(result)] += 1
+        if result.ok:
+            latencies.append(result.latency)
+    elapsed = time.perf_counter() - start
+    assert sum(outcomes.values()) == count, outcomes
+
+    dns_transport.close()
+    for server in servers:
+        server.close()
+    latencies.sort()
+    print(f"concurrency {concurrency:>4}: {count} targets in {elapsed:6.2f}s, {count / elapsed:8,.0f} targets/s, "
+          f"latency p50 {latencies[len(latencies) // 2]:.2f}ms p99 {latencies[int(len(latencies) * 0.99)]:.2f}ms, "
+          f"{dns.queries} DNS queries, resolver {resolver.stats()}")
+    return outcomes
+
+def main(count=5000, timeout=0.5):
+    for concurrency in (32, 256, 1024):
+        outcomes = asyncio.run(scan(count, concurrency, timeout))
+    for name, number in outcomes.most_common():
+        print(f"    {name:<36} {number:>6}")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
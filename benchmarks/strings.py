@@ -0,0 +1,127 @@
+"""
+Identifier interning on identifier-heavy packets
+
+Builds Update Tags payloads (registry, then tag names each with a list of VarInt ids) and registry-like lists
+of identifiers drawn from a skewed vocabulary, then decodes them as plain Strings and as interned Identifiers.
+Reports throughput, the memory held by the decoded names and the cache hit rate.
+
+Run from the repository root with `python -m benchmarks.strings [payloads]`
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from src.packets.datatypes import Identifier, PrefixedArray, String, VarInt
+
+REGISTRIES = ["minecraft:block", "minecraft:item", "minecraft:fluid", "minecraft:entity_type", "minecraft:game_event"]
+
+def vocabulary(size=2000) -> list[str]:
+    words = ["stone", "oak", "birch", "log", "planks", "stairs", "slab", "wall", "ore", "deepslate", "copper", "glass",
+             "red", "mossy", "cut", "polished", "brick", "door", "button", "fence"]
+    rng = random.Random(0)
+    names = set()
+    while len(names) < size:
+        names.add("minecraft:" + "_".join(rng.sample(words, rng.randrange(1, 4))))
+    return sorted(names)
+
+def tags_payload(names: list[str], rng: random.Random) -> bytes:
+    """
+    Update Tags body, every registry has a few hundred tags with a handful of entries each
+    """
+    parts = [VarInt.encode(len(REGISTRIES))]
+    for registry in REGISTRIES:
+        tags = rng.sample(names, 300)
+        parts += [String.encode(registry), VarInt.encode(len(tags))]
+        for tag in tags:
+            parts += [String.encode(tag), PrefixedArray[VarInt].encode([rng.randrange(1000) for _ in range(rng.randrange(1, 8))])]
+    return b"".join(parts)
+
+def registry_payload(names: list[str], rng: random.Random, count=500) -> bytes:
+    """
+    A list of identifiers where the common ones dominate, like sounds, particles and recipe ids in play
+    """
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    return PrefixedArray[String].encode(rng.choices(names, weights, k=count))
+
+def decode_tags(buffer, name) -> list:
+    decode_ids = PrefixedArray[VarInt].decode
+    registries, offset = VarInt.decode(buffer)
+    result = []
+    for _ in range(registries):
+        registry, offset = name(buffer, offset)
+        count, offset = VarInt.decode(buffer, offset)
+        for _ in range(count):
+            tag, offset = name(buffer, offset)
+            ids, offset = decode_ids(buffer, offset)
+            result.append((registry, tag, ids))
+    return result
+
+def decode_registry(buffer, name) -> list:
+    count, offset = VarInt.decode(buffer)
+    result = []
+    for _ in range(count):
+        value, offset = name(buffer, offset)
+        result.append(value)
+    return result
+
+def measure(payloads: list[bytes], decode, name) -> tuple[float, float, list]:
+    """
+    Seconds to decode every payload and MB held by the results
+    """
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    start = time.perf_counter()
+    decoded = [decode(memoryview(payload), name) for payload in payloads]
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gc.enable()
+    return elapsed, held / 1e6, decoded
+
+def timed(payloads: list[bytes], decode, name, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payload in payloads:
+            decode(memoryview(payload), name)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def compare(label: str, payloads: list[bytes], decode, names: int):
+    Identifier.decoded.clear()
+    _, string_held, strings = measure(payloads, decode, String.decode)
+    _, interned_held, interned = measure(payloads, decode, Identifier.decode)
+    assert strings == interned
+    string_time = timed(payloads, decode, String.decode)
+    interned_time = timed(payloads, decode, Identifier.decode)
+    print(f"{label}: {names / string_time / 1e6:.2f}M names/s as String, {names / interned_time / 1e6:.2f}M as Identifier "
+          f"({string_time / interned_time - 1:+.0%}), results hold {string_held:.1f} MB vs {interned_held:.1f} MB, "
+          f"hit rate {Identifier.decoded.hit_rate():.1%}")
+
+def encode(names: list[str], count=200_000):
+    rng = random.Random(1)
+    sample = rng.choices(names, k=count)
+    for name in sample[:len(names)]:
+        Identifier.encode(name)
+    for label, encoder in (("String", String.encode), ("Identifier", Identifier.encode)):
+        start = time.perf_counter()
+        for name in sample:
+            encoder(name)
+        print(f"encode {label:<10} {count / (time.perf_counter() - start) / 1e6:.2f}M/s")
+
+def main(payloads=200):
+    names = vocabulary()
+    rng = random.Random(0)
+    tags = [tags_payload(names, rng) for _ in range(max(1, payloads // 20))]
+    registries = [registry_payload(names, rng) for _ in range(payloads)]
+    compare("update tags", tags, decode_tags, len(tags) * len(REGISTRIES) * 301)
+    compare("registry lists", registries, decode_registry, len(registries) * 500)
+    encode(names)
+    print(f"identifier caches {Identifier.stats()}")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
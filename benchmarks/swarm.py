@@ -0,0 +1,63 @@
+"""
+A bot swarm against a loopback server that streams gameplay
+
+The server runs on a thread in the parent and sends every bot a burst of play packets each tick. Reports the
+worker count, login latency, aggregate packets/s and how long stopping took.
+
+Run from the repository root with `python -m benchmarks.swarm [bots] [seconds]`
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+from benchmarks.async_client import LoopbackServer
+from benchmarks.dispatch import gameplay
+from src.auth.profile import Profile
+from src.client.swarm import Swarm, WorkerReport
+from src.packets.frame import FrameReader
+
+class GameplayServer(LoopbackServer):
+    """
+    After login, sends BURST gameplay packets every TICK seconds until the bot hangs up
+    """
+    BURST = b"".join([FrameReader.frame(packet) for packet in gameplay(200)])
+    TICK = 0.05
+
+    async def keep_alive(self, count=5, interval=0.1):
+        while not self.transport.is_closing():
+            self.transport.write(self.BURST)
+            await asyncio.sleep(self.TICK)
+
+def serve(ready: threading.Event, stop: threading.Event, address: list):
+    async def run():
+        server = await asyncio.get_running_loop().create_server(GameplayServer, "127.0.0.1", 0)
+        address.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        server.close()
+    asyncio.run(run())
+
+def main(bots=200, seconds=5.0):
+    ready, stop, address = threading.Event(), threading.Event(), []
+    server = threading.Thread(target=serve, args=(ready, stop, address), daemon=True)
+    server.start()
+    ready.wait()
+
+    swarm = Swarm([Profile.offline(f"Bot{i}") for i in range(bots)], "127.0.0.1", address[0], ramp=0.005, interval=0.5)
+
+    def progress(report: WorkerReport):
+        print(f"  worker {report.worker}: {report.connected}/{report.bots} connected, {report.packets_per_second:,.0f} packets/s")
+
+    start = time.perf_counter()
+    summary = swarm.run(seconds, progress)
+    print(f"{bots} bots on {swarm.workers} workers ran and stopped in {time.perf_counter() - start:.2f}s")
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    stop.set()
+    server.join()
+
+if __name__ == "__main__":
+    main(*(cast(arg) for cast, arg in zip((int, float), sys.argv[1:])))
@@ -0,0 +1,134 @@
+"""
+VarInt/VarLong micro-benchmark against the previous LogicalShiftNum implementation
+
+Run from the repository root with `python -m benchmarks.varint`
+"""
+
+import random
+import timeit
+from io import BytesIO
+
+from src.packets.datatypes import VarInt, VarLong
+
+class LogicalShiftNum:
+    def __init__(self, sign, mag, bits=32):
+        self.sign = sign
+        self.mag = mag
+        self.bits = bits
+
+    @classmethod
+    def from_bits(cls, num, bits=32):
+        if num >= 2 ** (bits - 1):
+            mask = 2 ** (bits - 1) - 1
+            num &= mask
+            num = 2 ** (bits - 1) - num
+            return cls(-1, num, bits)
+        elif num < 0:
+            m = 2 ** bits
+            num = m - num
+            return cls(-1, num, bits)
+        else:
+            return cls(1, num, bits)
+
+    def twos_complement(self) -> int:
+        if self.sign == -1:
+            t = 2 ** (self.bits + 1)
+            d = t - self.mag
+            d &= ~(t >> 1)
+            return d
+        else:
+            return self.mag
+
+    def __rshift__(self, digits):
+        return self.from_bits(self.twos_complement() >> digits, self.bits)
+
+class LegacyVarInt:
+    SEGMENT_BITS = 0x7F
+    CONTINUE_BIT = 0x80
+    MAX_POSITION = 5
+    BITS = 32
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def serialize(self) -> bytes:
+        value = bytes()
+        v = LogicalShiftNum.from_bits(self.value, self.BITS)
+        while True:
+            if v.twos_complement() & ~self.SEGMENT_BITS == 0:
+                value += v.twos_complement().to_bytes()
+                break
+
+            value += ((v.twos_complement() & self.SEGMENT_BITS) | self.CONTINUE_BIT).to_bytes()
+            v >>= 7
+
+        return value
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        val = LogicalShiftNum(1, 0, cls.BITS)
+        position = 0
+
+        while True:
+            current = int.from_bytes(value.read(1))
+            val = LogicalShiftNum.from_bits(val.twos_complement() | (current & cls.SEGMENT_BITS) << 7 * position, cls.BITS)
+            if not current & cls.CONTINUE_BIT:
+                break
+
+            position += 1
+            if position > cls.MAX_POSITION:
+                raise RuntimeError(f"{cls.__name__} is too big")
+
+        return cls(val.sign * val.mag)
+
+class LegacyVarLong(LegacyVarInt):
+    MAX_POSITION = 10
+    BITS = 64
+
+def sample(bits: int, count: int) -> list[int]:
+    """
+    Mostly small values, like lengths and packet ids, with a tail of large and negative ones
+    """
+    rng = random.Random(bits)
+    low, high = -2 ** (bits - 1), 2 ** (bits - 1) - 1
+    values = [low, high, -1, 0, 127, 128, 16383, 16384]
+    while len(values) < count:
+        roll = rng.random()
+        if roll < 0.6:
+            values.append(rng.randrange(0x80))
+        elif roll < 0.85:
+            values.append(rng.randrange(0x80, 0x4000))
+        else:
+            values.append(rng.randint(low, high))
+    return values
+
+def check(new, legacy, values):
+    for value in values:
+        encoded = legacy(value).serialize()
+        assert new.encode(value) == encoded, value
+        assert new.decode(encoded) == (value, len(encoded)), value
+        assert new.deserialize(BytesIO(encoded)).value == legacy.deserialize(BytesIO(encoded)).value, value
+
+def bench(name, func, ops):
+    seconds = min(timeit.repeat(func, number=1, repeat=5))
+    print(f"{name:<32} {ops / seconds / 1e6:8.2f} Mops/s")
+
+def main(count=10_000):
+    for new, legacy in ((VarInt, LegacyVarInt), (VarLong, LegacyVarLong)):
+        values = sample(new.BITS, count)
+        check(new, legacy, values)
+        encoded = new.encode_many(values)
+        streams = [new.encode(value) for value in values]
+
+        print(f"{new.__name__} ({count} values, {len(encoded)} bytes)")
+        bench("legacy serialize", lambda: [legacy(v).serialize() for v in values], count)
+        bench("serialize", lambda: [new(v).serialize() for v in values], count)
+        bench("encode", lambda: [new.encode(v) for v in values], count)
+        bench("encode_many", lambda: new.encode_many(values), count)
+        bench("legacy deserialize", lambda: [legacy.deserialize(BytesIO(s)) for s in streams], count)
+        bench("deserialize", lambda: [new.deserialize(BytesIO(s)) for s in streams], count)
+        bench("decode_many", lambda: new.decode_many(encoded, count), count)
+        print()
+
+if __name__ == "__main__":
+    main()
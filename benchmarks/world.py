@@ -0,0 +1,101 @@
+"""
+The world store over a full view distance
+
+Loads every chunk within 32 of the center from a set of pre-encoded Chunk Data payloads, then reports the load
+rate, resident memory, the store's own accounting per chunk against keeping decoded numpy sections, random
+block lookup latency, block updates and how long moving the center and evicting takes.
+
+Run from the repository root with `python -m benchmarks.world [radius] [lookups]`
+"""
+
+import gc
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.capture import anonymous_memory
+from src.packets.datatypes import ChunkSection, Section
+from src.world import World
+
+TEMPLATES = 16
+SECTIONS = 24
+
+def chunk(rng: np.random.Generator, busy: bool) -> bytes:
+    """
+    Stone-like terrain with ores below the surface, air above, and in busy chunks a bottom section with a direct palette
+    """
+    surface = rng.integers(7, 11)
+    out = []
+    for index in range(SECTIONS):
+        if index >= surface:
+            blocks = np.zeros((16, 16, 16), dtype=np.uint16)
+        elif index == 0 and busy:
+            blocks = rng.choice(rng.choice(24000, 300, replace=False), 4096).astype(np.uint16).reshape(16, 16, 16)
+        else:
+            palette = rng.choice(24000, rng.integers(2, 12), replace=False)
+            weights = np.full(len(palette), 0.2 / (len(palette) - 1))
+            weights[0] = 0.8
+            blocks = rng.choice(palette, 4096, p=weights).astype(np.uint16).reshape(16, 16, 16)
+        biomes = np.full((4, 4, 4), rng.integers(0, 64), dtype=np.uint16)
+        out.append(ChunkSection.encode(Section(int(np.count_nonzero(blocks)), blocks, biomes)))
+    return b"".join(out)
+
+def decoded_bytes(data: bytes) -> int:
+    """
+    What keeping the numpy arrays of ChunkSection.decode takes, single-valued sections are free broadcasts
+    """
+    sections, _ = ChunkSection.decode_many(data, SECTIONS)
+    return sum(section.blocks.nbytes for section in sections if section.blocks.strides != (0, 0, 0))
+
+def main(radius=32, lookups=1_000_000):
+    rng = np.random.default_rng(0)
+    templates = [chunk(rng, index % 4 == 0) for index in range(TEMPLATES)]
+    side = 2 * radius + 1
+
+    gc.collect()
+    before = anonymous_memory()
+    world = World(radius=radius)
+    start = time.perf_counter()
+    for chunk_x in range(-radius, radius + 1):
+        for chunk_z in range(-radius, radius + 1):
+            world.load(chunk_x, chunk_z, templates[(chunk_x * 7 + chunk_z) % TEMPLATES])
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    memory = world.memory()
+    numpy_per_chunk = sum(map(decoded_bytes, templates)) / TEMPLATES
+    print(f"loaded {len(world)} chunks ({side}x{side}) in {elapsed:.2f}s, {len(world) / elapsed:,.0f} chunks/s")
+    print(f"RssAnon {before} before, {anonymous_memory()} after")
+    print(f"store {memory['bytes'] / 2 ** 20:.1f} MiB, {memory['bytes_per_chunk'] / 1024:.1f} KiB per chunk "
+          f"against {numpy_per_chunk / 1024:.1f} KiB of decoded numpy sections")
+    print(f"{memory['shared_sections']} of {memory['sections']} sections shared, {memory['direct_sections']} direct")
+
+    positions = random.Random(0)
+    span = 16 * radius
+    coordinates = [(positions.randrange(-span, span + 16), positions.randrange(-64, 320), positions.randrange(-span, span + 16))
+                   for _ in range(lookups)]
+    block = world.block
+    start = time.perf_counter()
+    for x, y, z in coordinates:
+        block(x, y, z)
+    elapsed = time.perf_counter() - start
+    print(f"{lookups:,} random lookups, {elapsed / lookups * 1e9:.0f} ns each")
+
+    # Players placing and breaking a handful of block kinds
+    updates = coordinates[:100_000]
+    states = [0, 1, 9, 79, 2104, 5000]
+    start = time.perf_counter()
+    for index, (x, y, z) in enumerate(updates):
+        world.set_block(x, y, z, states[index % len(states)])
+    elapsed = time.perf_counter() - start
+    print(f"{len(updates):,} block updates, {elapsed / len(updates) * 1e9:.0f} ns each, "
+          f"{world.memory()['bytes_per_chunk'] / 1024:.1f} KiB per chunk after")
+
+    start = time.perf_counter()
+    world.set_center(radius, 0)
+    elapsed = time.perf_counter() - start
+    print(f"moving the center by {radius} evicted {world.evicted} chunks in {elapsed * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,168 @@
+"""
+Outgoing writes over loopback TCP: a sendall per packet against the WriteScheduler
+
+Three measurements:
+    - a bot's tick of packets, sent to a server that reads as fast as it can: syscalls and CPU time per tick,
+      the server's included as it runs in a thread
+    - a two-packet request the server answers once it has both, the write-write-read pattern where Nagle's
+      algorithm and delayed acks stall a per-packet writer
+    - keep alive latency while bulk traffic is backed up behind a slow reader, queued normally and as urgent
+
+Run from the repository root with `python -m benchmarks.writer [ticks]`
+"""
+
+import socket
+import statistics
+import sys
+import threading
+import time
+
+from src.client.metrics import Metrics
+from src.client.writer import WriteScheduler
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+from src.packets.play import ChatMessage, ServerboundKeepAlive, SetPlayerPosition, SetPlayerPositionAndRotation, SwingArm
+
+def tick_packets() -> list[bytes]:
+    """
+    What a busy bot sends in one tick
+    """
+    return [packet.serialize() for packet in (
+        SetPlayerPositionAndRotation(12.5, 64.0, -3.25, 90.0, 0.0, True),
+        SwingArm(0),
+        SetPlayerPosition(12.6, 64.0, -3.25, True),
+        ServerboundKeepAlive(1234),
+        ChatMessage("hello there", 0, 0, False, 0, [0, 0, 0]),
+        SetPlayerPosition(12.7, 64.0, -3.25, True),
+    )]
+
+class Sink(threading.Thread):
+    """
+    Accepts one connection and counts frames, optionally answering every second frame with one byte or
+    recording the latency of keep alives whose id is the perf_counter_ns they were queued at
+    """
+    def __init__(self, answer=False, delay: float = 0, receive_buffer: int = None):
+        super().__init__(daemon=True)
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        if receive_buffer:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.port = self.listener.getsockname()[1]
+        self.answer = answer
+        self.delay = delay
+        self.frames = 0
+        self.latencies: list[int] = []
+
+    def run(self):
+        connection, _ = self.listener.accept()
+        reader = FrameReader()
+        while reader.recv_into(connection):
+            for frame in reader.frames():
+                self.frames += 1
+                packet_id, offset = VarInt.decode(frame)
+                if packet_id == ServerboundKeepAlive.ID and len(frame) == 9:
+                    sent = ServerboundKeepAlive.decode(frame, offset)[0].keep_alive_id
+                    self.latencies.append(time.perf_counter_ns() - sent)
+                if self.answer and self.frames % 2 == 0:
+                    connection.sendall(b"!")
+            if self.delay:
+                time.sleep(self.delay)
+        connection.close()
+        self.listener.close()
+
+def connect(sink: Sink, nodelay=True, send_buffer: int = None) -> socket.socket:
+    sink.start()
+    sock = socket.socket()
+    if send_buffer:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer)
+    sock.connect(("127.0.0.1", sink.port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(nodelay))
+    return sock
+
+def ticks(count: int):
+    packets = tick_packets()
+
+    sink = Sink()
+    sock = connect(sink)
+    start, cpu = time.perf_counter(), time.process_time()
+    for _ in range(count):
+        for packet in packets:
+            sock.sendall(FrameReader.frame(packet))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    sock.close()
+    sink.join()
+    print(f"{'sendall per packet':<22} {len(packets):5.2f} syscalls/tick, {cpu / count * 1e6:6.1f} us CPU/tick, "
+          f"{count * len(packets) / elapsed:>10,.0f} packets/s")
+
+    sink = Sink()
+    sock = connect(sink)
+    metrics = Metrics()
+    writer = WriteScheduler(sock, metrics, tick=float("inf"))
+    start, cpu = time.perf_counter(), time.process_time()
+    for _ in range(count):
+        for packet in packets:
+            writer.queue(packet)
+        writer.flush()
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    writer.drain()
+    sock.close()
+    sink.join()
+    assert sink.frames == count * len(packets)
+    print(f"{'WriteScheduler':<22} {metrics.writes / count:5.2f} syscalls/tick, {cpu / count * 1e6:6.1f} us CPU/tick, "
+          f"{count * len(packets) / elapsed:>10,.0f} packets/s")
+
+def requests(count=40):
+    """
+    Two small packets then a blocking read for the answer
+    """
+    first, second = tick_packets()[:2]
+    for name, nodelay, scheduled in (("sendall, Nagle on", False, False), ("sendall, TCP_NODELAY", True, False),
+                                     ("WriteScheduler", True, True)):
+        sink = Sink(answer=True)
+        sock = connect(sink, nodelay)
+        writer = WriteScheduler(sock, tick=float("inf"))
+        times = []
+        for _ in range(count):
+            start = time.perf_counter_ns()
+            if scheduled:
+                writer.queue(first)
+                writer.queue(second)
+                writer.flush()
+            else:
+                sock.sendall(FrameReader.frame(first))
+                sock.sendall(FrameReader.frame(second))
+            sock.recv(1)
+            times.append(time.perf_counter_ns() - start)
+        sock.close()
+        sink.join()
+        print(f"{name:<22} round trip median {statistics.median(times) / 1e3:8.1f} us, max {max(times) / 1e3:8.1f} us")
+
+def backlog(seconds=1.0):
+    """
+    A slow reader and 256 KiB of bulk traffic per tick, with a keep alive answered in each tick
+    """
+    bulk = ChatMessage("x" * 200, 0, 0, False, 0, [0, 0, 0]).serialize()
+    for urgent in (False, True):
+        sink = Sink(delay=0.002, receive_buffer=65536)
+        sock = connect(sink, send_buffer=65536)
+        writer = WriteScheduler(sock, tick=float("inf"), high_water=1 << 22)
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            for _ in range(1200):
+                writer.queue(bulk)
+            writer.queue(ServerboundKeepAlive(time.perf_counter_ns()).serialize(), urgent)
+            writer.flush()
+            time.sleep(0.05)
+        writer.drain()
+        sock.close()
+        sink.join()
+        latencies = sorted(sink.latencies)
+        print(f"keep alive {'urgent' if urgent else 'queued':<11} median {latencies[len(latencies) // 2] / 1e6:8.1f} ms, "
+              f"max {latencies[-1] / 1e6:8.1f} ms, kernel buffer full on {writer.full} flushes")
+
+def main(count=20_000):
+    ticks(count)
+    requests()
+    backlog()
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -1,6 +1,24 @@
+"""
+MicrosoftAuth and AuthPool are loaded on first use, they pull in requests and http.server which most users of
+Profile never need
+"""
+
+import importlib
+
 try:
-    from microsoft_auth import MicrosoftAuth
-    from profile import Profile
+    from .profile import Profile
 except ImportError:
-    from .microsoft_auth import MicrosoftAuth
-    from .profile import Profile
\ No newline at end of file
+    from profile import Profile
+
+__all__ = ["MicrosoftAuth", "Profile", "AuthPool", "AuthResult"]
+
+_LAZY = {"MicrosoftAuth": "microsoft_auth", "AuthPool": "pool", "AuthResult": "pool"}
+
+def __getattr__(name):
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(importlib.import_module(f".{module}", __name__), name)
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -7,14 +7,17 @@ Modification of https://github.com/axieum/authme/blob/main/src/main/java/me/axie
 import requests
 import random
 import json
+import time
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlencode, urlparse, parse_qs
 
 try:
     from .profile import Profile
+    from .token_cache import TokenCache, CachedToken
     from ..log import logger
 except ImportError:
     from src.auth.profile import Profile
+    from src.auth.token_cache import TokenCache, CachedToken
     from src.log import logger
 
 __all__ = ["MicrosoftAuth"]
@@ -35,13 +38,18 @@ class OAuthServer(BaseHTTPRequestHandler):
             self.server.error = params.get("error", [None])[0]
             self.server.error_description = params.get("error_description", [None])[0]
 
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html")
-            try:
-                self.end_headers()
-            except AttributeError:
-                pass
-            self.wfile.write(b"""\
+            self.complete()
+
+            self.server._BaseServer__shutdown_request = True
+
+    def complete(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        try:
+            self.end_headers()
+        except AttributeError:
+            pass
+        self.wfile.write(b"""\
 <!doctype html>
 <html>
     <head>
@@ -55,13 +63,20 @@ class OAuthServer(BaseHTTPRequestHandler):
 </html>
             """)
 
-            self.server._BaseServer__shutdown_request = True
+    @classmethod
+    def listen(cls, port: int) -> HTTPServer:
+        return HTTPServer(('', port), cls)
 
     @classmethod
-    def run(cls, port: int, state: str):
-        addr = ('', port)
-        httpd = HTTPServer(addr, cls)
-        httpd.serve_forever()
+    def run(cls, port: int, state: str, httpd: HTTPServer = None):
+        """
+        Serves until the redirect arrives, on httpd when it is already listening
+        """
+        httpd = httpd or cls.listen(port)
+        try:
+            httpd.serve_forever()
+        finally:
+            httpd.server_close()
 
         return httpd.code, httpd.state, httpd.error, httpd.error_description
 
@@ -75,13 +90,46 @@ class MicrosoftAuth:
     MC_PROFILE_URL = "https://api.minecraftservices.com/minecraft/profile"
     PORT = 25585
     PROMPT_TYPE = "select_account"
-
-    def __init__(self, write_stdout=False, write_file=True, open_ms_auth=True):
+    RATE_LIMIT_STATUSES = (429, 503)
+    MAX_RETRIES = 5
+    BACKOFF = 1.0
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, write_stdout=False, write_file=True, open_ms_auth=True, account="default",
+                 use_cache=True, cache: TokenCache = None, session: requests.Session = None, callback_server=None):
+        """
+        Tokens are cached per account name, pass a shared session to pool connections between accounts
+        and a shared callback_server (see AuthPool) to run several browser logins at once
+        """
         self.profile = Profile("", "", "")
         self.open_ms_auth = open_ms_auth
+        self.account = account
+        self.cache = (cache or TokenCache()) if use_cache else None
+        self.session = session or requests.Session()
+        self.refresh_token = ""
+        self.expires_at = 0.0
+        self.callback_server = callback_server
+        self.error = None
         self.LOGGER = logger("MicrosoftAuth", write_stdout, write_file)
 
     def start(self):
+        cached = self.cache.load(self.account) if self.cache else None
+        if cached is not None:
+            if cached.valid():
+                self.LOGGER.info("Using cached Minecraft access token for %s", cached.username)
+                self.refresh_token = cached.refresh_token
+                self.expires_at = cached.expires_at
+                self.profile = cached.profile
+                return
+
+            if cached.refresh_token:
+                self.LOGGER.info("Cached Minecraft access token expired, refreshing")
+                # Kept when the token endpoint does not rotate it, so it is cached again
+                self.refresh_token = cached.refresh_token
+                ms_access_token = self.refresh_microsoft_access_token(cached.refresh_token)
+                if ms_access_token is not None and self.login(ms_access_token):
+                    return
+
         auth_code = self.get_microsoft_auth_code()
         if auth_code is None:
             return
@@ -90,24 +138,54 @@ class MicrosoftAuth:
         if ms_access_token is None:
             return
 
+        self.login(ms_access_token)
+
+    def login(self, ms_access_token: str) -> bool:
+        """
+        Exchanges a Microsoft access token for a Minecraft profile and caches the result
+        """
         xbox_access_token = self.get_xbox_access_token(ms_access_token)
         if xbox_access_token is None:
-            return
+            return False
 
         xsts_token, user_hash = self.get_xsts_token(xbox_access_token)
         if xsts_token is None or user_hash is None:
-            return
+            return False
 
         access_token = self.get_minecraft_token(xsts_token, user_hash)
         if access_token is None:
-            return
+            return False
 
         uuid, username = self.get_minecraft_profile(access_token)
         if uuid is None or username is None:
-            return
+            return False
 
         self.profile = Profile(uuid, username, access_token)
+        self.error = None
+        if self.cache:
+            self.cache.save(self.account, CachedToken(self.refresh_token, access_token, self.expires_at, uuid, username))
+        return True
+
+    def fail(self, message: str):
+        self.error = message
+        self.LOGGER.error(message)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the session, backing off while the endpoint is rate limiting
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code not in self.RATE_LIMIT_STATUSES or attempt == self.MAX_RETRIES:
+                return response
 
+            try:
+                delay = float(response.headers["Retry-After"])
+            except (KeyError, ValueError):
+                delay = self.BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            delay = min(delay, self.MAX_BACKOFF)
+            self.LOGGER.info("Rate limited by %s (%s), retrying in %.1fs", urlparse(url).netloc, response.status_code, delay)
+            time.sleep(delay)
 
     def get_microsoft_auth_code(self):
         self.LOGGER.info("Getting access code")
@@ -123,67 +201,93 @@ class MicrosoftAuth:
         if self.PROMPT_TYPE:
             parameters["prompt"] = self.PROMPT_TYPE
         uri = self.AUTHORIZE_URL + "?" + urlencode(parameters)
-        self.LOGGER.info("Launching Minecraft login in browser:\n\t" + uri)
-        if self.open_ms_auth:
-            __import__("webbrowser").open(uri)
 
         server = OAuthServer
-        self.LOGGER.info(f"Listening on port {self.PORT} with state {state!r}")
+        httpd = None
+        self.LOGGER.info("Listening on port %s with state %r", self.PORT, state)
 
         try:
-            code, received_state, error, error_description = server.run(self.PORT, state)
-            if state != received_state:
-                self.LOGGER.error(f"State mismatch! Expected {state}, received {received_state}!")
-                return
+            # Listening before the browser opens, a redirect can come back before open() returns
+            if self.callback_server is not None:
+                self.callback_server.expect(state)
+            else:
+                httpd = server.listen(self.PORT)
+
+            self.LOGGER.info("Launching Minecraft login in browser:\n\t%s", uri)
+            if self.open_ms_auth:
+                # Imported here, it is slow to import and only needed for browser logins
+                import webbrowser
+                webbrowser.open(uri)
+
+            if self.callback_server is not None:
+                code, received_state, error, error_description = self.callback_server.wait(state)
+            else:
+                code, received_state, error, error_description = server.run(self.PORT, state, httpd)
+            # Before the state, a callback timeout comes without one
             if error:
-                self.LOGGER.error(f"Error! {error}: {error_description}")
+                self.fail(f"Error! {error}: {error_description}")
+                return
+            if state != received_state:
+                self.fail(f"State mismatch! Expected {state}, received {received_state}!")
                 return
             if not code:
-                self.LOGGER.error("Did not receive an auth code!")
+                self.fail("Did not receive an auth code!")
                 return
 
-            self.LOGGER.info(f"Received Microsoft auth code! {code[:32]}...")
+            self.LOGGER.info("Received Microsoft auth code! %s...", code[:32])
             return code
 
         except KeyboardInterrupt:
-            self.LOGGER.error("Acquiring Microsoft auth code was cancelled!")
+            self.fail("Acquiring Microsoft auth code was cancelled!")
             return
 
         except Exception as e:
-            self.LOGGER.error(f"Error! {e.__class__}: {e}")
+            self.fail(f"Error! {e.__class__}: {e}")
             return
 
     def get_microsoft_access_token(self, auth_code: str):
         self.LOGGER.info("Getting access token from Microsoft")
-        data = {
+        return self.request_microsoft_token({
             "client_id": self.CLIENT_ID,
             "grant_type": "authorization_code",
             "code": auth_code,
             "redirect_uri": f"http://localhost:{self.PORT}/callback"
-        }
+        })
+
+    def refresh_microsoft_access_token(self, refresh_token: str):
+        self.LOGGER.info("Refreshing access token from Microsoft")
+        return self.request_microsoft_token({
+            "client_id": self.CLIENT_ID,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "scope": "XboxLive.signin offline_access"
+        })
+
+    def request_microsoft_token(self, data: dict):
         headers = {
             "Content-Type": "application/x-www-form-urlencoded"
         }
         try:
-            response = requests.post(self.TOKEN_URL, data=urlencode(data), headers=headers)
+            response = self.request("POST", self.TOKEN_URL, data=urlencode(data), headers=headers)
             json = response.json()
             if access_token := json.get("access_token"):
-                self.LOGGER.info(f"Obtained access token! {access_token[:32]}...")
+                self.LOGGER.info("Obtained access token! %s...", access_token[:32])
+                self.refresh_token = json.get("refresh_token", self.refresh_token)
                 return access_token
             if error := json.get("error"):
                 description = json.get("error_description")
-                self.LOGGER.error(f"Error! {error}: {description}")
+                self.fail(f"Error! {error}: {description}")
                 return
             else:
-                self.LOGGER.error("Did not receive an access token!")
+                self.fail("Did not receive an access token!")
                 return
 
         except KeyboardInterrupt:
-            self.LOGGER.error("Acquiring access token was cancelled!")
+            self.fail("Acquiring access token was cancelled!")
             return
 
         except Exception as e:
-            self.LOGGER.error(f"Error! {e.__class__}: {e}")
+            self.fail(f"Error! {e.__class__}: {e}")
             return
 
     def get_xbox_access_token(self, access_token: str):
@@ -204,25 +308,25 @@ class MicrosoftAuth:
         }
 
         try:
-            response = requests.post(self.XBOX_AUTH_URL, json=data, headers=headers)
+            response = self.request("POST", self.XBOX_AUTH_URL, json=data, headers=headers)
             response_json = response.json()
             if token := response_json.get("Token"):
-                self.LOGGER.info(f"Obtained XBox Live access token! {token[:32]}...")
+                self.LOGGER.info("Obtained XBox Live access token! %s...", token[:32])
                 return token
 
             if error := response_json.get("XErr"):
-                self.LOGGER.error(f"Error! {error}: {response_json["Message"]}")
+                self.fail(f"Error! {error}: {response_json['Message']}")
                 return
             else:
-                self.LOGGER.error("Did not receive an access token!")
+                self.fail("Did not receive an access token!")
                 return
 
         except KeyboardInterrupt:
-            self.LOGGER.error("Acquiring access token was cancelled!")
+            self.fail("Acquiring access token was cancelled!")
             return
 
         except Exception as e:
-            self.LOGGER.error(f"Error! {e.__class__.__name__}: {e}")
+            self.fail(f"Error! {e.__class__.__name__}: {e}")
             return
 
     def get_xsts_token(self, access_token: str):
@@ -240,12 +344,12 @@ class MicrosoftAuth:
         })
 
         try:
-            response = requests.post(self.XBOX_XSTS_URL, data=data, headers=headers)
+            response = self.request("POST", self.XBOX_XSTS_URL, data=data, headers=headers)
             response_json = response.json()
 
             if (token := response_json.get("Token")) and (uhs := response_json.get("DisplayClaims", {}).get("xui", [{}])[0].get("uhs")):
-                self.LOGGER.info(f"Obtained XBox Live XSTS token! {token[:32]}...")
-                self.LOGGER.info(f"Obtained user hash! {uhs}")
+                self.LOGGER.info("Obtained XBox Live XSTS token! %s...", token[:32])
+                self.LOGGER.info("Obtained user hash! %s", uhs)
                 return token, uhs
 
             if error := response_json.get("XErr"):
@@ -256,18 +360,18 @@ class MicrosoftAuth:
                     2148916237: "This account requires adult verification on XBox page!",
                     2148916238: "This account is a child unless added to Family!"
                 }
-                self.LOGGER.error(f"Error! {errors[error]}")
+                self.fail(f"Error! {errors[error]}")
                 return None, None
             else:
-                self.LOGGER.error("Did not receive an XSTS token!")
+                self.fail("Did not receive an XSTS token!")
                 return None, None
 
         except KeyboardInterrupt:
-            self.LOGGER.error("Acquiring XSTS token was cancelled!")
+            self.fail("Acquiring XSTS token was cancelled!")
             return None, None
 
         except Exception as e:
-            self.LOGGER.error(f"Error! {e.__class__}: {e}")
+            self.fail(f"Error! {e.__class__}: {e}")
             return None, None
 
     def get_minecraft_token(self, xsts_token: str, uhs: str):
@@ -280,26 +384,27 @@ class MicrosoftAuth:
         })
 
         try:
-            response = requests.post(self.MC_AUTH_URL, data=data, headers=headers)
+            response = self.request("POST", self.MC_AUTH_URL, data=data, headers=headers)
             response_json = response.json()
 
             if token := response_json.get("access_token"):
-                self.LOGGER.info(f"Acquired Minecraft access token! {token[:32]}...")
+                self.LOGGER.info("Acquired Minecraft access token! %s...", token[:32])
+                self.expires_at = time.time() + response_json.get("expires_in", 0)
                 return token
 
             if error := response_json.get("error"):
-                self.LOGGER.error(f"Error! {error}: {response_json["errorMessage"]}")
+                self.fail(f"Error! {error}: {response_json['errorMessage']}")
                 return
             else:
-                self.LOGGER.error("Did not receive a Minecraft access token!")
+                self.fail("Did not receive a Minecraft access token!")
                 return
 
         except KeyboardInterrupt:
-            self.LOGGER.error("Acquiring Minecraft access token was cancelled!")
+            self.fail("Acquiring Minecraft access token was cancelled!")
             return
 
         except Exception as e:
-            self.LOGGER.error(f"Error! {e.__class__}: {e}")
+            self.fail(f"Error! {e.__class__}: {e}")
             return
 
     def get_minecraft_profile(self, access_token: str):
@@ -309,28 +414,28 @@ class MicrosoftAuth:
         }
 
         try:
-            response = requests.get(self.MC_PROFILE_URL, headers=headers)
+            response = self.request("GET", self.MC_PROFILE_URL, headers=headers)
             response_json = response.json()
 
             if uuid := response_json.get("id"):
                 name = response_json["name"]
-                self.LOGGER.info(f"Received UUID! {uuid}")
-                self.LOGGER.info(f"Received username! {name}")
+                self.LOGGER.info("Received UUID! %s", uuid)
+                self.LOGGER.info("Received username! %s", name)
                 return uuid, name
 
             if error := response_json.get("error"):
-                self.LOGGER.error(f"Error! {error}: {response_json["errorMessage"]}")
+                self.fail(f"Error! {error}: {response_json['errorMessage']}")
                 return None, None
             else:
-                self.LOGGER.error("Did not receive a Minecraft profile!")
+                self.fail("Did not receive a Minecraft profile!")
                 return None, None
 
         except KeyboardInterrupt:
-            self.LOGGER.error("Acquiring Minecraft profile was cancelled!")
+            self.fail("Acquiring Minecraft profile was cancelled!")
             return None, None
 
         except Exception as e:
-            self.LOGGER.error(f"Error! {e.__class__}: {e}")
+            self.fail(f"Error! {e.__class__}: {e}")
             return None, None
 
 
@@ -0,0 +1,141 @@
+"""
+Authenticating many accounts at once
+
+Accounts run on a bounded thread pool sharing one connection pool. Browser logins all redirect to one
+callback server, which hands each code to the account that is waiting for its state.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .microsoft_auth import MicrosoftAuth, OAuthServer
+    from .profile import Profile
+    from .token_cache import TokenCache
+except ImportError:
+    from src.auth.microsoft_auth import MicrosoftAuth, OAuthServer
+    from src.auth.profile import Profile
+    from src.auth.token_cache import TokenCache
+
+__all__ = ["AuthPool", "AuthResult"]
+
+@dataclass
+class AuthResult:
+    account: str
+    profile: Profile | None
+    error: str | None
+
+class CallbackHandler(OAuthServer):
+    def do_GET(self):
+        if not self.path.startswith("/callback"):
+            self.send_error(404)
+            return
+
+        params = parse_qs(urlparse(self.path).query)
+        state = params.get("state", [None])[0]
+        waiter = self.server.waiters.get(state)
+        if waiter is None:
+            self.send_error(400, "Unknown state")
+            return
+
+        waiter.result = (
+            params.get("code", [None])[0],
+            state,
+            params.get("error", [None])[0],
+            params.get("error_description", [None])[0],
+        )
+        waiter.set()
+        self.complete()
+
+class CallbackServer:
+    """
+    One OAuth redirect listener shared by every account in the pool
+    """
+    def __init__(self, port: int = MicrosoftAuth.PORT, timeout: float = None):
+        self.port = port
+        self.timeout = timeout
+        self.httpd: ThreadingHTTPServer = None
+        self.waiters: dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.httpd is None:
+                self.httpd = ThreadingHTTPServer(("", self.port), CallbackHandler)
+                self.httpd.daemon_threads = True
+                self.httpd.waiters = self.waiters
+                threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def expect(self, state: str) -> threading.Event:
+        """
+        Listens for this state, before the browser is opened so that an immediate redirect is not turned away
+        """
+        self.start()
+        waiter = threading.Event()
+        waiter.result = (None, None, "timeout", "No callback received")
+        self.waiters[state] = waiter
+        return waiter
+
+    def wait(self, state: str):
+        """
+        Blocks until the browser is redirected with this state, returns code, state, error and error description
+        """
+        waiter = self.waiters.get(state) or self.expect(state)
+        try:
+            waiter.wait(self.timeout)
+            return waiter.result
+        finally:
+            self.waiters.pop(state, None)
+
+    def stop(self):
+        with self.lock:
+            if self.httpd is not None:
+                self.httpd.shutdown()
+                self.httpd.server_close()
+                self.httpd = None
+
+class AuthPool:
+    def __init__(self, workers=8, write_stdout=False, write_file=True, open_ms_auth=True,
+                 use_cache=True, cache: TokenCache = None, callback_timeout: float = 300, auth_class=MicrosoftAuth):
+        self.workers = workers
+        self.write_stdout = write_stdout
+        self.write_file = write_file
+        self.open_ms_auth = open_ms_auth
+        self.use_cache = use_cache
+        self.cache = cache or TokenCache()
+        self.auth_class = auth_class
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.callback_server = CallbackServer(auth_class.PORT, callback_timeout)
+
+    def authenticate_one(self, account: str) -> AuthResult:
+        auth = self.auth_class(self.write_stdout, self.write_file, self.open_ms_auth, account=account,
+                               use_cache=self.use_cache, cache=self.cache, session=self.session,
+                               callback_server=self.callback_server)
+        try:
+            auth.start()
+        except Exception as e:
+            return AuthResult(account, None, f"{e.__class__.__name__}: {e}")
+
+        if not auth.profile.UUID:
+            return AuthResult(account, None, auth.error or "Authentication failed")
+        return AuthResult(account, auth.profile, None)
+
+    def authenticate(self, accounts: list[str]) -> list[AuthResult]:
+        """
+        Authenticates every account, results are in the same order as accounts
+        """
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="AuthPool") as executor:
+                return list(executor.map(self.authenticate_one, accounts))
+        finally:
+            self.callback_server.stop()
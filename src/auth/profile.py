@@ -2,6 +2,8 @@
 A Minecraft profile
 """
 
+import hashlib
+import uuid
 from dataclasses import dataclass
 
 __all__ = ["Profile"]
@@ -10,4 +12,12 @@ __all__ = ["Profile"]
 class Profile:
     UUID: str
     username: str
-    access_token: str
\ No newline at end of file
+    access_token: str
+
+    @classmethod
+    def offline(cls, username: str):
+        """
+        A profile for offline-mode servers, with the UUID the server derives from the username
+        """
+        digest = hashlib.md5(f"OfflinePlayer:{username}".encode("utf-8")).digest()
+        return cls(uuid.UUID(bytes=digest, version=3).hex, username, "")
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+On-disk cache of Microsoft refresh tokens and Minecraft access tokens, one file per account
+"""
+
+import json
+import os
+import pathlib
+import re
+import time
+from dataclasses import dataclass, asdict
+
+try:
+    from .profile import Profile
+except ImportError:
+    from src.auth.profile import Profile
+
+__all__ = ["TokenCache", "CachedToken"]
+
+@dataclass
+class CachedToken:
+    refresh_token: str
+    access_token: str
+    expires_at: float
+    UUID: str
+    username: str
+
+    EXPIRY_MARGIN = 300
+
+    def valid(self) -> bool:
+        """
+        Whether the Minecraft access token can still be used, with a margin for long sessions
+        """
+        return bool(self.access_token) and self.expires_at - self.EXPIRY_MARGIN > time.time()
+
+    @property
+    def profile(self) -> Profile:
+        return Profile(self.UUID, self.username, self.access_token)
+
+class TokenCache:
+    def __init__(self, directory: pathlib.Path = None):
+        if not directory:
+            directory = pathlib.Path(os.environ.get("TOKEN_CACHE_DIRECTORY", os.path.join(os.getcwd(), "tokens")))
+        self.directory = pathlib.Path(directory)
+
+    def path(self, account: str) -> pathlib.Path:
+        return self.directory / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', account)}.json"
+
+    def load(self, account: str) -> CachedToken | None:
+        try:
+            with open(self.path(account)) as file:
+                return CachedToken(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, account: str, token: CachedToken):
+        """
+        Written to a temporary file and renamed, so concurrent readers never see half a file
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(account)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(asdict(token), file)
+        os.replace(temporary, path)
+
+    def delete(self, account: str):
+        self.path(account).unlink(missing_ok=True)
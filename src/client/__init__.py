@@ -0,0 +1,27 @@
+"""
+Everything here is loaded on first use, so importing one client does not import the others' dependencies
+"""
+
+import importlib
+
+__all__ = ["Client", "AsyncClient", "LoginError", "Metrics", "Histogram", "Swarm", "WorkerReport", "WriteScheduler",
+           "Resolver", "ResolveError", "StatusPinger", "StatusResult"]
+
+_LAZY = {
+    "Client": "client",
+    "AsyncClient": "async_client", "LoginError": "async_client",
+    "Metrics": "metrics", "Histogram": "metrics",
+    "Swarm": "swarm", "WorkerReport": "swarm",
+    "WriteScheduler": "writer",
+    "Resolver": "resolver", "ResolveError": "resolver",
+    "StatusPinger": "status", "StatusResult": "status",
+}
+
+def __getattr__(name):
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(importlib.import_module(f".{module}", __name__), name)
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,248 @@
+"""
+An asyncio Minecraft client
+
+Many connections can share one event loop. Incoming frames go through a Dispatcher: packets nobody handles
+are dropped unread (compressed ones without being inflated), the rest reach callbacks or a queue.
+Outgoing packets are batched into one transport write per loop iteration.
+Large compressed frames are inflated on an executor, frames behind them wait so packets stay in order.
+Traffic, latencies and queue depths are tracked in self.metrics.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import deque
+
+try:
+    from .metrics import Metrics
+    from ..auth.profile import Profile
+    from ..packets.compression import Compression, CompressionError
+    from ..packets.dispatch import Dispatcher
+    from ..packets.frame import FrameReader
+    from ..packets.handshaking import Handshake
+    from ..packets.login import *
+    from ..packets.packet import Packet
+    from ..packets.play import *
+    from ..packets.state import State, PROTOCOL_VERSION
+except ImportError:
+    from src.client.metrics import Metrics
+    from src.auth.profile import Profile
+    from src.packets.compression import Compression, CompressionError
+    from src.packets.dispatch import Dispatcher
+    from src.packets.frame import FrameReader
+    from src.packets.handshaking import Handshake
+    from src.packets.login import *
+    from src.packets.packet import Packet
+    from src.packets.play import *
+    from src.packets.state import State, PROTOCOL_VERSION
+
+__all__ = ["AsyncClient", "LoginError"]
+
+class LoginError(RuntimeError):
+    pass
+
+class AsyncClient(asyncio.Protocol):
+    def __init__(self, profile: Profile, protocol_version=PROTOCOL_VERSION, offload_size=Compression.OFFLOAD_SIZE, executor=None,
+                 metrics: Metrics = None):
+        """
+        Compressed frames inflating to offload_size bytes or more are inflated on executor (the loop's default if None)
+        """
+        self.profile = profile
+        self.protocol_version = protocol_version
+        self.offload_size = offload_size
+        self.executor = executor
+        self.state = State.HANDSHAKING
+        self.transport: asyncio.Transport = None
+        self.reader = FrameReader()
+        self.outgoing: list[bytes] = []
+        self.flush_scheduled = False
+        self.compression: Compression = None
+        self.inflating: asyncio.Future = None
+        self.inflate_started = 0
+        self.countdown = 1
+        self.backlog: deque[bytes] = deque()
+        self.disconnect_reason = None
+
+        self.dispatcher = Dispatcher()
+        self.packets: asyncio.Queue = asyncio.Queue()
+        self.logged_in: asyncio.Future = None
+        self.closed: asyncio.Future = None
+
+        self.metrics = Metrics() if metrics is None else metrics
+        self.dispatcher.metrics = self.metrics
+        self.metrics.queue("packets", self.packets.qsize)
+        self.metrics.queue("backlog", self.backlog.__len__)
+        self.metrics.queue("outgoing", self.outgoing.__len__)
+        self.metrics.queue("write_buffer", lambda: self.transport.get_write_buffer_size() if self.transport else 0)
+
+        for packet_type, handler in (
+            (LoginSuccess, self.login_success),
+            (SetCompression, self.set_compression),
+            (LoginPluginRequest, self.login_plugin_request),
+            (LoginDisconnect, self.login_disconnect),
+            (EncryptionRequest, self.encryption_request),
+        ):
+            self.dispatcher.register(State.LOGIN, packet_type, handler, lazy=False)
+        self.dispatcher.register(State.PLAY, ClientboundKeepAlive, self.keep_alive, lazy=False)
+        self.dispatcher.register(State.PLAY, PlayDisconnect, self.play_disconnect, lazy=False)
+
+    def on(self, packet: type[Packet], callback=None, lazy=True):
+        """
+        Passes play packets of this type to callback, or puts them decoded in self.packets if there is none
+
+        Callbacks get a LazyPacket unless lazy is False, it has to be decoded before the callback returns to be kept.
+        """
+        if callback is None:
+            self.dispatcher.register(State.PLAY, packet, self.packets.put_nowait, lazy=False)
+        else:
+            self.dispatcher.register(State.PLAY, packet, callback, lazy)
+
+    async def connect(self, server: str, port=25565, timeout: float = None):
+        loop = asyncio.get_running_loop()
+        self.logged_in = loop.create_future()
+        self.closed = loop.create_future()
+        await asyncio.wait_for(loop.create_connection(lambda: self, server, port), timeout)
+
+        self.send(Handshake(self.protocol_version, server, port, State.LOGIN))
+        self.state = State.LOGIN
+        player_uuid = uuid.UUID(self.profile.UUID) if self.profile.UUID else uuid.UUID(Profile.offline(self.profile.username).UUID)
+        self.send(LoginStart(self.profile.username, True, player_uuid))
+        await asyncio.wait_for(asyncio.shield(self.logged_in), timeout)
+
+    def send(self, packet: Packet):
+        self.send_raw(packet.serialize())
+
+    def send_raw(self, data: bytes):
+        """
+        Queues packet id and data, everything queued in one loop iteration goes out in a single write
+        """
+        if self.metrics.enabled:
+            self.metrics.packet_out(self.state, data)
+        if self.compression is not None:
+            data = self.compression.compress(data)
+        self.outgoing.append(FrameReader.frame(data))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        if self.outgoing and self.transport is not None and not self.transport.is_closing():
+            data = b"".join(self.outgoing)
+            self.transport.write(data)
+            if self.metrics.enabled:
+                self.metrics.write(len(data))
+        self.outgoing.clear()
+
+    def close(self):
+        if self.transport is not None:
+            self.flush()
+            self.transport.close()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+        if not self.logged_in.done():
+            self.logged_in.set_exception(exc or LoginError(self.disconnect_reason or "Connection closed during login"))
+        if not self.closed.done():
+            self.closed.set_result(self.disconnect_reason)
+
+    def data_received(self, data: bytes):
+        if self.metrics.enabled:
+            self.metrics.read(len(data))
+        self.reader.feed(data)
+        for frame in self.reader.frames():
+            if self.disconnect_reason is not None:
+                # Closing, the rest may not even decompress
+                break
+            if self.inflating is None:
+                self.receive(frame)
+            else:
+                self.backlog.append(bytes(frame))
+
+    def receive(self, frame):
+        if self.compression is not None:
+            try:
+                length, offset = self.compression.split(frame)
+                if length == 0:
+                    frame = frame[offset:]
+                elif not self.dispatcher.handles(self.state, packet_id := Compression.peek_id(frame[offset:])):
+                    self.dispatcher.skip(self.state, packet_id)
+                    if self.metrics.enabled:
+                        self.metrics.packet_in(self.state, frame, packet_id)
+                    return
+                elif self.compression.should_offload(length):
+                    self.compression.offloaded += 1
+                    self.inflate_started = time.perf_counter_ns()
+                    loop = asyncio.get_running_loop()
+                    self.inflating = loop.run_in_executor(self.executor, Compression.inflate, bytes(frame[offset:]), length)
+                    self.inflating.add_done_callback(self.inflated)
+                    return
+                elif (countdown := self.countdown - 1) > 0 or not self.metrics.enabled:
+                    self.countdown = countdown
+                    frame = Compression.inflate(frame[offset:], length)
+                else:
+                    self.countdown = self.metrics.sample
+                    start = time.perf_counter_ns()
+                    frame = Compression.inflate(frame[offset:], length)
+                    self.metrics.decompress.record(time.perf_counter_ns() - start)
+            except CompressionError as e:
+                self.disconnect(f"Could not inflate packet: {e}")
+                return
+        self.dispatch(frame)
+
+    def inflated(self, future: asyncio.Future):
+        self.inflating = None
+        if future.cancelled():
+            return
+        if (error := future.exception()) is not None:
+            self.disconnect(f"Could not inflate packet: {error}")
+            return
+        if self.metrics.enabled:
+            # Includes waiting for the executor, which is what the connection sees
+            self.metrics.decompress.record(time.perf_counter_ns() - self.inflate_started)
+
+        self.dispatch(future.result())
+        while self.backlog and self.inflating is None and self.disconnect_reason is None:
+            self.receive(self.backlog.popleft())
+
+    def dispatch(self, data):
+        metrics = self.metrics
+        if metrics.enabled:
+            if (packet_id := data[0]) < 0x80:
+                index = self.state << 8 | packet_id
+                metrics.received[index] += 1
+                metrics.received_bytes[index] += len(data)
+            else:
+                metrics.packet_in(self.state, data)
+        self.dispatcher.dispatch(self.state, data)
+
+    def login_success(self, packet: LoginSuccess):
+        self.state = State.PLAY
+        self.logged_in.set_result(packet)
+
+    def set_compression(self, packet: SetCompression):
+        self.compression = Compression(packet.threshold, offload_size=self.offload_size) if packet.threshold >= 0 else None
+
+    def login_plugin_request(self, packet: LoginPluginRequest):
+        self.send(LoginPluginResponse(packet.message_id, False))
+
+    def login_disconnect(self, packet: LoginDisconnect):
+        self.disconnect(packet.reason)
+
+    def encryption_request(self, packet: EncryptionRequest):
+        self.disconnect("Online-mode servers are not supported")
+
+    def keep_alive(self, packet: ClientboundKeepAlive):
+        self.send(ServerboundKeepAlive(packet.keep_alive_id))
+
+    def play_disconnect(self, packet: PlayDisconnect):
+        self.disconnect(packet.reason)
+
+    def disconnect(self, reason: str):
+        self.disconnect_reason = reason
+        if not self.logged_in.done():
+            self.logged_in.set_exception(LoginError(reason))
+        self.close()
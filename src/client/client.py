@@ -1,21 +1,191 @@
 """
 A basic Minecraft client
+
+Blocking and single-connection. Login packets are handled internally, everything received
+in play is yielded from packets() or routed to handlers by run(). Incoming frames can be recorded
+to a capture file, and traffic, latencies and socket time are tracked in self.metrics.
+Outgoing packets are coalesced by a WriteScheduler and written once per tick, before the client blocks
+on a read, or on flush(). Keep alives and teleport confirmations skip the queue.
 """
 
 import socket
+import time
+import uuid
 
 try:
     from ..log import logger
     from ..auth.profile import Profile
+    from ..packets.capture import CaptureWriter
+    from .metrics import Metrics
+    from .writer import WriteScheduler
+    from ..packets.compression import Compression
+    from ..packets.datatypes import VarInt
+    from ..packets.dispatch import Dispatcher
+    from ..packets.frame import FrameReader
+    from ..packets.handshaking import Handshake
+    from ..packets.login import *
+    from ..packets.packet import Packet
+    from ..packets.play import ClientboundKeepAlive, ConfirmTeleportation, ServerboundKeepAlive, PlayDisconnect
+    from ..packets.state import State, PROTOCOL_VERSION
 except ImportError:
     from src.log import logger
     from src.auth.profile import Profile
+    from src.packets.capture import CaptureWriter
+    from src.client.metrics import Metrics
+    from src.client.writer import WriteScheduler
+    from src.packets.compression import Compression
+    from src.packets.datatypes import VarInt
+    from src.packets.dispatch import Dispatcher
+    from src.packets.frame import FrameReader
+    from src.packets.handshaking import Handshake
+    from src.packets.login import *
+    from src.packets.packet import Packet
+    from src.packets.play import ClientboundKeepAlive, ConfirmTeleportation, ServerboundKeepAlive, PlayDisconnect
+    from src.packets.state import State, PROTOCOL_VERSION
 
 class Client:
-    def __init__(self, profile: Profile):
+    # Sent ahead of anything queued, the server times out or rubber-bands the player while they wait
+    URGENT = (ServerboundKeepAlive, ConfirmTeleportation)
+
+    def __init__(self, profile: Profile, capture: CaptureWriter = None, metrics: Metrics = None, tick=0.05):
+        """
+        Frames are written to capture as they arrive, before decompression.
+        Queued packets are written at the latest on the first send tick seconds after the last write.
+        """
         self.profile = profile
         self.socket: socket.socket = socket.socket()
+        self.state = State.HANDSHAKING
+        self.reader = FrameReader()
+        self.compression: Compression = None
+        self.capture = capture
+        self.disconnect_reason = None
+
+        self.dispatcher = Dispatcher()
+        self.metrics = Metrics() if metrics is None else metrics
+        self.dispatcher.metrics = self.metrics
+        self.metrics.queue("read_buffer", self.reader.__len__)
+        self.writer = WriteScheduler(self.socket, self.metrics, tick)
+
+    def on(self, packet: type[Packet], callback, lazy=True):
+        """
+        Has run() pass play packets of this type to callback, as a LazyPacket unless lazy is False
+        """
+        self.dispatcher.register(State.PLAY, packet, callback, lazy)
+
+    def record(self, path) -> CaptureWriter:
+        """
+        Starts recording incoming frames to a capture file
+        """
+        self.capture = CaptureWriter(path)
+        return self.capture
 
     def connect(self, server: str, port=25565):
         self.socket.connect((server, port))
-        self.socket.send()
+        # Writes are already coalesced, Nagle's algorithm would only hold them back further
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        player_uuid = self.profile.UUID or Profile.offline(self.profile.username).UUID
+        self.send(Handshake(PROTOCOL_VERSION, server, port, State.LOGIN))
+        self.state = State.LOGIN
+        self.send(LoginStart(self.profile.username, True, uuid.UUID(player_uuid)))
+        self.flush()
+
+    def send(self, packet: Packet, urgent: bool = None):
+        """
+        Queues a packet, urgent ones are written straight away ahead of the queue. By default
+        only keep alives and teleport confirmations are urgent.
+        """
+        data = packet.serialize()
+        metrics = self.metrics
+        if metrics.enabled:
+            metrics.packet_out(self.state, data, packet.ID)
+        if self.compression is not None:
+            data = self.compression.compress(data)
+        self.writer.queue(data, isinstance(packet, self.URGENT) if urgent is None else urgent)
+
+    def flush(self) -> bool:
+        """
+        Writes the queued packets without blocking, returns whether the kernel took all of them
+        """
+        return self.writer.flush()
+
+    def frames(self):
+        """
+        Yields raw frames until the connection closes, each is only valid until the next one is read
+        """
+        reader = self.reader
+        metrics = self.metrics
+        writer = self.writer
+        while True:
+            if writer.pending:
+                writer.wait()
+            if metrics.enabled:
+                start = time.perf_counter_ns()
+                received = reader.recv_into(self.socket)
+                metrics.read(received, time.perf_counter_ns() - start)
+            else:
+                received = reader.recv_into(self.socket)
+            if not received:
+                return
+            for frame in reader.frames():
+                if self.capture is not None:
+                    self.capture.write(frame, self.state, self.compression is not None)
+                yield frame
+
+    def packets(self):
+        """
+        Yields packet id, data and the offset after the id of every play packet
+        """
+        metrics = self.metrics
+        countdown = 1
+        for frame in self.frames():
+            enabled = metrics.enabled
+            if self.compression is not None:
+                if enabled and (countdown := countdown - 1) <= 0:
+                    countdown = metrics.sample
+                    start = time.perf_counter_ns()
+                    frame = self.compression.decompress(frame)
+                    metrics.decompress.record(time.perf_counter_ns() - start)
+                else:
+                    frame = self.compression.decompress(frame)
+            packet_id, offset = VarInt.decode(frame)
+            if enabled and packet_id < Metrics.PACKET_IDS:
+                index = self.state << 8 | packet_id
+                metrics.received[index] += 1
+                metrics.received_bytes[index] += len(frame)
+            if self.state == State.PLAY:
+                if packet_id == ClientboundKeepAlive.ID:
+                    self.send(ServerboundKeepAlive(ClientboundKeepAlive.decode(frame, offset)[0].keep_alive_id))
+                elif packet_id == PlayDisconnect.ID:
+                    self.disconnect_reason = PlayDisconnect.decode(frame, offset)[0].reason
+                yield packet_id, frame, offset
+            elif packet_id == LoginSuccess.ID:
+                self.state = State.PLAY
+            elif packet_id == SetCompression.ID:
+                threshold = SetCompression.decode(frame, offset)[0].threshold
+                self.compression = Compression(threshold) if threshold >= 0 else None
+            elif packet_id == LoginPluginRequest.ID:
+                self.send(LoginPluginResponse(LoginPluginRequest.decode(frame, offset)[0].message_id, False))
+            elif packet_id == LoginDisconnect.ID:
+                self.disconnect_reason = LoginDisconnect.decode(frame, offset)[0].reason
+                return
+            elif packet_id == EncryptionRequest.ID:
+                self.disconnect_reason = "Online-mode servers are not supported"
+                return
+
+    def run(self) -> str | None:
+        """
+        Dispatches play packets to the handlers until the connection closes, returns the disconnect reason
+        """
+        dispatch = self.dispatcher.dispatch
+        for _, frame, _ in self.packets():
+            dispatch(State.PLAY, frame)
+        return self.disconnect_reason
+
+    def close(self):
+        try:
+            self.writer.flush()
+        except OSError:
+            pass
+        self.socket.close()
+        if self.capture is not None:
+            self.capture.close()
@@ -0,0 +1,214 @@
+"""
+Per-connection metrics
+
+Counters are plain ints in preallocated lists indexed by state and packet id, latencies go into histograms
+with fixed power-of-two buckets, so recording a sample allocates nothing. Queue depths are read from
+callables when a snapshot is taken. Counters see every packet, latencies are timed on one in every sample
+packets so the clock is not read on the hot path. Recording is skipped entirely while enabled is False.
+"""
+
+try:
+    from ..packets.datatypes import VarInt
+    from ..packets.state import State
+except ImportError:
+    from src.packets.datatypes import VarInt
+    from src.packets.state import State
+
+__all__ = ["Metrics", "Histogram"]
+
+def escape_label(value) -> str:
+    """
+    A label value as the Prometheus text format writes it, with backslash, quote and newline escaped
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    """
+    Durations in nanoseconds, bucket 0 is below 512ns and every following bucket doubles, the last is open-ended
+    """
+    __slots__ = ("counts", "total")
+
+    BUCKETS = 24
+    SHIFT = 9
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+
+    def record(self, nanoseconds: int):
+        self.counts[min((nanoseconds >> self.SHIFT).bit_length(), self.BUCKETS - 1)] += 1
+        self.total += nanoseconds
+
+    @classmethod
+    def bounds(cls) -> list[float]:
+        """
+        Upper bound of each bucket in seconds
+        """
+        return [(1 << (cls.SHIFT + i)) / 1e9 for i in range(cls.BUCKETS - 1)] + [float("inf")]
+
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound in seconds of the bucket holding the q-th quantile
+        """
+        target = q * self.count()
+        seen = 0
+        for bound, count in zip(self.bounds(), self.counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+    def reset(self):
+        self.counts[:] = [0] * self.BUCKETS
+        self.total = 0
+
+    def snapshot(self) -> dict:
+        return {"counts": list(self.counts), "sum": self.total / 1e9, "count": self.count()}
+
+class Metrics:
+    PACKET_IDS = 256
+    HISTOGRAMS = ("decompress", "decode", "handler")
+
+    def __init__(self, enabled=True, sample=32):
+        """
+        sample 1 times every packet
+        """
+        self.enabled = enabled
+        self.sample = sample
+        self.queues: dict[str, object] = {}
+        self.reset()
+
+    def reset(self):
+        size = len(State) * self.PACKET_IDS
+        self.received = [0] * size
+        self.received_bytes = [0] * size
+        self.sent = [0] * size
+        self.sent_bytes = [0] * size
+
+        self.decompress = Histogram()
+        self.decode = Histogram()
+        self.handler = Histogram()
+
+        self.reads = 0
+        self.read_bytes = 0
+        self.read_blocked = 0
+        self.writes = 0
+        self.written_bytes = 0
+        self.write_blocked = 0
+
+    def queue(self, name: str, depth):
+        """
+        Reports depth() as a gauge in every snapshot
+        """
+        self.queues[name] = depth
+
+    def packet_in(self, state: State, data, packet_id: int = None):
+        """
+        Counts a received packet from its packet id and data, the id is read from data if not given
+        """
+        if packet_id is None:
+            packet_id = data[0]
+            if packet_id >= 0x80:
+                packet_id = VarInt.decode(data)[0]
+        if 0 <= packet_id < self.PACKET_IDS:
+            index = state << 8 | packet_id
+            self.received[index] += 1
+            self.received_bytes[index] += len(data)
+
+    def packet_out(self, state: State, data, packet_id: int = None):
+        if packet_id is None:
+            packet_id = data[0]
+            if packet_id >= 0x80:
+                packet_id = VarInt.decode(data)[0]
+        if 0 <= packet_id < self.PACKET_IDS:
+            index = state << 8 | packet_id
+            self.sent[index] += 1
+            self.sent_bytes[index] += len(data)
+
+    def read(self, size: int, blocked: int = 0):
+        """
+        One read syscall returning size bytes after blocking for blocked nanoseconds
+        """
+        self.reads += 1
+        self.read_bytes += size
+        self.read_blocked += blocked
+
+    def write(self, size: int, blocked: int = 0):
+        self.writes += 1
+        self.written_bytes += size
+        self.write_blocked += blocked
+
+    def packets(self) -> list[tuple[str, State, int, int, int]]:
+        """
+        (direction, state, packet id, count, bytes) of every packet type seen
+        """
+        rows = []
+        for direction, counts, sizes in (("in", self.received, self.received_bytes), ("out", self.sent, self.sent_bytes)):
+            for index, count in enumerate(counts):
+                if count:
+                    rows.append((direction, State(index >> 8), index & 0xFF, count, sizes[index]))
+        return rows
+
+    def snapshot(self) -> dict:
+        packets = {}
+        for direction, state, packet_id, count, size in self.packets():
+            packets.setdefault(direction, {}).setdefault(state.name, {})[f"0x{packet_id:02X}"] = {"count": count, "bytes": size}
+        return {
+            "packets": packets,
+            "latency": {name: getattr(self, name).snapshot() for name in self.HISTOGRAMS},
+            "bounds": Histogram.bounds()[:-1],
+            "socket": {
+                "reads": self.reads, "read_bytes": self.read_bytes, "read_blocked": self.read_blocked / 1e9,
+                "writes": self.writes, "written_bytes": self.written_bytes, "write_blocked": self.write_blocked / 1e9,
+            },
+            "queues": {name: depth() for name, depth in self.queues.items()},
+        }
+
+    def prometheus(self, labels: dict[str, str] = None, prefix="smoothstone") -> str:
+        """
+        Snapshot in the Prometheus text exposition format
+        """
+        base = ",".join(f'{key}="{escape_label(value)}"' for key, value in (labels or {}).items())
+
+        def label(**extra):
+            pairs = ([base] if base else []) + [f'{key}="{escape_label(value)}"' for key, value in extra.items()]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        packets = [
+            (label(direction=direction, state=state.name, id=f"0x{packet_id:02X}"), count, size)
+            for direction, state, packet_id, count, size in self.packets()
+        ]
+        lines.append(f"# TYPE {prefix}_packets_total counter")
+        lines.extend(f"{prefix}_packets_total{packet} {count}" for packet, count, _ in packets)
+        lines.append(f"# TYPE {prefix}_packet_bytes_total counter")
+        lines.extend(f"{prefix}_packet_bytes_total{packet} {size}" for packet, _, size in packets)
+
+        for name in self.HISTOGRAMS:
+            histogram = getattr(self, name)
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(Histogram.bounds(), histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{label(le='+Inf' if bound == float('inf') else repr(bound))} {cumulative}")
+            lines.append(f"{metric}_sum{label()} {histogram.total / 1e9}")
+            lines.append(f"{metric}_count{label()} {cumulative}")
+
+        for name, value in (
+            ("socket_reads_total", self.reads), ("socket_read_bytes_total", self.read_bytes),
+            ("socket_read_blocked_seconds_total", self.read_blocked / 1e9),
+            ("socket_writes_total", self.writes), ("socket_written_bytes_total", self.written_bytes),
+            ("socket_write_blocked_seconds_total", self.write_blocked / 1e9),
+        ):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name}{label()} {value}")
+
+        if self.queues:
+            lines.append(f"# TYPE {prefix}_queue_depth gauge")
+            for name, depth in self.queues.items():
+                lines.append(f"{prefix}_queue_depth{label(queue=name)} {depth()}")
+        return "\n".join(lines) + "\n"
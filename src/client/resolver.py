@@ -0,0 +1,203 @@
+"""
+Caching name resolution for many connections
+
+Resolves server addresses the way the game does: a host without a port is looked up as an SRV record
+_minecraft._tcp.host first, then the host the record points to (or the host itself) is resolved to an IP
+address. Answers are cached for ttl seconds and failures for negative_ttl. Concurrent lookups of the same name
+share one query, so a scan of thousands of targets on a few hosts asks the resolver a few times.
+
+SRV queries are sent over UDP to the first nameserver in /etc/resolv.conf, there is no SRV lookup on systems
+without one.
+"""
+
+import asyncio
+import random
+import socket
+import struct
+import time
+
+__all__ = ["Resolver", "ResolveError"]
+
+SRV = 33
+IN = 1
+
+class ResolveError(OSError):
+    pass
+
+def nameserver(path="/etc/resolv.conf") -> str | None:
+    try:
+        with open(path) as config:
+            for line in config:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    return fields[1]
+    except OSError:
+        pass
+    return None
+
+class _Query(asyncio.DatagramProtocol):
+    def __init__(self, answer: asyncio.Future):
+        self.answer = answer
+
+    def datagram_received(self, data: bytes, address):
+        if not self.answer.done():
+            self.answer.set_result(data)
+
+    def error_received(self, exc: Exception):
+        if not self.answer.done():
+            self.answer.set_exception(exc)
+
+class Resolver:
+    DEFAULT_PORT = 25565
+
+    def __init__(self, ttl=300.0, negative_ttl=30.0, timeout=2.0, server: str = None, server_port=53, srv=True):
+        """
+        server is the DNS server SRV queries go to, the system's by default
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.server = nameserver() if server is None and srv else server
+        self.server_port = server_port
+        self.srv = srv and self.server is not None
+
+        self.cache: dict[tuple, tuple[float, object]] = {}
+        self.pending: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int = None) -> tuple[str, int]:
+        """
+        The IP address and port to connect to, SRV records are only used when port is None
+        """
+        if port is None and self.srv:
+            host, port = await self.cached(("srv", host), self.lookup_srv, host)
+        port = self.DEFAULT_PORT if port is None else port
+        return await self.cached(("address", host), self.lookup_address, host), port
+
+    async def cached(self, key: tuple, lookup, *args):
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return self.unwrap(entry[1])
+        # The lookup runs as its own task so a caller that times out does not cancel it for the others
+        if (task := self.pending.get(key)) is None:
+            self.misses += 1
+            task = self.pending[key] = asyncio.create_task(self.store(key, lookup, *args))
+        else:
+            self.hits += 1
+        return self.unwrap(await asyncio.shield(task))
+
+    async def store(self, key: tuple, lookup, *args):
+        try:
+            value = await lookup(*args)
+            ttl = self.ttl
+        # struct.error and IndexError come from truncated DNS answers
+        except (OSError, asyncio.TimeoutError, ValueError, struct.error, IndexError) as e:
+            value = ResolveError(f"Could not resolve {args[0]}: {e}")
+            ttl = self.negative_ttl
+        finally:
+            del self.pending[key]
+        self.cache[key] = (time.monotonic() + ttl, value)
+        return value
+
+    @staticmethod
+    def unwrap(value):
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    async def lookup_address(self, host: str) -> str:
+        loop = asyncio.get_running_loop()
+        addresses = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout)
+        if not addresses:
+            raise ResolveError(f"No addresses for {host}")
+        return addresses[0][4][0]
+
+    async def lookup_srv(self, host: str) -> tuple[str, int | None]:
+        """
+        The target and port of the preferred _minecraft._tcp record, or host and None if there is none
+        """
+        try:
+            socket.inet_pton(socket.AF_INET6 if ":" in host else socket.AF_INET, host)
+            return host, None
+        except OSError:
+            pass
+        if host == "localhost" or "." not in host:
+            return host, None
+
+        loop = asyncio.get_running_loop()
+        answer = loop.create_future()
+        query_id = random.getrandbits(16)
+        transport, _ = await loop.create_datagram_endpoint(lambda: _Query(answer), remote_addr=(self.server, self.server_port))
+        try:
+            transport.sendto(self.query(query_id, f"_minecraft._tcp.{host}"))
+            data = await asyncio.wait_for(answer, self.timeout)
+        except asyncio.TimeoutError:
+            # No answer is treated as no record, the address lookup still decides whether the host exists
+            return host, None
+        finally:
+            transport.close()
+        records = self.parse(data, query_id)
+        if not records:
+            return host, None
+        priority = min(record[0] for record in records)
+        preferred = [record for record in records if record[0] == priority]
+        _, _, port, target = max(preferred, key=lambda record: record[1])
+        return target.rstrip("."), port
+
+    @staticmethod
+    def query(query_id: int, name: str) -> bytes:
+        question = b"".join(bytes((len(label),)) + label.encode("idna") for label in name.rstrip(".").split("."))
+        return struct.pack(">HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + question + b"\x00" + struct.pack(">HH", SRV, IN)
+
+    @classmethod
+    def parse(cls, data: bytes, query_id: int) -> list[tuple[int, int, int, str]]:
+        """
+        (priority, weight, port, target) of every SRV answer
+        """
+        answer_id, flags, questions, answers, _, _ = struct.unpack_from(">HHHHHH", data)
+        if answer_id != query_id:
+            raise ValueError("DNS answer to another query")
+        # Name errors (NXDOMAIN) just mean there is no record
+        if flags & 0xF not in (0, 3):
+            raise ValueError(f"DNS error {flags & 0xF}")
+        offset = 12
+        for _ in range(questions):
+            _, offset = cls.name(data, offset)
+            offset += 4
+        records = []
+        for _ in range(answers):
+            _, offset = cls.name(data, offset)
+            record_type, _, _, length = struct.unpack_from(">HHIH", data, offset)
+            offset += 10
+            if record_type == SRV:
+                priority, weight, port = struct.unpack_from(">HHH", data, offset)
+                target, _ = cls.name(data, offset + 6)
+                records.append((priority, weight, port, target))
+            offset += length
+        return records
+
+    @staticmethod
+    def name(data: bytes, offset: int) -> tuple[str, int]:
+        """
+        Reads a possibly compressed domain name, returns it and the offset after it where it started
+        """
+        labels = []
+        end = None
+        for _ in range(128):
+            length = data[offset]
+            if length & 0xC0 == 0xC0:
+                if end is None:
+                    end = offset + 2
+                offset = (length & 0x3F) << 8 | data[offset + 1]
+                continue
+            offset += 1
+            if length == 0:
+                return ".".join(labels), offset if end is None else end
+            labels.append(data[offset:offset + length].decode("ascii", "replace"))
+            offset += length
+        raise ValueError("DNS name pointers loop")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self.cache)}
@@ -0,0 +1,326 @@
+"""
+Server list pings for many servers at once
+
+A StatusPinger queries servers the way the multiplayer screen does: a handshake to the status state, a status
+request answered with the server's JSON description, then a ping whose pong gives the latency. Servers that
+connect but do not speak that protocol (anything before 1.7) are asked again with the legacy 0xFE ping.
+
+scan() runs up to concurrency pings at a time and yields results as they finish, pulling targets lazily, so
+neither the targets nor the results have to fit in memory. Every stage has its own timeout and names are
+resolved through a shared caching Resolver.
+
+    pinger = StatusPinger(concurrency=500)
+    async for result in pinger.scan(["mc.example.net", "10.0.0.5:25566"]):
+        print(result.target, result.latency, result.players_online, result.motd)
+
+Run from the repository root with `python -m src.client.status targets.txt [--concurrency 500]`
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+try:
+    from .resolver import Resolver
+    from ..packets.datatypes.codec import read_varint
+    from ..packets.frame import FrameReader
+    from ..packets.handshaking import Handshake
+    from ..packets.state import State, PROTOCOL_VERSION
+    from ..packets.status import *
+except ImportError:
+    from src.client.resolver import Resolver
+    from src.packets.datatypes.codec import read_varint
+    from src.packets.frame import FrameReader
+    from src.packets.handshaking import Handshake
+    from src.packets.state import State, PROTOCOL_VERSION
+    from src.packets.status import *
+
+__all__ = ["StatusPinger", "StatusResult", "ProtocolError"]
+
+class ProtocolError(ValueError):
+    """
+    The server answered with something that is not a status response
+    """
+
+@dataclass
+class StatusResult:
+    """
+    stage is where a failed ping stopped: target, resolve, connect, status, ping or legacy
+    """
+    target: str
+    host: str = None
+    port: int = None
+    ok: bool = False
+    legacy: bool = False
+    latency: float = None
+    version: str = None
+    protocol: int = None
+    players_online: int = None
+    players_max: int = None
+    motd: str = None
+    error: str = None
+    stage: str = None
+    elapsed: float = 0.0
+
+def split_target(target: str) -> tuple[str, int | None]:
+    """
+    host, host:port, [v6]:port, raises ValueError for anything else
+    """
+    if target.startswith("["):
+        host, bracket, rest = target[1:].partition("]")
+        if not bracket or rest and not rest.startswith(":"):
+            raise ValueError(f"Bad address in {target!r}")
+        port = rest[1:] if rest else None
+    elif target.count(":") == 1:
+        host, port = target.split(":")
+    else:
+        host, port = target, None
+    if not host:
+        raise ValueError(f"No host in {target!r}")
+    if port is None:
+        return host, None
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Bad port in {target!r}")
+    return host, int(port)
+
+def plain_text(component) -> str:
+    """
+    The text of a chat component, formatting dropped
+    """
+    if isinstance(component, str):
+        return component
+    if isinstance(component, list):
+        return "".join(map(plain_text, component))
+    if isinstance(component, dict):
+        return str(component.get("text", "")) + "".join(map(plain_text, component.get("extra", ())))
+    return ""
+
+class StatusPinger:
+    # Status responses are one String of at most 32767 characters
+    MAX_FRAME = 3 * 32767 + 8
+    LEGACY_PROTOCOL = 74
+
+    def __init__(self, concurrency=256, resolve_timeout=3.0, connect_timeout=3.0, status_timeout=3.0, ping_timeout=3.0,
+                 legacy=True, protocol_version=PROTOCOL_VERSION, resolver: Resolver = None):
+        self.concurrency = concurrency
+        self.resolve_timeout = resolve_timeout
+        self.connect_timeout = connect_timeout
+        self.status_timeout = status_timeout
+        self.ping_timeout = ping_timeout
+        self.legacy = legacy
+        self.protocol_version = protocol_version
+        self.resolver = Resolver(timeout=resolve_timeout) if resolver is None else resolver
+
+    async def scan(self, targets):
+        """
+        Yields a StatusResult for every target, in the order they finish. targets is any iterable of host,
+        host:port or (host, port)
+        """
+        targets = iter(targets)
+        results = asyncio.Queue(self.concurrency)
+        done = object()
+        # Checked as well as cancelling the workers, wait_for swallows a cancellation that arrives as the
+        # ping finishes and the worker would then wait on a full queue forever
+        stopped = asyncio.Event()
+
+        async def work():
+            try:
+                for target in targets:
+                    result = await self.ping_target(target)
+                    if stopped.is_set():
+                        return
+                    await results.put(result)
+            except Exception as e:
+                result = e
+            else:
+                result = done
+            if not stopped.is_set():
+                await results.put(result)
+
+        workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        try:
+            running = len(workers)
+            while running:
+                result = await results.get()
+                if result is done:
+                    running -= 1
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    yield result
+        finally:
+            stopped.set()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def ping_target(self, target) -> StatusResult:
+        """
+        Pings a host, host:port or (host, port) target, one that does not parse fails at the target stage
+        """
+        if isinstance(target, tuple):
+            return await self.ping(*target)
+        try:
+            host, port = split_target(target)
+        except ValueError as e:
+            return StatusResult(target, error=f"ValueError: {e}", stage="target")
+        return await self.ping(host, port, target=target)
+
+    async def ping(self, host: str, port: int = None, target: str = None) -> StatusResult:
+        """
+        Pings one server, the result says how far it got instead of raising
+        """
+        result = StatusResult(target or (host if port is None else f"{host}:{port}"))
+        start = time.perf_counter()
+        stage = "resolve"
+        writer = None
+        try:
+            result.host, result.port = await asyncio.wait_for(self.resolver.resolve(host, port), self.resolve_timeout)
+            stage = "connect"
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(result.host, result.port), self.connect_timeout)
+            stage = "status"
+            try:
+                await self.status(reader, writer, host, result)
+                stage = "ping"
+                await self.ping_pong(reader, writer, result)
+            except (ProtocolError, asyncio.IncompleteReadError, ConnectionResetError):
+                if stage != "status" or not self.legacy:
+                    raise
+                writer.close()
+                stage = "legacy"
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(result.host, result.port), self.connect_timeout)
+                await asyncio.wait_for(self.legacy_ping(reader, writer, host, result), self.status_timeout)
+            result.ok = True
+        except asyncio.TimeoutError:
+            result.error = f"{stage} timed out"
+            result.stage = stage
+        # ValueError covers ProtocolError and bad text, OverflowError a port out of range
+        except (OSError, ValueError, OverflowError, asyncio.IncompleteReadError) as e:
+            result.error = f"{e.__class__.__name__}: {e}" if str(e) else e.__class__.__name__
+            result.stage = stage
+        finally:
+            if writer is not None:
+                writer.close()
+            result.elapsed = time.perf_counter() - start
+        return result
+
+    async def status(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, result: StatusResult):
+        writer.write(FrameReader.frame(Handshake(self.protocol_version, host, result.port or 0, State.STATUS).serialize())
+                     + FrameReader.frame(StatusRequest().serialize()))
+        frame = await asyncio.wait_for(self.read_frame(reader), self.status_timeout)
+        try:
+            packet_id, offset = read_varint(frame)
+            if packet_id != StatusResponse.ID:
+                raise ProtocolError(f"Expected a status response, got packet 0x{packet_id:02X}")
+            response = json.loads(StatusResponse.decode(frame, offset)[0].json_response)
+        except ProtocolError:
+            raise
+        except (ValueError, IndexError, RuntimeError) as e:
+            raise ProtocolError(f"Malformed status response: {e}") from None
+        if not isinstance(response, dict):
+            raise ProtocolError("Status response is not an object")
+        version = response.get("version")
+        version = version if isinstance(version, dict) else {}
+        players = response.get("players")
+        players = players if isinstance(players, dict) else {}
+        result.version = version.get("name")
+        result.protocol = version.get("protocol")
+        result.players_online = players.get("online")
+        result.players_max = players.get("max")
+        result.motd = plain_text(response.get("description", ""))
+
+    async def ping_pong(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, result: StatusResult):
+        payload = time.perf_counter_ns()
+        writer.write(FrameReader.frame(PingRequest(payload).serialize()))
+        frame = await asyncio.wait_for(self.read_frame(reader), self.ping_timeout)
+        result.latency = (time.perf_counter_ns() - payload) / 1e6
+        try:
+            packet_id, offset = read_varint(frame)
+            matches = packet_id == PongResponse.ID and PongResponse.decode(frame, offset)[0].payload == payload
+        except (IndexError, RuntimeError, struct.error):
+            matches = False
+        if not matches:
+            raise ProtocolError("Pong does not match the ping")
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> bytes:
+        length = 0
+        for shift in range(0, 35, 7):
+            byte = (await reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+        else:
+            raise ProtocolError("Frame length is too long")
+        if not 0 < length <= self.MAX_FRAME:
+            raise ProtocolError(f"Frame of {length} bytes")
+        return await reader.readexactly(length)
+
+    async def legacy_ping(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, result: StatusResult):
+        """
+        The ping of 1.6 clients, which 1.4 to 1.6 servers answer with a kick message holding the status and
+        older ones with just the MOTD and player counts
+        """
+        start = time.perf_counter_ns()
+        hostname = host.encode("utf-16-be")
+        channel = "MC|PingHost".encode("utf-16-be")
+        writer.write(b"\xfe\x01\xfa" + struct.pack(">H", len(channel) // 2) + channel
+                     + struct.pack(">HBH", 7 + len(hostname), self.LEGACY_PROTOCOL, len(hostname) // 2) + hostname
+                     + struct.pack(">i", result.port or 0))
+        header = await reader.readexactly(3)
+        if header[0] != 0xFF:
+            raise ProtocolError(f"Expected a legacy kick, got 0x{header[0]:02X}")
+        length = struct.unpack(">H", header[1:])[0]
+        message = (await reader.readexactly(2 * length)).decode("utf-16-be")
+        result.latency = (time.perf_counter_ns() - start) / 1e6
+        result.legacy = True
+        try:
+            if message.startswith("§1\x00"):
+                fields = message[3:].split("\x00")
+                if len(fields) < 5:
+                    raise ProtocolError("Legacy status has too few fields")
+                result.protocol, result.version, result.motd = int(fields[0]), fields[1], fields[2]
+                result.players_online, result.players_max = int(fields[3]), int(fields[4])
+            else:
+                fields = message.split("§")
+                if len(fields) < 3:
+                    raise ProtocolError("Legacy status has too few fields")
+                result.motd = "§".join(fields[:-2])
+                result.players_online, result.players_max = int(fields[-2]), int(fields[-1])
+        except ProtocolError:
+            raise
+        except ValueError:
+            raise ProtocolError(f"Legacy status has a field that is not a number: {message!r}") from None
+
+def main():
+    parser = argparse.ArgumentParser(description="Pings every server listed in a file, one host[:port] per line")
+    parser.add_argument("targets", help="file of targets, - for stdin")
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=3.0, help="seconds for each stage")
+    parser.add_argument("--no-legacy", action="store_true", help="do not fall back to the legacy ping")
+    args = parser.parse_args()
+
+    def targets():
+        with (sys.stdin if args.targets == "-" else open(args.targets)) as lines:
+            for line in lines:
+                if line := line.strip():
+                    yield line
+
+    async def run():
+        pinger = StatusPinger(args.concurrency, args.timeout, args.timeout, args.timeout, args.timeout, not args.no_legacy)
+        start = time.perf_counter()
+        count = 0
+        async for result in pinger.scan(targets()):
+            count += 1
+            print(json.dumps(asdict(result)))
+        elapsed = time.perf_counter() - start
+        print(json.dumps({"targets": count, "seconds": elapsed, "targets_per_second": count / elapsed,
+                          "resolver": pinger.resolver.stats()}))
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
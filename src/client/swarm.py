@@ -0,0 +1,331 @@
+"""
+Bot swarms for load testing
+
+A Swarm shards profiles across one worker process per core. Each worker runs its share as AsyncClients on
+one event loop and ramps them up on a schedule shared by every worker, so bot i connects ramp * i seconds
+after the start whichever process it is in. Workers send a WorkerReport to the parent over a pipe every
+interval and once more when they stop. Profiles are authenticated once in the parent and pickled to the
+workers, which never log in to Microsoft themselves.
+
+    swarm = Swarm([Profile.offline(f"Bot{i}") for i in range(500)], "localhost", ramp=0.02)
+    summary = swarm.run(duration=60, on_report=print)
+
+Run from the repository root with `python -m src.client.swarm host[:port] [--bots 100] [--duration 60]`
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection, wait
+
+try:
+    from .async_client import AsyncClient
+    from .metrics import Histogram
+    from ..auth.profile import Profile
+except ImportError:
+    from src.client.async_client import AsyncClient
+    from src.client.metrics import Histogram
+    from src.auth.profile import Profile
+
+__all__ = ["Swarm", "WorkerReport"]
+
+STOP = "stop"
+
+@dataclass
+class WorkerReport:
+    """
+    Totals of one worker since it started, packets and bytes are received play traffic
+    """
+    worker: int
+    time: float
+    bots: int
+    connecting: int = 0
+    connected: int = 0
+    failed: int = 0
+    closed: int = 0
+    packets: int = 0
+    bytes: int = 0
+    connect_latency: list[int] = field(default_factory=lambda: [0] * Histogram.BUCKETS)
+    disconnects: dict[str, int] = field(default_factory=dict)
+    final: bool = False
+    packets_per_second: float = 0.0
+
+class _Worker:
+    """
+    Runs in the worker process
+    """
+    def __init__(self, worker: int, bots: list[tuple[int, Profile]], server: str, port: int,
+                 started: float, ramp: float, timeout: float, interval: float, connection: Connection):
+        self.worker = worker
+        self.bots = bots
+        self.server = server
+        self.port = port
+        self.started = started
+        self.ramp = ramp
+        self.timeout = timeout
+        self.interval = interval
+        self.connection = connection
+
+        self.clients: set[AsyncClient] = set()
+        self.latency = Histogram()
+        self.disconnects = Counter()
+        self.connecting = 0
+        self.failed = 0
+        self.closed = 0
+        # Traffic of clients that are gone, live clients are summed when reporting
+        self.packets = 0
+        self.bytes = 0
+        self.stopping: asyncio.Event = None
+
+    def report(self, final=False) -> WorkerReport:
+        packets = self.packets + sum(sum(client.metrics.received) for client in self.clients)
+        received = self.bytes + sum(sum(client.metrics.received_bytes) for client in self.clients)
+        return WorkerReport(self.worker, time.time(), len(self.bots), self.connecting, len(self.clients), self.failed,
+                            self.closed, packets, received, list(self.latency.counts), dict(self.disconnects), final)
+
+    def receive(self):
+        try:
+            message = self.connection.recv()
+        except (EOFError, OSError):
+            # The parent is gone
+            message = STOP
+        if message == STOP:
+            self.stopping.set()
+
+    async def bot(self, index: int, profile: Profile):
+        delay = self.started + self.ramp * index - time.time()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(self.stopping.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+        client = AsyncClient(profile)
+        self.connecting += 1
+        start = time.perf_counter_ns()
+        try:
+            await client.connect(self.server, self.port, self.timeout)
+        except Exception as e:
+            self.failed += 1
+            self.disconnects[client.disconnect_reason or f"{e.__class__.__name__}: {e}"] += 1
+            client.close()
+            return
+        finally:
+            self.connecting -= 1
+        self.latency.record(time.perf_counter_ns() - start)
+
+        self.clients.add(client)
+        try:
+            reason = await client.closed
+        finally:
+            self.clients.discard(client)
+            self.packets += sum(client.metrics.received)
+            self.bytes += sum(client.metrics.received_bytes)
+        self.closed += 1
+        self.disconnects[reason or "Connection closed"] += 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        loop.add_reader(self.connection.fileno(), self.receive)
+        bots = [asyncio.create_task(self.bot(index, profile)) for index, profile in self.bots]
+        everyone = asyncio.gather(*bots, return_exceptions=True)
+
+        try:
+            while not self.stopping.is_set() and not everyone.done():
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.connection.send(self.report())
+        finally:
+            loop.remove_reader(self.connection.fileno())
+            for client in list(self.clients):
+                client.disconnect("Swarm stopped")
+            pending = [task for task in bots if not task.done()]
+            if pending:
+                _, still_running = await asyncio.wait(pending, timeout=self.timeout)
+                for task in still_running:
+                    task.cancel()
+            await asyncio.gather(*bots, return_exceptions=True)
+        try:
+            self.connection.send(self.report(final=True))
+        except OSError:
+            pass
+
+def _work(*args):
+    """
+    Worker process entry point, Ctrl-C goes to the parent, which stops the workers over their pipes
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = _Worker(*args)
+    try:
+        asyncio.run(worker.run())
+    finally:
+        worker.connection.close()
+
+class Swarm:
+    def __init__(self, profiles: list[Profile], server: str, port=25565, workers: int = None, ramp=0.05,
+                 timeout: float = 30, interval: float = 1.0, start_method="spawn"):
+        """
+        Bot i connects ramp * i seconds after the swarm starts, timeout applies to each login and to stopping
+        """
+        self.profiles = profiles
+        self.server = server
+        self.port = port
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(profiles)))
+        self.ramp = ramp
+        self.timeout = timeout
+        self.interval = interval
+        self.context = multiprocessing.get_context(start_method)
+
+        self.processes: list[multiprocessing.Process] = []
+        self.connections: dict[Connection, int] = {}
+        self.reports: dict[int, WorkerReport] = {}
+        self.started: float = None
+
+    @classmethod
+    def authenticate(cls, accounts: list[str], server: str, port=25565, pool=None, **kwargs) -> "Swarm":
+        """
+        Logs every account in once here in the parent with an AuthPool, failed accounts are left out
+        """
+        if pool is None:
+            try:
+                from ..auth.pool import AuthPool
+            except ImportError:
+                from src.auth.pool import AuthPool
+            pool = AuthPool()
+        profiles = [result.profile for result in pool.authenticate(accounts) if result.profile is not None]
+        return cls(profiles, server, port, **kwargs)
+
+    def start(self):
+        # Every worker ramps against the same clock, leaving a moment for the processes to start
+        self.started = time.time() + 0.5
+        for worker in range(self.workers):
+            bots = [(index, profile) for index, profile in enumerate(self.profiles) if index % self.workers == worker]
+            parent, child = self.context.Pipe()
+            process = self.context.Process(
+                target=_work, name=f"Swarm-{worker}", daemon=True,
+                args=(worker, bots, self.server, self.port, self.started, self.ramp, self.timeout, self.interval, child),
+            )
+            process.start()
+            child.close()
+            self.processes.append(process)
+            self.connections[parent] = worker
+
+    def poll(self, timeout: float = None) -> list[WorkerReport]:
+        """
+        Waits up to timeout for reports and returns them, with packets_per_second since the worker's last report
+        """
+        received = []
+        for connection in wait(list(self.connections), timeout):
+            try:
+                report: WorkerReport = connection.recv()
+            except (EOFError, OSError):
+                # The worker exited, with or without its final report
+                del self.connections[connection]
+                connection.close()
+                continue
+            if (previous := self.reports.get(report.worker)) is not None and report.time > previous.time:
+                report.packets_per_second = (report.packets - previous.packets) / (report.time - previous.time)
+            self.reports[report.worker] = report
+            received.append(report)
+        return received
+
+    def stop(self):
+        """
+        Asks every worker to disconnect its bots, collects the final reports and joins the processes
+        """
+        for connection in self.connections:
+            try:
+                connection.send(STOP)
+            except OSError:
+                pass
+        deadline = time.monotonic() + self.timeout + self.interval + 5
+        while self.connections and (remaining := deadline - time.monotonic()) > 0:
+            self.poll(remaining)
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for connection in self.connections:
+            connection.close()
+        self.connections.clear()
+
+    def run(self, duration: float = None, on_report=None) -> dict:
+        """
+        Runs until duration seconds have passed, every worker's bots are gone or Ctrl-C, then stops and summarizes
+        """
+        self.start()
+        end = None if duration is None else time.monotonic() + duration
+        try:
+            while self.connections:
+                timeout = self.interval if end is None else min(self.interval, end - time.monotonic())
+                if timeout <= 0:
+                    break
+                for report in self.poll(timeout):
+                    if on_report is not None:
+                        on_report(report)
+                if self.reports and all(report.final for report in self.reports.values()):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        return self.summary()
+
+    def summary(self) -> dict:
+        """
+        Totals over the latest report of every worker
+        """
+        reports = list(self.reports.values())
+        latency = Histogram()
+        disconnects = Counter()
+        for report in reports:
+            latency.counts = [a + b for a, b in zip(latency.counts, report.connect_latency)]
+            disconnects.update(report.disconnects)
+        elapsed = max((report.time for report in reports), default=self.started or 0) - (self.started or 0)
+        packets = sum(report.packets for report in reports)
+        return {
+            "workers": self.workers,
+            "bots": len(self.profiles),
+            "connected": sum(report.connected for report in reports),
+            "failed": sum(report.failed for report in reports),
+            "closed": sum(report.closed for report in reports),
+            "packets": packets,
+            "bytes": sum(report.bytes for report in reports),
+            "packets_per_second": packets / elapsed if elapsed > 0 else 0.0,
+            "connect_latency": {"p50": latency.quantile(0.5), "p99": latency.quantile(0.99), "logins": latency.count()},
+            "disconnects": dict(disconnects.most_common()),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Connects a swarm of offline-mode bots to a server")
+    parser.add_argument("server", help="host or host:port")
+    parser.add_argument("--bots", type=int, default=100)
+    parser.add_argument("--prefix", default="Bot", help="bot names are the prefix followed by a number")
+    parser.add_argument("--workers", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--ramp", type=float, default=0.05, help="seconds between connects")
+    parser.add_argument("--duration", type=float, help="seconds to run for, until Ctrl-C by default")
+    args = parser.parse_args()
+
+    host, _, port = args.server.partition(":")
+    profiles = [Profile.offline(f"{args.prefix}{i}") for i in range(args.bots)]
+    swarm = Swarm(profiles, host, int(port or 25565), args.workers, args.ramp)
+
+    def progress(report: WorkerReport):
+        print(f"worker {report.worker}: {report.connected}/{report.bots} connected, {report.failed} failed, "
+              f"{report.packets_per_second:,.0f} packets/s")
+
+    for key, value in swarm.run(args.duration, progress).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Outgoing frame scheduling for blocking sockets
+
+Frames are queued as their length prefix and data and written together with one sendmsg call, so a tick's
+packets cost one syscall and are never joined into a new buffer. Writes never block: whatever the kernel does
+not take stays queued, with a partly written frame kept in front. Urgent frames (keep alives, teleport
+confirmations) are written before the bulk queue, and straight away. Past high_water queued bytes, queue()
+blocks until the socket has taken half of them.
+
+The socket must be in blocking mode without a timeout, a timeout makes Python retry sends that would block.
+"""
+
+import os
+import select
+import socket
+import time
+from collections import deque
+
+try:
+    from .metrics import Metrics
+    from ..packets.datatypes.codec import encode_varint
+except ImportError:
+    from src.client.metrics import Metrics
+    from src.packets.datatypes.codec import encode_varint
+
+__all__ = ["WriteScheduler"]
+
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+class WriteScheduler:
+    def __init__(self, sock: socket.socket, metrics: Metrics = None, tick=0.05, high_water=1 << 20):
+        """
+        Queued frames are flushed once tick seconds have passed since the last flush, on flush() and straight
+        away for urgent ones
+        """
+        self.socket = sock
+        self.metrics = metrics
+        self.tick = tick
+        self.high_water = high_water
+
+        # What is left of a frame that has started going out, it goes before anything else
+        self.partial: list[memoryview] = []
+        self.urgent: deque[tuple[bytes, bytes]] = deque()
+        self.bulk: deque[tuple[bytes, bytes]] = deque()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        # Flushes that left bytes queued because the kernel buffer was full
+        self.full = 0
+        if metrics is not None:
+            metrics.queue("write_queue", self.__len__)
+
+    def __len__(self):
+        """
+        Number of queued bytes
+        """
+        return self.pending
+
+    def queue(self, data: bytes, urgent=False):
+        """
+        Queues a frame for the packet id and data
+        """
+        prefix = encode_varint(len(data))
+        self.pending += len(prefix) + len(data)
+        if urgent:
+            self.urgent.append((prefix, data))
+            self.flush()
+            return
+        self.bulk.append((prefix, data))
+        if time.monotonic() - self.last_flush >= self.tick:
+            self.flush()
+        if self.pending > self.high_water:
+            self.drain(self.high_water // 2)
+
+    def buffers(self) -> list:
+        """
+        Up to IOV_MAX buffers in the order they go out
+        """
+        buffers = list(self.partial)
+        for queue in (self.urgent, self.bulk):
+            for frame in queue:
+                if len(buffers) >= IOV_MAX - 1:
+                    return buffers
+                buffers += frame
+        return buffers
+
+    def consume(self, sent: int):
+        """
+        Drops sent bytes from the front of the queues
+        """
+        if sent == self.pending:
+            self.pending = 0
+            self.partial = []
+            self.urgent.clear()
+            self.bulk.clear()
+            return
+        self.pending -= sent
+        partial = self.partial
+        while partial and sent >= len(partial[0]):
+            sent -= len(partial.pop(0))
+        if partial:
+            partial[0] = partial[0][sent:]
+            return
+        for queue in (self.urgent, self.bulk):
+            while queue and sent:
+                prefix, data = queue.popleft()
+                if sent >= len(prefix) + len(data):
+                    sent -= len(prefix) + len(data)
+                elif sent < len(prefix):
+                    self.partial = [memoryview(prefix)[sent:], memoryview(data)]
+                    return
+                else:
+                    self.partial = [memoryview(data)[sent - len(prefix):]]
+                    return
+
+    def flush(self) -> bool:
+        """
+        Writes as much as the kernel takes without blocking, returns whether everything was written
+        """
+        self.last_flush = time.monotonic()
+        metrics = self.metrics
+        sock = self.socket
+        while self.pending:
+            buffers = self.buffers()
+            start = time.perf_counter_ns()
+            try:
+                if MSG_DONTWAIT:
+                    sent = sock.sendmsg(buffers, (), MSG_DONTWAIT)
+                else:
+                    sent = sock.send(b"".join(buffers))
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            if metrics is not None and metrics.enabled:
+                metrics.write(sent, time.perf_counter_ns() - start)
+            self.consume(sent)
+            # Otherwise there were more than IOV_MAX buffers, and the rest go in the next call
+            if self.pending and sent < sum(map(len, buffers)):
+                self.full += 1
+                return False
+        return True
+
+    def drain(self, limit=0, timeout: float = None):
+        """
+        Blocks until at most limit bytes are queued, raises TimeoutError if that takes longer than timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.flush() and self.pending > limit:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"{self.pending} bytes still queued")
+            select.select([], [self.socket], [], remaining)
+
+    def wait(self):
+        """
+        Call before blocking on a read: flushes, and if the kernel buffer is full waits until the socket is
+        readable while writing what it takes in the meantime, so neither side waits on the other
+        """
+        if self.flush():
+            return
+        while self.pending:
+            readable, writable, _ = select.select([self.socket], [self.socket], [])
+            if writable:
+                self.flush()
+            if readable:
+                return
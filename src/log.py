@@ -1,41 +1,188 @@
 """
 Simple logging module
+
+Calls below the logger's level return before doing any work, and messages take %-style arguments that are
+only formatted when the record is written. Records go onto a queue drained by one background thread, which
+batches writes and flushes on a timer and at exit. Loggers with the same name share one file.
+Arguments are formatted on the writer thread, so don't mutate them after logging.
 """
 
+import atexit
 import os
 import pathlib
+import queue
+import sys
+import threading
+import time
+
+__all__ = ["logger", "Logger", "DEBUG", "INFO", "WARNING", "ERROR", "flush"]
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+COLORS = {DEBUG: "\u001B[37m", INFO: "\u001B[93m", WARNING: "\u001B[33m", ERROR: "\u001B[91m"}
+
+def default_level() -> int:
+    level = os.environ.get("LOGGING_LEVEL", "INFO").upper()
+    return int(level) if level.isdigit() else {name: value for value, name in LEVEL_NAMES.items()}.get(level, INFO)
+
+# Queued by stop(), the writer thread closes every file when it gets to it
+_CLOSE = object()
+
+class _Writer:
+    """
+    Background thread that owns every log file, only it opens, writes and closes them
+    """
+    FLUSH_INTERVAL = 0.5
+    BATCH_SIZE = 1024
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.files: dict[pathlib.Path, object] = {}
+        # Every file opened so far, ones closed by stop() are appended to when reopened instead of truncated
+        self.opened: set[pathlib.Path] = set()
+        self.flushed = threading.Condition()
+        self.pending = 0
+        self.thread = threading.Thread(target=self.run, name="SmoothStone.log", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def put(self, record):
+        self.queue.put(record)
+
+    def open(self, path: pathlib.Path):
+        if (file := self.files.get(path)) is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            file = self.files[path] = open(path, "a" if path in self.opened else "w")
+            self.opened.add(path)
+        return file
+
+    def write(self, batch: list):
+        stdout = []
+        for record in batch:
+            if record is None:
+                continue
+            if record is _CLOSE:
+                self.close()
+                continue
+            logger, level, message, args = record
+            try:
+                text = f"[{LEVEL_NAMES.get(level, level)}] {logger.name}: {message % args if args else message}"
+            except Exception as e:
+                text = f"[{LEVEL_NAMES.get(level, level)}] {logger.name}: {message!r} {args!r} (formatting failed: {e})"
+            if logger.print:
+                stdout.append(COLORS.get(level, "") + text + "\u001B[0m\n")
+            if logger.file_path is not None:
+                self.open(logger.file_path).write(text + "\n")
+        if stdout:
+            sys.stdout.write("".join(stdout))
+
+    def flush(self):
+        for file in self.files.values():
+            file.flush()
+        sys.stdout.flush()
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
 
-__all__ = ["logger", "Logger"]
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.FLUSH_INTERVAL))
+                while len(batch) < self.BATCH_SIZE:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                if batch:
+                    self.write(batch)
+                if None in batch or time.monotonic() - last_flush >= self.FLUSH_INTERVAL:
+                    self.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                print(f"SmoothStone logging failed: {e.__class__.__name__}: {e}", file=sys.stderr)
+
+            with self.flushed:
+                self.pending -= batch.count(None)
+                self.flushed.notify_all()
+
+    def sync(self, timeout: float = None):
+        """
+        Waits until everything queued so far is written and flushed
+        """
+        with self.flushed:
+            self.pending += 1
+            self.queue.put(None)
+            self.flushed.wait_for(lambda: self.pending == 0, timeout)
+
+    def stop(self):
+        """
+        Writes what is queued and closes the files, records logged afterwards reopen theirs for appending
+        """
+        if self.thread.is_alive():
+            self.queue.put(_CLOSE)
+            self.sync(5)
+
+_writer: _Writer = None
+_writer_lock = threading.Lock()
+
+def _get_writer() -> _Writer:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _Writer()
+    return _writer
+
+def flush(timeout: float = None):
+    """
+    Blocks until every record logged so far has been written
+    """
+    if _writer is not None:
+        _writer.sync(timeout)
 
 class Logger:
-    def __init__(self, name, print=False, write_file=True, directory: pathlib.Path =None):
+    def __init__(self, name, print=False, write_file=True, directory: pathlib.Path =None, level: int = None):
         self.name = name
         self.print = print
         self.write_file = write_file
+        self.level = default_level() if level is None else level
+        self.file_path = None
         if self.write_file:
             if not directory:
                 directory = pathlib.Path(os.environ.get("LOGGING_DIRECTORY", os.path.join(os.getcwd(), "logs")))
-            self.file_path = directory / f"{name}.txt"
-            if not self.file_path.parent.exists():
-                self.file_path.parent.mkdir()
-            self.file = open(self.file_path, "w+")
-
-    def info(self, message):
-        msg = f"[INFO] {self.name}: {message}"
-        if self.print:
-            print("\u001B[93m" + msg + "\u001B[0m")
-        if self.write_file:
-            self.file.write(msg + "\n")
+            self.file_path = pathlib.Path(directory) / f"{name}.txt"
 
-    def error(self, message):
-        msg = f"[ERROR] {self.name}: {message}"
-        if self.print:
-            print("\u001B[91m"+ msg + "\u001B[0m")
-        if self.write_file:
-            self.file.write(msg + "\n")
+    def enabled(self, level: int) -> bool:
+        return level >= self.level and (self.print or self.write_file)
+
+    def log(self, level: int, message, *args):
+        if level >= self.level and (self.print or self.write_file):
+            (_writer or _get_writer()).put((self, level, message, args))
+
+    def debug(self, message, *args):
+        if DEBUG >= self.level and (self.print or self.write_file):
+            (_writer or _get_writer()).put((self, DEBUG, message, args))
+
+    def info(self, message, *args):
+        if INFO >= self.level and (self.print or self.write_file):
+            (_writer or _get_writer()).put((self, INFO, message, args))
+
+    def warning(self, message, *args):
+        if WARNING >= self.level and (self.print or self.write_file):
+            (_writer or _get_writer()).put((self, WARNING, message, args))
 
-    def __del__(self):
-        self.file.close()
+    def error(self, message, *args):
+        if ERROR >= self.level and (self.print or self.write_file):
+            (_writer or _get_writer()).put((self, ERROR, message, args))
 
-def logger(name="", write_to_stdout=False, write_to_file=True) -> Logger:
-    return Logger(f"SmoothStone{'.' + name if name else ''}", write_to_stdout, write_to_file)
+def logger(name="", write_to_stdout=False, write_to_file=True, level: int = None) -> Logger:
+    return Logger(f"SmoothStone{'.' + name if name else ''}", write_to_stdout, write_to_file, level=level)
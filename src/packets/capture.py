@@ -0,0 +1,157 @@
+"""
+Packet capture files
+
+A capture is a header followed by one record per frame, as received after decryption:
+
+    header   b"SSCAP", format version (u8), protocol version (u32), start time (f64, unix seconds)
+    record   time since start (u64, nanoseconds), state (u8), flags (u8), frame length (u32), frame
+
+Flag COMPRESSED means compression was enabled, so the frame still starts with its uncompressed length.
+Reading memory-maps the file and hands out memoryviews into the map, so captures larger than RAM replay
+without being loaded and frames are never copied.
+"""
+
+import mmap
+import struct
+import time
+from typing import NamedTuple
+
+try:
+    from .compression import Compression
+    from .state import State, PROTOCOL_VERSION
+except ImportError:
+    from compression import Compression
+    from state import State, PROTOCOL_VERSION
+
+__all__ = ["CaptureWriter", "CaptureReader", "CapturedFrame", "CaptureError"]
+
+MAGIC = b"SSCAP"
+VERSION = 1
+HEADER = struct.Struct(">5sBId")
+RECORD = struct.Struct(">QBBI")
+
+COMPRESSED = 0x01
+STATES = tuple(State)
+
+class CaptureError(RuntimeError):
+    pass
+
+class CapturedFrame(NamedTuple):
+    timestamp: int
+    state: State
+    compressed: bool
+    frame: memoryview
+
+class CaptureWriter:
+    def __init__(self, path, protocol_version=PROTOCOL_VERSION, buffering=1 << 20):
+        self.file = open(path, "wb", buffering=buffering)
+        self.start = time.perf_counter_ns()
+        self.file.write(HEADER.pack(MAGIC, VERSION, protocol_version, time.time()))
+        self.frames = 0
+        self.bytes = HEADER.size
+
+    def write(self, frame, state: State, compressed: bool, timestamp: int = None):
+        """
+        Appends a frame without its length prefix, timestamp is nanoseconds since the capture started
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter_ns() - self.start
+        length = len(frame)
+        self.file.write(RECORD.pack(timestamp, state, COMPRESSED if compressed else 0, length))
+        self.file.write(frame)
+        self.frames += 1
+        self.bytes += RECORD.size + length
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CaptureReader:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            try:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise CaptureError(f"{path} is empty") from e
+        if hasattr(self.map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self.map)
+
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise CaptureError(f"{path} is too short to be a capture")
+        magic, version, self.protocol_version, self.started = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise CaptureError(f"{path} is not a version {VERSION} capture")
+
+    def __iter__(self):
+        """
+        Yields every frame as fast as possible
+        """
+        view = self.view
+        states = STATES
+        new = CapturedFrame._make
+        unpack = RECORD.unpack_from
+        size = RECORD.size
+        end = len(view)
+        offset = HEADER.size
+        while offset + size <= end:
+            timestamp, state, flags, length = unpack(view, offset)
+            offset += size
+            if offset + length > end:
+                raise CaptureError(f"Capture ends inside a frame of {length} bytes")
+            yield new((timestamp, states[state], flags & COMPRESSED == COMPRESSED, view[offset:offset + length]))
+            offset += length
+        if offset != end:
+            raise CaptureError("Capture ends inside a record header")
+
+    def replay(self, speed=1.0):
+        """
+        Yields frames at their recorded pace from the first one on, speed 2 replays twice as fast
+        """
+        start = time.perf_counter_ns()
+        first = None
+        for captured in self:
+            if first is None:
+                first = captured.timestamp
+            delay = (captured.timestamp - first) / speed - (time.perf_counter_ns() - start)
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            yield captured
+
+    def packets(self, frames=None):
+        """
+        Yields state and packet id and data of each frame, only compressed frames are copied
+        """
+        compression = Compression(0)
+        for captured in self if frames is None else frames:
+            frame = captured.frame
+            if captured.compressed:
+                length, offset = compression.split(frame)
+                frame = frame[offset:] if length == 0 else Compression.inflate(frame[offset:], length)
+            yield captured.state, frame
+
+    def close(self):
+        """
+        Frames still referenced keep the map open until they are released
+        """
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
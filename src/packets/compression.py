@@ -0,0 +1,110 @@
+"""
+Packet compression
+
+After Set Compression every frame starts with the uncompressed data length, 0 meaning the rest is not compressed.
+Python's zlib objects cannot be reset, so each packet goes through the one-shot functions with the output
+buffer sized from the announced length. zlib releases the GIL, so large frames can be inflated on a thread pool.
+"""
+
+import zlib
+
+try:
+    from .datatypes import VarInt
+except ImportError:
+    from datatypes import VarInt
+
+__all__ = ["Compression", "CompressionError"]
+
+class CompressionError(RuntimeError):
+    pass
+
+class Compression:
+    MAX_DATA_LENGTH = 8388608
+    OFFLOAD_SIZE = 65536
+
+    def __init__(self, threshold: int, level=-1, offload_size=OFFLOAD_SIZE):
+        """
+        Frames that inflate to offload_size bytes or more should go through inflate in an executor
+        """
+        self.threshold = threshold
+        self.level = level
+        self.offload_size = offload_size
+
+        self.compressed_in = 0
+        self.raw_in = 0
+        self.compressed_out = 0
+        self.raw_out = 0
+        self.offloaded = 0
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Turns packet id and data into the body of a compressed frame
+        """
+        length = len(data)
+        if length < self.threshold:
+            self.raw_out += length
+            return b"\x00" + data
+
+        compressed = zlib.compress(data, self.level)
+        self.raw_out += length
+        self.compressed_out += len(compressed)
+        return VarInt.encode(length) + compressed
+
+    def split(self, frame) -> tuple[int, int]:
+        """
+        Returns the uncompressed length (0 if the frame is not compressed) and the offset of the data
+        """
+        length, offset = VarInt.decode(frame)
+        if length == 0:
+            self.raw_in += len(frame) - offset
+            return 0, offset
+
+        if length < self.threshold:
+            raise CompressionError(f"Compressed packet of {length} bytes is below the threshold of {self.threshold}")
+        if length > self.MAX_DATA_LENGTH:
+            raise CompressionError(f"Compressed packet of {length} bytes is too large")
+        self.compressed_in += len(frame) - offset
+        self.raw_in += length
+        return length, offset
+
+    def should_offload(self, length: int) -> bool:
+        return length >= self.offload_size
+
+    @staticmethod
+    def inflate(data, length: int) -> bytes:
+        """
+        Safe to call from any thread
+        """
+        inflated = zlib.decompress(data, bufsize=length)
+        if len(inflated) != length:
+            raise CompressionError(f"Expected {length} bytes, inflated {len(inflated)}")
+        return inflated
+
+    @staticmethod
+    def peek_id(data) -> int:
+        """
+        Inflates only as far as the packet id, so frames nobody handles can be dropped without inflating them
+        """
+        try:
+            head = zlib.decompressobj().decompress(data, VarInt.MAX_POSITION)
+        except zlib.error as e:
+            raise CompressionError(f"Could not inflate packet id: {e}") from e
+        return VarInt.decode(head)[0]
+
+    def decompress(self, frame):
+        """
+        Returns packet id and data of a frame on the calling thread, uncompressed frames are not copied
+        """
+        length, offset = self.split(frame)
+        if length == 0:
+            return frame[offset:]
+        return self.inflate(frame[offset:], length)
+
+    def stats(self) -> dict:
+        return {
+            "compressed_in": self.compressed_in,
+            "raw_in": self.raw_in,
+            "compressed_out": self.compressed_out,
+            "raw_out": self.raw_out,
+            "offloaded": self.offloaded,
+        }
@@ -1,6 +1,12 @@
 try:
+    from .simple import *
+    from .complex import *
+    from .lazy_nbt import *
+    from .paletted import *
+    from .arrays import *
+except ImportError:
     from simple import *
     from complex import *
-except ImportError:
-    from .simple import *
-    from .complex import *
\ No newline at end of file
+    from lazy_nbt import *
+    from paletted import *
+    from arrays import *
@@ -0,0 +1,118 @@
+"""
+Arrays of one element type
+
+PrefixedArray[Int] is prefixed with its VarInt length, FixedArray[Long, 37] has a length known from context.
+Fixed-width elements decode with a single numpy.frombuffer and byteswapping copy, elements with a
+decode_many (VarInt, VarLong, UUID, ...) go through that batch loop.
+"""
+
+from io import BytesIO
+
+import numpy as np
+
+try:
+    from .complex import VarInt
+    from .simple import SimpleType
+    from .type import Type
+except ImportError:
+    from complex import VarInt
+    from simple import SimpleType
+    from type import Type
+
+__all__ = ["PrefixedArray", "FixedArray"]
+
+class ArrayType(Type):
+    __slots__ = ()
+
+    ELEMENT: type[Type] = None
+    DTYPE: np.dtype = None
+
+    _parameterized: dict = {}
+
+    def __init__(self, value):
+        super().__init__(value)
+
+    @classmethod
+    def parameterize(cls, element: type[Type], **attributes):
+        key = (cls, element, tuple(attributes.items()))
+        if (array := cls._parameterized.get(key)) is None:
+            name = f"{cls.__name__}[{', '.join([element.__name__, *map(str, attributes.values())])}]"
+            attributes["__slots__"] = ()
+            attributes["ELEMENT"] = element
+            if issubclass(element, SimpleType) and element.FORMAT:
+                attributes["DTYPE"] = np.dtype(element.FORMAT if element.FORMAT[0] in "<>=!" else ">" + element.FORMAT)
+            array = cls._parameterized[key] = type(name, (cls,), attributes)
+        return array
+
+    def serialize(self) -> bytes:
+        return self.encode(self.value)
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        buffer = value.getbuffer()
+        try:
+            array, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return cls(array)
+
+    @classmethod
+    def encode_elements(cls, values) -> bytes:
+        if cls.DTYPE is not None:
+            return np.asarray(values, dtype=cls.DTYPE).tobytes()
+        if encode_many := getattr(cls.ELEMENT, "encode_many", None):
+            return encode_many(values)
+        encode = cls.ELEMENT.encode
+        return b"".join([encode(value) for value in values])
+
+    @classmethod
+    def decode_elements(cls, buffer, offset: int, count: int):
+        """
+        Returns a native-endian numpy array for fixed-width elements, otherwise a list
+        """
+        if cls.DTYPE is not None:
+            array = np.frombuffer(buffer, dtype=cls.DTYPE, count=count, offset=offset)
+            return array.astype(cls.DTYPE.newbyteorder("=")), offset + count * cls.DTYPE.itemsize
+        if decode_many := getattr(cls.ELEMENT, "decode_many", None):
+            return decode_many(buffer, count, offset)
+        decode = cls.ELEMENT.decode
+        values = []
+        for _ in range(count):
+            value, offset = decode(buffer, offset)
+            values.append(value)
+        return values, offset
+
+class PrefixedArray(ArrayType):
+    __slots__ = ()
+
+    def __class_getitem__(cls, element: type[Type]):
+        return cls.parameterize(element)
+
+    @classmethod
+    def encode(cls, value) -> bytes:
+        return VarInt.encode(len(value)) + cls.encode_elements(value)
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        count, offset = VarInt.decode(buffer, offset)
+        return cls.decode_elements(buffer, offset, count)
+
+class FixedArray(ArrayType):
+    __slots__ = ()
+
+    LENGTH = 0
+
+    def __class_getitem__(cls, parameters: tuple[type[Type], int]):
+        element, length = parameters
+        return cls.parameterize(element, LENGTH=length)
+
+    @classmethod
+    def encode(cls, value) -> bytes:
+        if len(value) != cls.LENGTH:
+            raise ValueError(f"{cls.__name__} needs {cls.LENGTH} elements, got {len(value)}")
+        return cls.encode_elements(value)
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        return cls.decode_elements(buffer, offset, cls.LENGTH)
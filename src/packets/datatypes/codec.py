@@ -0,0 +1,219 @@
+"""
+Plain codec functions
+
+read_x(buffer, offset) returns a plain value and the offset after it, encode_x(value) returns the encoded bytes
+and write_x(out, value) appends them to a bytearray. The Type classes delegate to these, bulk decoders can call
+them directly and skip the classes altogether.
+"""
+
+import struct
+import uuid
+
+__all__ = [
+    "read_bool", "write_bool", "encode_bool", "read_byte", "write_byte", "encode_byte",
+    "read_ubyte", "write_ubyte", "encode_ubyte", "read_short", "write_short", "encode_short",
+    "read_ushort", "write_ushort", "encode_ushort", "read_int", "write_int", "encode_int",
+    "read_long", "write_long", "encode_long", "read_ulong", "write_ulong", "encode_ulong",
+    "read_float", "write_float", "encode_float", "read_double", "write_double", "encode_double",
+    "read_varint", "write_varint", "encode_varint", "read_varlong", "write_varlong", "encode_varlong",
+    "read_string", "write_string", "encode_string", "read_bytes", "write_bytes", "encode_bytes",
+    "read_uuid", "write_uuid", "encode_uuid", "read_position", "write_position", "encode_position",
+    "read_angle", "write_angle", "encode_angle", "MAX_STRING_LENGTH",
+]
+
+MAX_STRING_LENGTH = 32767
+
+def _fixed(name: str, fmt: str):
+    """
+    read, write and encode functions for one struct format
+    """
+    packer = struct.Struct(fmt)
+    unpack_from = packer.unpack_from
+    pack = packer.pack
+    size = packer.size
+
+    def read(buffer, offset=0):
+        return unpack_from(buffer, offset)[0], offset + size
+
+    def write(out: bytearray, value):
+        out += pack(value)
+
+    def encode(value) -> bytes:
+        return pack(value)
+
+    for function, prefix in ((read, "read"), (write, "write"), (encode, "encode")):
+        function.__name__ = function.__qualname__ = f"{prefix}_{name}"
+    return read, write, encode
+
+read_bool, write_bool, encode_bool = _fixed("bool", "?")
+read_byte, write_byte, encode_byte = _fixed("byte", ">b")
+read_ubyte, write_ubyte, encode_ubyte = _fixed("ubyte", ">B")
+read_short, write_short, encode_short = _fixed("short", ">h")
+read_ushort, write_ushort, encode_ushort = _fixed("ushort", ">H")
+read_int, write_int, encode_int = _fixed("int", ">i")
+read_long, write_long, encode_long = _fixed("long", ">q")
+read_ulong, write_ulong, encode_ulong = _fixed("ulong", ">Q")
+read_float, write_float, encode_float = _fixed("float", ">f")
+read_double, write_double, encode_double = _fixed("double", ">d")
+
+# VarInt and VarLong
+
+def _varint_small_table():
+    """
+    Precomputed encodings of every value that fits in one or two VarInt bytes
+    """
+    table = [bytes((value,)) for value in range(0x80)]
+    table += [bytes(((value & 0x7F) | 0x80, value >> 7)) for value in range(0x80, 0x4000)]
+    return tuple(table)
+
+_VARINT_SMALL = _varint_small_table()
+
+def _encode_varnum(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _read_varnum(buffer, offset: int, max_bytes: int, bits: int, name: str) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if shift >= 7 * max_bytes:
+            raise RuntimeError(f"{name} is too big")
+        current = buffer[offset]
+        offset += 1
+        result |= (current & 0x7F) << shift
+        shift += 7
+        if not current & 0x80:
+            break
+    sign_mask = (1 << (bits - 1)) - 1
+    if result > sign_mask:
+        result = (result & sign_mask) - (sign_mask + 1)
+    return result, offset
+
+def encode_varint(value: int) -> bytes:
+    """
+    Values outside the 32-bit range wrap around
+    """
+    value &= 0xFFFFFFFF
+    if value < 0x4000:
+        return _VARINT_SMALL[value]
+    return _encode_varnum(value)
+
+def write_varint(out: bytearray, value: int):
+    out += encode_varint(value)
+
+def read_varint(buffer, offset=0) -> tuple[int, int]:
+    current = buffer[offset]
+    if current < 0x80:
+        return current, offset + 1
+    following = buffer[offset + 1]
+    if following < 0x80:
+        return (current & 0x7F) | following << 7, offset + 2
+    return _read_varnum(buffer, offset, 5, 32, "VarInt")
+
+def encode_varlong(value: int) -> bytes:
+    value &= 0xFFFFFFFFFFFFFFFF
+    if value < 0x4000:
+        return _VARINT_SMALL[value]
+    return _encode_varnum(value)
+
+def write_varlong(out: bytearray, value: int):
+    out += encode_varlong(value)
+
+def read_varlong(buffer, offset=0) -> tuple[int, int]:
+    current = buffer[offset]
+    if current < 0x80:
+        return current, offset + 1
+    following = buffer[offset + 1]
+    if following < 0x80:
+        return (current & 0x7F) | following << 7, offset + 2
+    return _read_varnum(buffer, offset, 10, 64, "VarLong")
+
+# Variable-length
+
+def _utf16_length(value: str) -> int:
+    return len(value) + sum(1 for char in value if char > "\uffff")
+
+def encode_string(value: str, max_length=MAX_STRING_LENGTH) -> bytes:
+    """
+    max_length counts UTF-16 code units like the protocol does
+    """
+    encoded = value.encode("utf-8")
+    # Every code unit takes at least one byte, so only strings with more bytes than that can be too long
+    if len(encoded) > max_length and _utf16_length(value) > max_length:
+        raise ValueError(f"String is longer than {max_length} characters")
+    return encode_varint(len(encoded)) + encoded
+
+def write_string(out: bytearray, value: str, max_length=MAX_STRING_LENGTH):
+    out += encode_string(value, max_length)
+
+def read_string(buffer, offset=0, max_length=MAX_STRING_LENGTH) -> tuple[str, int]:
+    length, offset = read_varint(buffer, offset)
+    if length > max_length * 3:
+        raise ValueError(f"String of {length} bytes is longer than {max_length} characters")
+    end = offset + length
+    value = str(buffer[offset:end], "utf-8")
+    if length > max_length and _utf16_length(value) > max_length:
+        raise ValueError(f"String is longer than {max_length} characters")
+    return value, end
+
+def encode_bytes(value: bytes) -> bytes:
+    return encode_varint(len(value)) + value
+
+def write_bytes(out: bytearray, value: bytes):
+    out += encode_varint(len(value))
+    out += value
+
+def read_bytes(buffer, offset=0) -> tuple[bytes, int]:
+    length, offset = read_varint(buffer, offset)
+    end = offset + length
+    return bytes(buffer[offset:end]), end
+
+# Fixed-size structures
+
+def encode_uuid(value: uuid.UUID) -> bytes:
+    return value.bytes
+
+def write_uuid(out: bytearray, value: uuid.UUID):
+    out += value.bytes
+
+def read_uuid(buffer, offset=0) -> tuple[uuid.UUID, int]:
+    return uuid.UUID(bytes=bytes(buffer[offset:offset + 16])), offset + 16
+
+_ULONG = struct.Struct(">Q")
+
+def encode_position(value: tuple[int, int, int]) -> bytes:
+    """
+    x and z are 26-bit and y 12-bit signed integers packed into one long as x << 38 | z << 12 | y
+    """
+    x, y, z = value
+    return _ULONG.pack((x & 0x3FFFFFF) << 38 | (z & 0x3FFFFFF) << 12 | (y & 0xFFF))
+
+def write_position(out: bytearray, value: tuple[int, int, int]):
+    out += encode_position(value)
+
+def read_position(buffer, offset=0) -> tuple[tuple[int, int, int], int]:
+    packed = _ULONG.unpack_from(buffer, offset)[0]
+    x = packed >> 38
+    y = packed & 0xFFF
+    z = packed >> 12 & 0x3FFFFFF
+    return (
+        x - 0x4000000 if x & 0x2000000 else x,
+        y - 0x1000 if y & 0x800 else y,
+        z - 0x4000000 if z & 0x2000000 else z,
+    ), offset + 8
+
+def encode_angle(value: float) -> bytes:
+    """
+    Degrees to 1/256ths of a turn
+    """
+    return encode_ubyte(round(256 * ((value % 360) / 360)) & 0xFF)
+
+def write_angle(out: bytearray, value: float):
+    out.append(round(256 * ((value % 360) / 360)) & 0xFF)
+
+def read_angle(buffer, offset=0) -> tuple[float, int]:
+    return 360 * buffer[offset] / 256, offset + 1
@@ -4,93 +4,78 @@ All "complex" data types that are not covered in simple
 Include modifications from https://github.com/ammaraskar/pyCraft/blob/master/minecraft/networking/types/basic.py
 """
 
-import pynbt
+import numpy as np
+import struct
+import uuid
 from io import BytesIO
 
 try:
-    from simple import *
-    from type import Type
-except ImportError:
+    from .codec import *
     from .simple import *
     from .type import Type
+except ImportError:
+    from codec import *
+    from simple import *
+    from type import Type
 
-__all__ = ["VarInt", "VarLong", "Position", "Angle", "String", "FixedPoint", "FixedPointInt", "NBT"]
-
-class LogicalShiftNum:
-    def __init__(self, sign, mag, bits=32):
-        self.sign = sign
-        self.mag = mag
-        self.bits = bits
-
-    @classmethod
-    def from_bits(cls, num, bits=32):
-        if num >= 2 ** (bits - 1):
-            mask = 2 ** (bits - 1) - 1
-            num &= mask
-            num = 2 ** (bits - 1) - num
-            return cls(-1, num, bits)
-        elif num < 0:
-            m = 2 ** bits
-            num = m - num
-            return cls(-1, num, bits)
-        else:
-            return cls(1, num, bits)
-
-    def twos_complement(self) -> int:
-        if self.sign == -1:
-            t = 2 ** (self.bits + 1)
-            d = t - self.mag
-            d &= ~(t >> 1)
-            return d
-        else:
-            return self.mag
-
-    def __rshift__(self, digits):
-        """
-        Logical right shift
-        """
-        return self.from_bits(self.twos_complement() >> digits, self.bits)
+__all__ = ["VarInt", "VarLong", "Position", "SectionPosition", "SectionBlocks", "Angle", "String", "Identifier", "InternCache", "ByteArray", "UUID", "FixedPoint", "FixedPointInt", "NBT"]
 
 class VarInt(Type):
+    __slots__ = ()
+
     SEGMENT_BITS = 0x7F
     CONTINUE_BIT = 0x80
     MAX_POSITION = 5
     BITS = 32
+    MASK = (1 << BITS) - 1
+    SIGN_MASK = (1 << (BITS - 1)) - 1
+    SIGN_BIT = 1 << (BITS - 1)
+
+    encode = staticmethod(encode_varint)
+    decode = staticmethod(read_varint)
 
     def __init__(self, value: int):
         super().__init__(value)
 
     def serialize(self) -> bytes:
-        value = bytes()
-        v = LogicalShiftNum.from_bits(self.value, self.BITS)
-        while True:
-            if v.twos_complement() & ~self.SEGMENT_BITS == 0:
-                value += v.twos_complement().to_bytes()
-                break
-
-            value += ((v.twos_complement() & self.SEGMENT_BITS) | self.CONTINUE_BIT).to_bytes()
-            v >>= 7
-
-        return value
+        return self.encode(self.value)
 
     @classmethod
     def deserialize(cls, value: BytesIO):
-        val = LogicalShiftNum(1, 0, cls.BITS)
-        position = 0
-
-        while True:
-            current = int.from_bytes(value.read(1))
-            val = LogicalShiftNum.from_bits(val.twos_complement() | (current & cls.SEGMENT_BITS) << 7 * position, cls.BITS)
-            if not current & cls.CONTINUE_BIT:
-                break
+        """
+        Through decode, so both have the same length limit and errors
+        """
+        buffer = value.getbuffer()
+        try:
+            result, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return cls(result)
 
-            position += 1
-            if position > cls.MAX_POSITION:
-                raise RuntimeError(
-                    f"{cls.__name__} is too big"
-                )
+    @classmethod
+    def encode_many(cls, values) -> bytes:
+        if isinstance(values, np.ndarray):
+            values = values.tolist()
+        encode = cls.encode
+        return b"".join([encode(value) for value in values])
 
-        return cls(val.sign * val.mag)
+    @classmethod
+    def decode_many(cls, buffer, count: int, offset=0) -> tuple[list[int], int]:
+        """
+        Decodes count consecutive values, returns them and the offset after the last one
+        """
+        decode = cls.decode
+        values = []
+        append = values.append
+        for _ in range(count):
+            if buffer[offset] < 0x80:
+                append(buffer[offset])
+                offset += 1
+            else:
+                value, offset = decode(buffer, offset)
+                append(value)
+        return values, offset
 
     @staticmethod
     def size(value: int):
@@ -102,22 +87,188 @@ class VarInt(Type):
             size += 1
 
 class VarLong(VarInt):
+    __slots__ = ()
+
     MAX_POSITION = 10
     BITS = 64
+    MASK = (1 << BITS) - 1
+    SIGN_MASK = (1 << (BITS - 1)) - 1
+    SIGN_BIT = 1 << (BITS - 1)
+
+    encode = staticmethod(encode_varlong)
+    decode = staticmethod(read_varlong)
 
 class Position(Type):
+    """
+    x and z are 26-bit and y 12-bit signed integers packed into one long as x << 38 | z << 12 | y
+    """
+    __slots__ = ()
+
+    STRUCT = struct.Struct(">Q")
+
+    encode = staticmethod(encode_position)
+    decode = staticmethod(read_position)
+
     def __init__(self, x: int, y: int, z: int):
         super().__init__((x, y, z))
 
     def serialize(self) -> bytes:
-        return (((self.value[0] & 0x3FFFFFF) << 38) | ((self.value[2] & 0x3FFFFFF) << 12) | (self.value[1] & 0xFFF)).to_bytes()
+        return self.encode(self.value)
 
     @classmethod
     def deserialize(cls, value: BytesIO):
-        val = Long.deserialize(value).value
-        return cls(val >> 38, val << 52 >> 52, val << 26 >> 38)
+        return cls(*cls.unpack(cls.STRUCT.unpack(value.read(8))[0]))
+
+    @staticmethod
+    def pack(x: int, y: int, z: int) -> int:
+        return (x & 0x3FFFFFF) << 38 | (z & 0x3FFFFFF) << 12 | (y & 0xFFF)
+
+    @staticmethod
+    def unpack(packed: int) -> tuple[int, int, int]:
+        x = packed >> 38
+        y = packed & 0xFFF
+        z = packed >> 12 & 0x3FFFFFF
+        return (
+            x - 0x4000000 if x & 0x2000000 else x,
+            y - 0x1000 if y & 0x800 else y,
+            z - 0x4000000 if z & 0x2000000 else z,
+        )
+
+    @staticmethod
+    def pack_many(positions) -> np.ndarray:
+        """
+        Packs an (n, 3) array of x, y, z into n unsigned longs
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        x, y, z = (positions & np.array([0x3FFFFFF, 0xFFF, 0x3FFFFFF], dtype=np.int64)).astype(np.uint64).T
+        return x << np.uint64(38) | z << np.uint64(12) | y
+
+    @staticmethod
+    def unpack_many(packed: np.ndarray) -> np.ndarray:
+        """
+        Unpacks longs into an (n, 3) int32 array of x, y, z, shifting left first so the right shift sign-extends
+        """
+        packed = np.asarray(packed).astype(np.int64, copy=False)
+        positions = np.empty((len(packed), 3), dtype=np.int32)
+        positions[:, 0] = packed >> 38
+        positions[:, 1] = packed << 52 >> 52
+        positions[:, 2] = packed << 26 >> 38
+        return positions
+
+    @classmethod
+    def encode_many(cls, values) -> bytes:
+        return cls.pack_many(values).astype(">u8").tobytes()
+
+    @classmethod
+    def decode_many(cls, buffer, count: int, offset=0) -> tuple[np.ndarray, int]:
+        packed = np.frombuffer(buffer, dtype=">i8", count=count, offset=offset)
+        return cls.unpack_many(packed), offset + 8 * count
+
+class SectionPosition(Position):
+    """
+    Chunk section coordinates, x and z are 22-bit and y 20-bit signed integers packed as x << 42 | z << 20 | y
+    """
+    __slots__ = ()
+
+    @classmethod
+    def encode(cls, value: tuple[int, int, int]) -> bytes:
+        return cls.STRUCT.pack(cls.pack(*value))
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        return cls.unpack(cls.STRUCT.unpack_from(buffer, offset)[0]), offset + 8
+
+    @staticmethod
+    def pack(x: int, y: int, z: int) -> int:
+        return (x & 0x3FFFFF) << 42 | (z & 0x3FFFFF) << 20 | (y & 0xFFFFF)
+
+    @staticmethod
+    def unpack(packed: int) -> tuple[int, int, int]:
+        x = packed >> 42
+        y = packed & 0xFFFFF
+        z = packed >> 20 & 0x3FFFFF
+        return (
+            x - 0x400000 if x & 0x200000 else x,
+            y - 0x100000 if y & 0x80000 else y,
+            z - 0x400000 if z & 0x200000 else z,
+        )
+
+    @staticmethod
+    def pack_many(positions) -> np.ndarray:
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        x, y, z = (positions & np.array([0x3FFFFF, 0xFFFFF, 0x3FFFFF], dtype=np.int64)).astype(np.uint64).T
+        return x << np.uint64(42) | z << np.uint64(20) | y
+
+    @staticmethod
+    def unpack_many(packed: np.ndarray) -> np.ndarray:
+        packed = np.asarray(packed).astype(np.int64, copy=False)
+        positions = np.empty((len(packed), 3), dtype=np.int32)
+        positions[:, 0] = packed >> 42
+        positions[:, 1] = packed << 44 >> 44
+        positions[:, 2] = packed << 22 >> 42
+        return positions
+
+class SectionBlocks(Type):
+    """
+    The VarLong-prefixed block array of Update Section Blocks, each entry is
+    block state << 12 | x << 8 | z << 4 | y with coordinates relative to the section
+    """
+    __slots__ = ()
+
+    def __init__(self, value: tuple[np.ndarray, np.ndarray]):
+        super().__init__(value)
+
+    def serialize(self) -> bytes:
+        return self.encode(self.value)
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        buffer = value.getbuffer()
+        try:
+            blocks, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return cls(blocks)
+
+    @staticmethod
+    def pack(states, positions) -> np.ndarray:
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3) & 0xF
+        return np.asarray(states, dtype=np.int64) << 12 | positions[:, 0] << 8 | positions[:, 2] << 4 | positions[:, 1]
+
+    @staticmethod
+    def unpack(entries) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the block states and an (n, 3) array of section-relative x, y, z
+        """
+        entries = np.asarray(entries, dtype=np.int64)
+        positions = np.empty((len(entries), 3), dtype=np.int32)
+        positions[:, 0] = entries >> 8 & 0xF
+        positions[:, 1] = entries & 0xF
+        positions[:, 2] = entries >> 4 & 0xF
+        return (entries >> 12).astype(np.int32), positions
+
+    @staticmethod
+    def absolute(section: tuple[int, int, int], positions: np.ndarray) -> np.ndarray:
+        return positions + np.asarray(section, dtype=np.int32) * 16
+
+    @classmethod
+    def encode(cls, value: tuple[np.ndarray, np.ndarray]) -> bytes:
+        entries = cls.pack(*value).tolist()
+        return VarInt.encode(len(entries)) + VarLong.encode_many(entries)
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        count, offset = VarInt.decode(buffer, offset)
+        entries, offset = VarLong.decode_many(buffer, count, offset)
+        return cls.unpack(entries), offset
 
 class Angle(Type):
+    __slots__ = ()
+
+    encode = staticmethod(encode_angle)
+    decode = staticmethod(read_angle)
+
     def __init__(self, value: float):
         """
         The angle is in degrees
@@ -125,28 +276,209 @@ class Angle(Type):
         super().__init__(value)
 
     def serialize(self) -> bytes:
-        return UByte(round(256 * ((self.value % 360) / 360))).serialize()
+        return encode_angle(self.value)
 
     @classmethod
     def deserialize(cls, value: BytesIO):
         return Angle(360 * UByte.deserialize(value).value / 256)
 
+class InternCache:
+    """
+    Maps raw bytes to one shared value, bounded to maxsize entries with the oldest dropped first
+    """
+    __slots__ = ("maxsize", "entries", "hits", "misses", "evictions")
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, make):
+        """
+        Returns the value cached for key, or stores and returns make(key)
+        """
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = make(key)
+        if len(self.entries) >= self.maxsize:
+            del self.entries[next(iter(self.entries))]
+            self.evictions += 1
+        self.entries[key] = value
+        return value
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hit_rate()}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
 class String(Type):
+    """
+    UTF-8 prefixed with its VarInt byte length. MAX_LENGTH counts UTF-16 code units as the protocol does,
+    String[16] is a string of at most 16.
+    """
+    __slots__ = ()
+
+    MAX_LENGTH = MAX_STRING_LENGTH
+
+    _parameterized: dict = {}
+    # Keyed by MAX_LENGTH too, the classes share it and a value may fit one and be too long for another
+    _constants: dict[tuple[int, str], bytes] = {}
+
     def __init__(self, value: str):
         super().__init__(value)
 
+    def __class_getitem__(cls, max_length: int):
+        key = (cls, max_length)
+        if (string := cls._parameterized.get(key)) is None:
+            string = cls._parameterized[key] = type(f"{cls.__name__}[{max_length}]", (cls,), {"__slots__": (), "MAX_LENGTH": max_length})
+        return string
+
     def serialize(self) -> bytes:
-        encoded = self.value.encode("utf-8")
-        length = VarInt(len(encoded)).serialize()
-        return length + encoded
+        return self.encode(self.value)
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        buffer = value.getbuffer()
+        try:
+            string, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return cls(string)
+
+    @classmethod
+    def encode(cls, value: str) -> bytes:
+        return encode_string(value, cls.MAX_LENGTH)
+
+    @classmethod
+    def constant(cls, value: str) -> bytes:
+        """
+        Encodes a string that is sent over and over, like a channel name, only once
+        """
+        key = (cls.MAX_LENGTH, value)
+        if (encoded := cls._constants.get(key)) is None:
+            encoded = cls._constants[key] = cls.encode(value)
+        return encoded
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        return read_string(buffer, offset, cls.MAX_LENGTH)
+
+class Identifier(String):
+    """
+    A namespaced key like minecraft:stone. The same few thousand repeat all session, so decoding goes through
+    an InternCache keyed by the raw bytes and returns one shared str per identifier, encoding through one
+    keyed by the str that returns the prefixed bytes.
+    """
+    __slots__ = ()
+
+    decoded = InternCache()
+    encoded = InternCache()
+
+    @classmethod
+    def encode(cls, value: str) -> bytes:
+        # Checked before the cache, which is shared by Identifier[n] of every length. Identifiers are ASCII, so
+        # characters are code units
+        if len(value) > cls.MAX_LENGTH:
+            raise ValueError(f"{cls.__name__} is longer than {cls.MAX_LENGTH} characters")
+        return cls.encoded.get(value, String.encode)
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        length, offset = read_varint(buffer, offset)
+        if length > cls.MAX_LENGTH:
+            raise ValueError(f"{cls.__name__} of {length} bytes is longer than {cls.MAX_LENGTH} characters")
+        end = offset + length
+        key = bytes(buffer[offset:end])
+        cache = cls.decoded
+        if (value := cache.entries.get(key)) is None:
+            return cache.get(key, _utf8), end
+        cache.hits += 1
+        return value, end
+
+    @classmethod
+    def decode_many(cls, buffer, count: int, offset=0) -> tuple[list[str], int]:
+        decode = cls.decode
+        values = []
+        for _ in range(count):
+            value, offset = decode(buffer, offset)
+            values.append(value)
+        return values, offset
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"decoded": cls.decoded.stats(), "encoded": cls.encoded.stats()}
+
+def _utf8(data: bytes) -> str:
+    return str(data, "utf-8")
+
+class ByteArray(Type):
+    """
+    Raw bytes prefixed with their VarInt length
+    """
+    __slots__ = ()
+
+    encode = staticmethod(encode_bytes)
+    decode = staticmethod(read_bytes)
+
+    def __init__(self, value: bytes):
+        super().__init__(value)
+
+    def serialize(self) -> bytes:
+        return self.encode(self.value)
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        return cls(value.read(VarInt.deserialize(value).value))
+
+class UUID(Type):
+    __slots__ = ()
+
+    encode = staticmethod(encode_uuid)
+    decode = staticmethod(read_uuid)
+
+    def __init__(self, value: uuid.UUID):
+        super().__init__(value)
+
+    def serialize(self) -> bytes:
+        return self.value.bytes
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        return cls(uuid.UUID(bytes=value.read(16)))
+
+    @classmethod
+    def encode_many(cls, values) -> bytes:
+        return b"".join([value.bytes for value in values])
+
+    @classmethod
+    def decode_many(cls, buffer, count: int, offset=0) -> tuple[list[uuid.UUID], int]:
+        end = offset + 16 * count
+        raw = bytes(buffer[offset:end])
+        return [uuid.UUID(bytes=raw[i:i + 16]) for i in range(0, 16 * count, 16)], end
 
 class FixedPoint(Type):
+    __slots__ = ("int_type", "fractional_bits", "denominator")
+
     def __init__(self, int_type: type[Type], fractional_bits=5):
         """
         To set the value, do FixedPoint.set_value() OR manually set value
         """
         super().__init__(0)
         self.int_type = int_type
+        self.fractional_bits = fractional_bits
         self.denominator = 2 ** fractional_bits
 
     def set_value(self, value: int):
@@ -154,42 +486,39 @@ class FixedPoint(Type):
         return self
 
     def serialize(self) -> bytes:
-        return self.int_type(self.value * self.denominator).serialize()
+        return self.int_type(round(self.value * self.denominator)).serialize()
+
+    def deserialize(self, value: BytesIO) -> "FixedPoint":
+        """
+        Returns a new FixedPoint of the same format, this one is left as it was
+        """
+        return FixedPoint(self.int_type, self.fractional_bits).set_value(self.int_type.deserialize(value).value / self.denominator)
+
+    def encode(self, value: float) -> bytes:
+        return self.int_type.encode(round(value * self.denominator))
 
-    def deserialize(self, value: BytesIO):
-        fp = FixedPoint(self.int_type, self.denominator)
-        fp.value = self.int_type.deserialize(value) / self.denominator
+    def decode(self, buffer, offset=0):
+        value, offset = self.int_type.decode(buffer, offset)
+        return value / self.denominator, offset
 
 FixedPointInt = FixedPoint(Int)
 
 class NBT(Type):
-    def __init__(self, nbt: pynbt.TAG_Compound):
+    """
+    Eagerly parsed NBT, pynbt is imported on first use
+    """
+    __slots__ = ()
+
+    def __init__(self, nbt: "pynbt.TAG_Compound"):
         super().__init__(nbt)
 
     def serialize(self) -> bytes:
+        import pynbt
         buffer = BytesIO()
-        pynbt.NBTFile(name=None, value=self.value.value).save(buffer)
+        pynbt.NBTFile(name="", value=self.value.value).save(buffer)
         return buffer.getvalue()
 
     @classmethod
     def deserialize(cls, value: BytesIO):
+        import pynbt
         return cls(pynbt.NBTFile(value))
-
-if __name__ == "__main__":
-    def to_bytes(s):
-        hex_strings = s.replace("0x", "").split()
-        byte_string = bytes([int(hx, 16) for hx in hex_strings])
-
-        return byte_string
-
-    print(VarInt(-1).serialize())
-    print(to_bytes("0xff 0xff 0xff 0xff 0x0f"))
-
-    print(VarInt.deserialize(BytesIO(to_bytes("0x80 0x80 0x80 0x80 0x08"))).value)
-    print(-2147483648)
-
-    print(VarLong(-9223372036854775808).serialize())
-    print(to_bytes("0x80 0x80 0x80 0x80 0x80 0x80 0x80 0x80 0x80 0x01"))
-
-    print(VarLong.deserialize(BytesIO(to_bytes("0xff 0xff 0xff 0xff 0xff 0xff 0xff 0xff 0xff 0x01"))).value)
-    print(-1)
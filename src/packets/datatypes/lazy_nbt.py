@@ -0,0 +1,266 @@
+"""
+Lazy NBT
+
+LazyNBT.decode only scans the tag structure to find where the NBT ends, keeping the raw bytes. Compounds and
+lists index their children on first access and only build the values that are read. Untouched NBT is
+serialized again by copying the original bytes. Skipping NBT a handler does not need costs only the scan.
+"""
+
+import struct
+from collections.abc import Mapping, Sequence
+from io import BytesIO
+
+try:
+    from .complex import NBT
+    from .type import Type
+except ImportError:
+    from complex import NBT
+    from type import Type
+
+__all__ = ["LazyNBT", "LazyCompound", "LazyList", "skip_nbt"]
+
+END, BYTE, SHORT, INT, LONG, FLOAT, DOUBLE, BYTE_ARRAY, STRING, LIST, COMPOUND, INT_ARRAY, LONG_ARRAY = range(13)
+
+FIXED_SIZES = {BYTE: 1, SHORT: 2, INT: 4, LONG: 8, FLOAT: 4, DOUBLE: 8}
+STRUCTS = {tag: struct.Struct(fmt) for tag, fmt in ((BYTE, ">b"), (SHORT, ">h"), (INT, ">i"), (LONG, ">q"), (FLOAT, ">f"), (DOUBLE, ">d"))}
+ARRAY_FORMATS = {INT_ARRAY: (4, "i"), LONG_ARRAY: (8, "q")}
+USHORT = struct.Struct(">H")
+LENGTH = struct.Struct(">i")
+
+def decode_string(raw) -> str:
+    try:
+        return str(raw, "utf-8")
+    except UnicodeDecodeError:
+        # Java's modified UTF-8 encodes NUL and supplementary characters differently
+        import mutf8
+        return mutf8.decode_modified_utf8(bytes(raw))
+
+def skip_payload(buffer, offset: int, tag: int) -> int:
+    """
+    Returns the offset after a payload of this tag type without building any values
+    """
+    if size := FIXED_SIZES.get(tag):
+        return offset + size
+    if tag == STRING:
+        return offset + 2 + USHORT.unpack_from(buffer, offset)[0]
+    if tag == COMPOUND:
+        while True:
+            child = buffer[offset]
+            if child == END:
+                return offset + 1
+            offset += 3 + USHORT.unpack_from(buffer, offset + 1)[0]
+            offset = skip_payload(buffer, offset, child)
+    if tag == LIST:
+        child = buffer[offset]
+        length = LENGTH.unpack_from(buffer, offset + 1)[0]
+        offset += 5
+        if size := FIXED_SIZES.get(child):
+            return offset + size * max(length, 0)
+        for _ in range(length):
+            offset = skip_payload(buffer, offset, child)
+        return offset
+    if tag == BYTE_ARRAY:
+        return offset + 4 + LENGTH.unpack_from(buffer, offset)[0]
+    if tag == INT_ARRAY:
+        return offset + 4 + 4 * LENGTH.unpack_from(buffer, offset)[0]
+    if tag == LONG_ARRAY:
+        return offset + 4 + 8 * LENGTH.unpack_from(buffer, offset)[0]
+    if tag == END:
+        return offset
+    raise ValueError(f"Unknown NBT tag {tag}")
+
+def skip_nbt(buffer, offset=0) -> int:
+    """
+    Returns the offset after a network NBT value (a named root compound, or a lone TAG_End for none)
+    """
+    tag = buffer[offset]
+    if tag == END:
+        return offset + 1
+    offset += 3 + USHORT.unpack_from(buffer, offset + 1)[0]
+    return skip_payload(buffer, offset, tag)
+
+def read_payload(buffer, offset: int, tag: int):
+    if fixed := STRUCTS.get(tag):
+        return fixed.unpack_from(buffer, offset)[0]
+    if tag == STRING:
+        length = USHORT.unpack_from(buffer, offset)[0]
+        return decode_string(buffer[offset + 2:offset + 2 + length])
+    if tag == COMPOUND:
+        return LazyCompound(buffer, offset)
+    if tag == LIST:
+        return LazyList(buffer, offset)
+    if tag == BYTE_ARRAY:
+        length = LENGTH.unpack_from(buffer, offset)[0]
+        return bytes(buffer[offset + 4:offset + 4 + length])
+    if tag in ARRAY_FORMATS:
+        size, code = ARRAY_FORMATS[tag]
+        length = LENGTH.unpack_from(buffer, offset)[0]
+        return list(struct.unpack_from(f">{length}{code}", buffer, offset + 4))
+    raise ValueError(f"Unknown NBT tag {tag}")
+
+class LazyCompound(Mapping):
+    """
+    Read-only view of a compound payload, children are located on first access
+    """
+    __slots__ = ("buffer", "offset", "end", "_index", "_values")
+
+    def __init__(self, buffer, offset: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.end = None
+        self._index: dict[str, tuple[int, int]] = None
+        self._values: dict = {}
+
+    def index(self) -> dict[str, tuple[int, int]]:
+        if self._index is None:
+            buffer = self.buffer
+            offset = self.offset
+            index = {}
+            while True:
+                tag = buffer[offset]
+                if tag == END:
+                    break
+                length = USHORT.unpack_from(buffer, offset + 1)[0]
+                name = decode_string(buffer[offset + 3:offset + 3 + length])
+                offset += 3 + length
+                index[name] = (tag, offset)
+                offset = skip_payload(buffer, offset, tag)
+            self.end = offset + 1
+            self._index = index
+        return self._index
+
+    def tag(self, key: str) -> int:
+        return self.index()[key][0]
+
+    def __getitem__(self, key: str):
+        try:
+            return self._values[key]
+        except KeyError:
+            tag, offset = self.index()[key]
+            value = self._values[key] = read_payload(self.buffer, offset, tag)
+            return value
+
+    def __contains__(self, key):
+        return key in self.index()
+
+    def __iter__(self):
+        return iter(self.index())
+
+    def __len__(self):
+        return len(self.index())
+
+    def raw(self) -> bytes:
+        """
+        The original payload bytes
+        """
+        self.index()
+        return bytes(self.buffer[self.offset:self.end])
+
+    def __repr__(self):
+        return f"LazyCompound({dict(self)!r})"
+
+class LazyList(Sequence):
+    __slots__ = ("buffer", "offset", "tag", "length", "_offsets", "_values")
+
+    def __init__(self, buffer, offset: int):
+        self.buffer = buffer
+        self.tag = buffer[offset]
+        self.length = max(LENGTH.unpack_from(buffer, offset + 1)[0], 0)
+        self.offset = offset + 5
+        self._offsets: list[int] = None
+        self._values: dict[int, object] = {}
+
+    def offsets(self) -> list[int]:
+        if self._offsets is None:
+            if size := FIXED_SIZES.get(self.tag):
+                self._offsets = range(self.offset, self.offset + size * self.length, size)
+            else:
+                offsets = []
+                offset = self.offset
+                for _ in range(self.length):
+                    offsets.append(offset)
+                    offset = skip_payload(self.buffer, offset, self.tag)
+                self._offsets = offsets
+        return self._offsets
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("LazyList index out of range")
+        try:
+            return self._values[index]
+        except KeyError:
+            value = self._values[index] = read_payload(self.buffer, self.offsets()[index], self.tag)
+            return value
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return f"LazyList({list(self)!r})"
+
+class LazyNBT(Type):
+    __slots__ = ("raw", "name")
+
+    def __init__(self, value: LazyCompound | None, raw: bytes = b"\x00", name: str = ""):
+        """
+        value is None for a lone TAG_End, raw is the complete encoded NBT
+        """
+        super().__init__(value)
+        self.raw = raw
+        self.name = name
+
+    def serialize(self) -> bytes:
+        return self.raw
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        buffer = value.getbuffer()
+        try:
+            nbt, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return nbt
+
+    @classmethod
+    def encode(cls, value) -> bytes:
+        """
+        None is a lone TAG_End, NBT and pynbt compounds are encoded through pynbt
+        """
+        if isinstance(value, LazyNBT):
+            return value.raw
+        if value is None:
+            return bytes((END,))
+        if isinstance(value, NBT):
+            return value.serialize()
+        import pynbt
+        if isinstance(value, pynbt.TAG_Compound):
+            return NBT(value).serialize()
+        raise TypeError(f"Cannot encode {type(value).__name__} as NBT")
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        """
+        Copies the NBT bytes out of the buffer and returns a LazyNBT without decoding any tags
+        """
+        end = skip_nbt(buffer, offset)
+        raw = bytes(buffer[offset:end])
+        if raw[0] == END:
+            return cls(None), end
+        length = USHORT.unpack_from(raw, 1)[0]
+        return cls(LazyCompound(raw, 3 + length), raw, decode_string(raw[3:3 + length])), end
+
+    @staticmethod
+    def skip(buffer, offset=0) -> int:
+        return skip_nbt(buffer, offset)
+
+    def to_pynbt(self):
+        """
+        Builds the eager pynbt tree, for code that needs to modify the NBT
+        """
+        import pynbt
+        return pynbt.NBTFile(BytesIO(self.raw)) if self.value is not None else None
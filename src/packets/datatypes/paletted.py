@@ -0,0 +1,176 @@
+"""
+Chunk sections and paletted containers, decoded with numpy
+
+Entries are packed into big-endian longs from the least significant bit up, and never span two longs.
+Blocks are indexed [y, z, x]. Single-valued containers decode to a read-only broadcast array that takes no memory.
+"""
+
+from io import BytesIO
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    from .complex import VarInt
+    from .simple import Short
+    from .type import Type
+except ImportError:
+    from complex import VarInt
+    from simple import Short
+    from type import Type
+
+__all__ = ["PalettedContainer", "BlockStates", "Biomes", "ChunkSection", "Section"]
+
+BIG_ENDIAN_LONG = np.dtype(">u8")
+
+class PalettedContainer(Type):
+    __slots__ = ()
+
+    SIDE = 16
+    ENTRIES = 4096
+    MIN_INDIRECT = 4
+    MAX_INDIRECT = 8
+    DIRECT_BITS = 15
+
+    _SHIFTS: dict[int, np.ndarray] = {}
+
+    def __init__(self, value: np.ndarray):
+        super().__init__(value)
+
+    def serialize(self) -> bytes:
+        return self.encode(self.value)
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        buffer = value.getbuffer()
+        try:
+            array, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return cls(array)
+
+    @classmethod
+    def shifts(cls, bits: int) -> np.ndarray:
+        if (shifts := cls._SHIFTS.get(bits)) is None:
+            shifts = cls._SHIFTS[bits] = np.arange(0, 64 // bits * bits, bits, dtype=np.uint64)
+        return shifts
+
+    @classmethod
+    def unpack(cls, buffer, offset: int, length: int, bits: int) -> np.ndarray:
+        """
+        Unpacks the first ENTRIES fixed-width indices from length big-endian longs
+        """
+        longs = np.frombuffer(buffer, dtype=BIG_ENDIAN_LONG, count=length, offset=offset).astype(np.uint64)
+        indices = (longs[:, None] >> cls.shifts(bits)) & np.uint64((1 << bits) - 1)
+        return indices.reshape(-1)[:cls.ENTRIES]
+
+    @classmethod
+    def pack(cls, indices: np.ndarray, bits: int) -> bytes:
+        per_long = 64 // bits
+        length = -(-cls.ENTRIES // per_long)
+        padded = np.zeros(length * per_long, dtype=np.uint64)
+        padded[:cls.ENTRIES] = indices.reshape(-1)
+        longs = np.bitwise_or.reduce(padded.reshape(length, per_long) << cls.shifts(bits), axis=1)
+        return VarInt.encode(length) + longs.astype(BIG_ENDIAN_LONG).tobytes()
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        """
+        Returns a (SIDE, SIDE, SIDE) uint16 or uint32 array of palette values and the offset after the container
+        """
+        shape = (cls.SIDE,) * 3
+        bits = buffer[offset]
+        offset += 1
+
+        if bits == 0:
+            value, offset = VarInt.decode(buffer, offset)
+            length, offset = VarInt.decode(buffer, offset)
+            dtype = np.uint16 if value < 0x10000 else np.uint32
+            return np.broadcast_to(dtype(value), shape), offset + 8 * length
+
+        if bits <= cls.MAX_INDIRECT:
+            palette_length, offset = VarInt.decode(buffer, offset)
+            palette, offset = VarInt.decode_many(buffer, palette_length, offset)
+            length, offset = VarInt.decode(buffer, offset)
+            indices = cls.unpack(buffer, offset, length, max(bits, cls.MIN_INDIRECT))
+            palette = np.array(palette, dtype=np.uint16 if max(palette) < 0x10000 else np.uint32)
+            return palette[indices].reshape(shape), offset + 8 * length
+
+        length, offset = VarInt.decode(buffer, offset)
+        indices = cls.unpack(buffer, offset, length, bits)
+        return indices.astype(np.uint16 if bits <= 16 else np.uint32).reshape(shape), offset + 8 * length
+
+    @classmethod
+    def encode(cls, value: np.ndarray) -> bytes:
+        """
+        Picks the smallest palette the values fit in
+        """
+        palette, indices = np.unique(value, return_inverse=True)
+        if len(palette) == 1:
+            return b"\x00" + VarInt.encode(int(palette[0])) + VarInt.encode(0)
+
+        bits = max(int(len(palette) - 1).bit_length(), cls.MIN_INDIRECT)
+        if bits <= cls.MAX_INDIRECT:
+            return (bytes((bits,)) + VarInt.encode(len(palette)) + VarInt.encode_many(palette.tolist())
+                    + cls.pack(indices.astype(np.uint64), bits))
+
+        return bytes((cls.DIRECT_BITS,)) + cls.pack(np.asarray(value, dtype=np.uint64), cls.DIRECT_BITS)
+
+class BlockStates(PalettedContainer):
+    __slots__ = ()
+
+class Biomes(PalettedContainer):
+    __slots__ = ()
+
+    SIDE = 4
+    ENTRIES = 64
+    MIN_INDIRECT = 1
+    MAX_INDIRECT = 3
+    DIRECT_BITS = 6
+
+class Section(NamedTuple):
+    block_count: int
+    blocks: np.ndarray
+    biomes: np.ndarray
+
+class ChunkSection(Type):
+    __slots__ = ()
+
+    def __init__(self, value: Section):
+        super().__init__(value)
+
+    def serialize(self) -> bytes:
+        return self.encode(self.value)
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        buffer = value.getbuffer()
+        try:
+            section, offset = cls.decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return cls(section)
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        block_count, offset = Short.decode(buffer, offset)
+        blocks, offset = BlockStates.decode(buffer, offset)
+        biomes, offset = Biomes.decode(buffer, offset)
+        return Section(block_count, blocks, biomes), offset
+
+    @classmethod
+    def decode_many(cls, buffer, count: int, offset=0) -> tuple[list[Section], int]:
+        """
+        Decodes the sections of a Chunk Data packet, bottom to top
+        """
+        sections = []
+        for _ in range(count):
+            section, offset = cls.decode(buffer, offset)
+            sections.append(section)
+        return sections, offset
+
+    @classmethod
+    def encode(cls, value: Section) -> bytes:
+        return Short.encode(value.block_count) + BlockStates.encode(value.blocks) + Biomes.encode(value.biomes)
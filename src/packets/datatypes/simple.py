@@ -6,12 +6,25 @@ import struct
 from io import BytesIO
 
 try:
-    from type import Type
-except ImportError:
+    from .codec import *
     from .type import Type
+except ImportError:
+    from codec import *
+    from type import Type
 
 class SimpleType(Type):
+    """
+    Fixed-width types, encode and decode are the plain codec functions for the format
+    """
+    __slots__ = ()
+
     FORMAT = ""
+    STRUCT: struct.Struct = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.FORMAT:
+            cls.STRUCT = struct.Struct(cls.FORMAT)
 
     def __init__(self, value):
         super().__init__(value)
@@ -21,46 +34,99 @@ class SimpleType(Type):
 
     @classmethod
     def deserialize(cls, value: BytesIO):
-        return cls(struct.unpack(cls.FORMAT, value.read(struct.calcsize(cls.FORMAT))))
+        return cls(struct.unpack(cls.FORMAT, value.read(struct.calcsize(cls.FORMAT)))[0])
+
+    @classmethod
+    def encode(cls, value) -> bytes:
+        return cls.STRUCT.pack(value)
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        return cls.STRUCT.unpack_from(buffer, offset)[0], offset + cls.STRUCT.size
 
 class IntType(SimpleType):
+    __slots__ = ()
+
     def __init__(self, value: int):
         super().__init__(value)
 
 __all__ = ["Bool", "Byte", "UByte", "Short", "UShort", "Int", "Long", "Float", "Double"]
 
 class Bool(SimpleType):
+    __slots__ = ()
+
     FORMAT = "?"
+    encode = staticmethod(encode_bool)
+    decode = staticmethod(read_bool)
+
     def __init__(self, value: bool):
         super().__init__(value)
 
 class Byte(IntType):
+    __slots__ = ()
+
     FORMAT = ">b"
+    encode = staticmethod(encode_byte)
+    decode = staticmethod(read_byte)
 
 class UByte(IntType):
+    __slots__ = ()
+
     FORMAT = ">B"
+    encode = staticmethod(encode_ubyte)
+    decode = staticmethod(read_ubyte)
 
 class Short(IntType):
+    __slots__ = ()
+
     FORMAT = ">h"
+    encode = staticmethod(encode_short)
+    decode = staticmethod(read_short)
 
 class UShort(IntType):
+    __slots__ = ()
+
     FORMAT = ">H"
+    encode = staticmethod(encode_ushort)
+    decode = staticmethod(read_ushort)
 
 class Int(IntType):
+    __slots__ = ()
+
     FORMAT = ">i"
+    encode = staticmethod(encode_int)
+    decode = staticmethod(read_int)
 
 class Long(IntType):
+    __slots__ = ()
+
     FORMAT = ">q"
+    encode = staticmethod(encode_long)
+    decode = staticmethod(read_long)
 
 class ULong(IntType):
+    __slots__ = ()
+
     FORMAT = ">Q"
+    encode = staticmethod(encode_ulong)
+    decode = staticmethod(read_ulong)
 
 class Float(SimpleType):
+    __slots__ = ()
+
     FORMAT = ">f"
+    encode = staticmethod(encode_float)
+    decode = staticmethod(read_float)
+
     def __init__(self, value: float):
         super().__init__(value)
 
 class Double(SimpleType):
+    __slots__ = ()
+
     FORMAT = ">d"
+    encode = staticmethod(encode_double)
+    decode = staticmethod(read_double)
+
     def __init__(self, value: float):
         super().__init__(value)
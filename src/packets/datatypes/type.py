@@ -1,5 +1,8 @@
 """
 All datatypes must inherit from this class
+
+Instances only hold value and subclasses declare __slots__ too, so they carry no __dict__. Reading a field of
+the wrapped value goes through .value, the plain codec functions skip the wrapper entirely.
 """
 
 from io import BytesIO
@@ -7,6 +10,8 @@ from io import BytesIO
 __all__ = ["Type"]
 
 class Type:
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -17,5 +22,17 @@ class Type:
     def deserialize(cls, value: BytesIO):
         return cls(int(value.read(1)))
 
-    def __getattr__(self, item):
-        return getattr(self.value, item)
+    @classmethod
+    def encode(cls, value) -> bytes:
+        """
+        Serializes a plain value, types override this to skip creating an instance
+        """
+        return cls(value).serialize()
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        """
+        Deserializes a plain value from a bytes-like object at the offset, returns the value and the offset after it
+        """
+        stream = BytesIO(buffer[offset:])
+        return cls.deserialize(stream).value, offset + stream.tell()
@@ -0,0 +1,163 @@
+"""
+Packet dispatch table
+
+Handlers are registered per connection state in lists indexed by packet id, so routing a frame is one VarInt
+read and one list index. Frames without a handler are counted and dropped without decoding any field.
+Handlers get a LazyPacket that only decodes the first time a field is read, decoded packets are cached on it.
+With metrics set, handler time (including any decoding it triggers) and decode time are recorded while enabled,
+for one in every metrics.sample packets of each type.
+"""
+
+import time
+
+try:
+    from .datatypes import VarInt
+    from .packet import Packet
+    from .state import State
+except ImportError:
+    from datatypes import VarInt
+    from packet import Packet
+    from state import State
+
+__all__ = ["Dispatcher", "LazyPacket"]
+
+class LazyPacket:
+    """
+    A frame's fields, decoded on first access
+
+    The frame may be a view into a buffer that is reused once the handler returns,
+    call decode() to keep the packet for later.
+    Each packet type gets a subclass from of() with a property per field, so reads skip __getattr__.
+    """
+    __slots__ = ("packet_type", "buffer", "offset", "decoded", "timer", "_packet")
+
+    _types: dict[type[Packet], type["LazyPacket"]] = {}
+
+    @classmethod
+    def of(cls, packet_type: type[Packet]) -> type["LazyPacket"]:
+        if (lazy := cls._types.get(packet_type)) is None:
+            attributes = {"__slots__": ()}
+            for name, _ in packet_type.FIELDS:
+                attributes[name] = property(lambda self, name=name: getattr(self._packet or self.decode(), name))
+            lazy = cls._types[packet_type] = type(f"Lazy{packet_type.__name__}", (cls,), attributes)
+        return lazy
+
+    def __init__(self, packet_type: type[Packet], buffer, offset: int, decoded: list[int] = None, timer=None):
+        """
+        timer is a Histogram that decode times are recorded in
+        """
+        self.packet_type = packet_type
+        self.buffer = buffer
+        self.offset = offset
+        self.decoded = decoded
+        self.timer = timer
+        self._packet = None
+
+    def decode(self) -> Packet:
+        if self._packet is None:
+            if self.buffer is None:
+                raise RuntimeError(f"{self.packet_type.__name__} was not decoded before its frame was released")
+            if self.timer is None:
+                self._packet = self.packet_type.decode(self.buffer, self.offset)[0]
+            else:
+                start = time.perf_counter_ns()
+                self._packet = self.packet_type.decode(self.buffer, self.offset)[0]
+                self.timer.record(time.perf_counter_ns() - start)
+            self.buffer = None
+            if self.decoded is not None:
+                self.decoded[self.packet_type.ID] += 1
+        return self._packet
+
+    def __getattr__(self, name):
+        return getattr(self.decode(), name)
+
+    def __eq__(self, other):
+        return self.decode() == (other.decode() if isinstance(other, LazyPacket) else other)
+
+    def __repr__(self):
+        if self._packet is None:
+            return f"LazyPacket({self.packet_type.__name__})"
+        return repr(self._packet)
+
+class Dispatcher:
+    PACKET_IDS = 256
+
+    def __init__(self):
+        states = len(State)
+        self.table: list[list[tuple[type[Packet], type[LazyPacket], tuple] | None]] = [[None] * self.PACKET_IDS for _ in range(states)]
+        self.skipped = [[0] * self.PACKET_IDS for _ in range(states)]
+        self.dispatched = [[0] * self.PACKET_IDS for _ in range(states)]
+        self.decoded = [[0] * self.PACKET_IDS for _ in range(states)]
+        self.metrics = None
+
+    def register(self, state: State, packet_type: type[Packet], callback, lazy=True):
+        """
+        Calls callback with every packet of this type received in state, as a LazyPacket unless lazy is False
+        """
+        if not 0 <= packet_type.ID < self.PACKET_IDS:
+            raise ValueError(f"Packet id {packet_type.ID} of {packet_type.__name__} is out of range")
+        entry = self.table[state][packet_type.ID]
+        handlers = entry[2] if entry is not None and entry[0] is packet_type else ()
+        self.table[state][packet_type.ID] = (packet_type, LazyPacket.of(packet_type), handlers + ((callback, lazy),))
+
+    def unregister(self, state: State, packet_type: type[Packet], callback=None):
+        """
+        Removes callback, or every callback for the packet type if None
+        """
+        entry = self.table[state][packet_type.ID]
+        if entry is None or entry[0] is not packet_type:
+            return
+        handlers = tuple(handler for handler in entry[2] if callback is not None and handler[0] != callback)
+        self.table[state][packet_type.ID] = (packet_type, entry[1], handlers) if handlers else None
+
+    def handles(self, state: State, packet_id: int) -> bool:
+        return 0 <= packet_id < self.PACKET_IDS and self.table[state][packet_id] is not None
+
+    def skip(self, state: State, packet_id: int):
+        """
+        Counts a frame dropped before reaching dispatch, e.g. one never inflated
+        """
+        if 0 <= packet_id < self.PACKET_IDS:
+            self.skipped[state][packet_id] += 1
+
+    def dispatch(self, state: State, data, offset=0) -> bool:
+        """
+        Routes packet id and data to the handlers, returns whether there were any
+        """
+        packet_id = data[offset]
+        if packet_id < 0x80:
+            offset += 1
+        else:
+            packet_id, offset = VarInt.decode(data, offset)
+        if not 0 <= packet_id < self.PACKET_IDS or (entry := self.table[state][packet_id]) is None:
+            self.skip(state, packet_id)
+            return False
+
+        dispatched = self.dispatched[state]
+        dispatched[packet_id] += 1
+        packet_type, lazy_type, handlers = entry
+        metrics = self.metrics
+        if metrics is None or not metrics.enabled or dispatched[packet_id] % metrics.sample:
+            packet = lazy_type(packet_type, data, offset, self.decoded[state])
+            for callback, lazy in handlers:
+                callback(packet if lazy else packet.decode())
+        else:
+            start = time.perf_counter_ns()
+            packet = lazy_type(packet_type, data, offset, self.decoded[state], metrics.decode)
+            for callback, lazy in handlers:
+                callback(packet if lazy else packet.decode())
+            metrics.handler.record(time.perf_counter_ns() - start)
+        packet.buffer = None
+        return True
+
+    def stats(self) -> dict:
+        """
+        Nonzero counters per state and packet id
+        """
+        counters = {"skipped": self.skipped, "dispatched": self.dispatched, "decoded": self.decoded}
+        return {
+            name: {
+                state.name: {packet_id: count for packet_id, count in enumerate(counts[state]) if count}
+                for state in State if any(counts[state])
+            } for name, counts in counters.items()
+        }
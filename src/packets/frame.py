@@ -0,0 +1,135 @@
+"""
+Receive-side framing
+
+Incoming data is kept in one reusable bytearray and split into length-prefixed frames without copying.
+Frames are memoryviews into that buffer, so they are only valid until the next read into the reader.
+"""
+
+try:
+    from .datatypes import VarInt
+except ImportError:
+    from datatypes import VarInt
+
+__all__ = ["FrameReader", "Cursor", "FrameTooLarge"]
+
+class FrameTooLarge(RuntimeError):
+    pass
+
+class Cursor:
+    """
+    A memoryview and an offset that datatypes decode from
+    """
+    __slots__ = ("buffer", "offset")
+
+    def __init__(self, buffer, offset=0):
+        self.buffer = memoryview(buffer)
+        self.offset = offset
+
+    def read(self, datatype):
+        value, self.offset = datatype.decode(self.buffer, self.offset)
+        return value
+
+    def read_bytes(self, length: int) -> memoryview:
+        start = self.offset
+        self.offset += length
+        return self.buffer[start:self.offset]
+
+    def remaining(self) -> int:
+        return len(self.buffer) - self.offset
+
+class FrameReader:
+    MAX_FRAME = 2097151
+    MIN_READ = 16384
+
+    def __init__(self, size=65536):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        """
+        Number of buffered bytes that have not been returned as frames
+        """
+        return self.end - self.start
+
+    def reserve(self, size: int) -> memoryview:
+        """
+        Returns a writable view of at least size free bytes at the end of the buffered data
+        """
+        if len(self.buffer) - self.end >= size:
+            return self.view[self.end:]
+
+        pending = self.end - self.start
+        if len(self.buffer) - pending >= size and self.start:
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+        else:
+            # Frames handed out earlier may still reference the old buffer, so grow into a new one
+            buffer = bytearray(max(len(self.buffer) * 2, pending + size))
+            buffer[:pending] = self.view[self.start:self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        self.start = 0
+        self.end = pending
+        return self.view[pending:]
+
+    def recv_into(self, sock) -> int:
+        """
+        Reads from a socket straight into the buffer, returns the number of bytes read (0 on EOF)
+        """
+        received = sock.recv_into(self.reserve(self.MIN_READ))
+        self.end += received
+        return received
+
+    def feed(self, data):
+        """
+        Appends data that was already received, e.g. by an asyncio Protocol
+        """
+        size = len(data)
+        self.reserve(size)[:size] = data
+        self.end += size
+
+    def frames(self):
+        """
+        Yields every complete frame (packet id and data, without the length prefix) as a memoryview
+        """
+        while True:
+            buffer = self.buffer
+            start = self.start
+            end = self.end
+            if start == end:
+                self.start = self.end = 0
+                return
+
+            # The length is at most 3 bytes and may itself be split across reads
+            length = buffer[start]
+            offset = start + 1
+            if length & 0x80:
+                length &= 0x7F
+                shift = 7
+                while True:
+                    if offset == end:
+                        return
+                    current = buffer[offset]
+                    offset += 1
+                    length |= (current & 0x7F) << shift
+                    if not current & 0x80:
+                        break
+                    shift += 7
+                    if shift > 14:
+                        raise FrameTooLarge("Frame length is longer than 3 bytes")
+
+            if length > self.MAX_FRAME:
+                raise FrameTooLarge(f"Frame of {length} bytes is too large")
+            if end - offset < length:
+                return
+
+            self.start = offset + length
+            yield self.view[offset:self.start]
+
+    @staticmethod
+    def frame(data: bytes) -> bytes:
+        """
+        Prefixes packet data with its length
+        """
+        return VarInt.encode(len(data)) + data
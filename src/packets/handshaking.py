@@ -0,0 +1,19 @@
+"""
+Handshaking packets
+"""
+
+try:
+    from .datatypes import VarInt, String, UShort
+    from .packet import Packet
+except ImportError:
+    from datatypes import VarInt, String, UShort
+    from packet import Packet
+
+__all__ = ["Handshake"]
+
+class Handshake(Packet):
+    ID = 0x00
+    protocol_version: VarInt
+    server_address: String[255]
+    server_port: UShort
+    next_state: VarInt
@@ -0,0 +1,52 @@
+"""
+Login packets
+
+Packets ending in variable data that the client does not use only declare the fields it needs.
+"""
+
+try:
+    from .datatypes import VarInt, String, Identifier, Bool, UUID
+    from .packet import Packet
+except ImportError:
+    from datatypes import VarInt, String, Identifier, Bool, UUID
+    from packet import Packet
+
+__all__ = ["LoginDisconnect", "EncryptionRequest", "LoginSuccess", "SetCompression", "LoginPluginRequest",
+           "LoginStart", "LoginPluginResponse"]
+
+# Clientbound
+
+class LoginDisconnect(Packet):
+    ID = 0x00
+    reason: String[262144]
+
+class EncryptionRequest(Packet):
+    ID = 0x01
+    server_id: String[20]
+
+class LoginSuccess(Packet):
+    ID = 0x02
+    uuid: UUID
+    username: String[16]
+
+class SetCompression(Packet):
+    ID = 0x03
+    threshold: VarInt
+
+class LoginPluginRequest(Packet):
+    ID = 0x04
+    message_id: VarInt
+    channel: Identifier
+
+# Serverbound
+
+class LoginStart(Packet):
+    ID = 0x00
+    name: String[16]
+    has_player_uuid: Bool
+    player_uuid: UUID
+
+class LoginPluginResponse(Packet):
+    ID = 0x02
+    message_id: VarInt
+    successful: Bool
@@ -1,3 +1,142 @@
 """
 Base packet
+
+A packet lists its fields as class annotations using the datatypes, in wire order:
+
+    class SetPlayerPosition(Packet):
+        ID = 0x1A
+        x: Double
+        feet_y: Double
+        z: Double
+        on_ground: Bool
+
+When the class is created its fields are compiled into one encode and one decode function.
+Runs of consecutive fixed-width fields are merged into a single struct.Struct. Field names starting with an
+underscore are reserved for the compiled functions, and every annotation has to be a datatype.
 """
+
+import struct
+import typing
+from io import BytesIO
+
+try:
+    from .datatypes import VarInt
+    from .datatypes.simple import SimpleType
+    from .datatypes.type import Type
+except ImportError:
+    from datatypes import VarInt
+    from datatypes.simple import SimpleType
+    from datatypes.type import Type
+
+__all__ = ["Packet"]
+
+class Packet:
+    ID = -1
+    FIELDS: tuple[tuple[str, type[Type]], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Resolved, so string annotations and `from __future__ import annotations` work too
+        hints = typing.get_type_hints(cls)
+        fields = []
+        for name in cls.__dict__.get("__annotations__", {}):
+            datatype = hints[name]
+            if not (isinstance(datatype, type) and issubclass(datatype, Type)):
+                raise TypeError(f"{cls.__name__}.{name} is annotated with {datatype!r}, which is not a datatype")
+            if name.startswith("_") or name == "self":
+                raise TypeError(f"{cls.__name__}.{name} is a reserved field name")
+            fields.append((name, datatype))
+        cls.FIELDS = cls.FIELDS + tuple(fields)
+        cls._compile()
+
+    @classmethod
+    def _groups(cls):
+        """
+        Splits the fields into runs of fixed-width fields and single variable-width fields
+        """
+        groups = []
+        run = []
+        for name, datatype in cls.FIELDS:
+            if issubclass(datatype, SimpleType) and datatype.FORMAT:
+                run.append((name, datatype))
+                continue
+            if run:
+                groups.append(run)
+                run = []
+            groups.append((name, datatype))
+        if run:
+            groups.append(run)
+        return groups
+
+    @classmethod
+    def _compile(cls):
+        # Every name the generated code uses starts with an underscore, which no field may
+        names = [name for name, _ in cls.FIELDS]
+        namespace = {"_cls": cls, "_ID_BYTES": VarInt.encode(cls.ID)}
+        init = [f"def __init__(self, {', '.join(names)}):" if names else "def __init__(self):"]
+        init += [f"    self.{name} = {name}" for name in names] or ["    pass"]
+        encode = ["def _encode(self):", "    return b''.join((", "        _ID_BYTES,"]
+        decode = ["def _decode(_buffer, _offset):"]
+
+        for i, group in enumerate(cls._groups()):
+            if isinstance(group, list):
+                fused = struct.Struct(">" + "".join(datatype.FORMAT.lstrip("<>!=@") for _, datatype in group))
+                namespace[f"_struct_{i}"] = fused
+                fields = ", ".join(name for name, _ in group)
+                encode.append(f"        _struct_{i}.pack({', '.join(f'self.{name}' for name, _ in group)}),")
+                decode.append(f"    {fields}, = _struct_{i}.unpack_from(_buffer, _offset)")
+                decode.append(f"    _offset += {fused.size}")
+            else:
+                name, datatype = group
+                namespace[f"_encode_{i}"] = datatype.encode
+                namespace[f"_decode_{i}"] = datatype.decode
+                encode.append(f"        _encode_{i}(self.{name}),")
+                decode.append(f"    {name}, _offset = _decode_{i}(_buffer, _offset)")
+
+        encode.append("    ))")
+        decode.append(f"    return _cls({', '.join(names)}), _offset")
+
+        exec("\n".join(init + encode + decode), namespace)
+        cls.__init__ = namespace["__init__"]
+        cls._encode = namespace["_encode"]
+        cls._decode = staticmethod(namespace["_decode"])
+
+    def serialize(self) -> bytes:
+        """
+        The packet id followed by the fields
+        """
+        return self._encode()
+
+    @classmethod
+    def deserialize(cls, value: BytesIO):
+        """
+        Reads the fields of a packet whose id has already been read
+        """
+        buffer = value.getbuffer()
+        try:
+            packet, offset = cls._decode(buffer, value.tell())
+        finally:
+            buffer.release()
+        value.seek(offset)
+        return packet
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        """
+        Reads the fields of a packet whose id has already been read, returns the packet and the offset after it
+        """
+        return cls._decode(buffer, offset)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name, _ in self.FIELDS)
+
+    def __hash__(self):
+        """
+        Over the field values like __eq__, so packets with array or list fields are unhashable. Changing a field
+        of a packet in a set or dict loses it there.
+        """
+        return hash((type(self), *(getattr(self, name) for name, _ in self.FIELDS)))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name, _ in self.FIELDS)
+        return f"{self.__class__.__name__}({fields})"
@@ -0,0 +1,194 @@
+"""
+Play packets
+
+Packets ending in variable data that the client does not use only declare the fields it needs.
+"""
+
+try:
+    from .datatypes import *
+    from .packet import Packet
+except ImportError:
+    from datatypes import *
+    from packet import Packet
+
+__all__ = [
+    "SpawnEntity", "SpawnPlayer", "BlockUpdate", "PlayDisconnect", "UnloadChunk", "ClientboundKeepAlive", "ChunkData",
+    "UpdateEntityPosition", "UpdateEntityPositionAndRotation", "UpdateEntityRotation", "SynchronizePlayerPosition",
+    "RemoveEntities", "SetHeadRotation", "UpdateSectionBlocks", "SetCenterChunk", "SetEntityVelocity", "SystemChat",
+    "TeleportEntity", "ConfirmTeleportation", "ChatMessage", "ServerboundKeepAlive", "SetPlayerPosition",
+    "SetPlayerPositionAndRotation", "SwingArm",
+]
+
+# Clientbound
+
+class SpawnEntity(Packet):
+    ID = 0x01
+    entity_id: VarInt
+    entity_uuid: UUID
+    type: VarInt
+    x: Double
+    y: Double
+    z: Double
+    pitch: Angle
+    yaw: Angle
+    head_yaw: Angle
+    data: VarInt
+    velocity_x: Short
+    velocity_y: Short
+    velocity_z: Short
+
+class SpawnPlayer(Packet):
+    ID = 0x03
+    entity_id: VarInt
+    player_uuid: UUID
+    x: Double
+    y: Double
+    z: Double
+    yaw: Angle
+    pitch: Angle
+
+class BlockUpdate(Packet):
+    ID = 0x0A
+    location: Position
+    block_id: VarInt
+
+class PlayDisconnect(Packet):
+    ID = 0x1A
+    reason: String[262144]
+
+class UnloadChunk(Packet):
+    ID = 0x1E
+    chunk_x: Int
+    chunk_z: Int
+
+class ClientboundKeepAlive(Packet):
+    ID = 0x23
+    keep_alive_id: Long
+
+class ChunkData(Packet):
+    """
+    Only the chunk itself, block entities and light data follow
+    """
+    ID = 0x24
+    chunk_x: Int
+    chunk_z: Int
+    heightmaps: LazyNBT
+    data: ByteArray
+
+class UpdateEntityPosition(Packet):
+    ID = 0x2B
+    entity_id: VarInt
+    delta_x: Short
+    delta_y: Short
+    delta_z: Short
+    on_ground: Bool
+
+class UpdateEntityPositionAndRotation(Packet):
+    ID = 0x2C
+    entity_id: VarInt
+    delta_x: Short
+    delta_y: Short
+    delta_z: Short
+    yaw: Angle
+    pitch: Angle
+    on_ground: Bool
+
+class UpdateEntityRotation(Packet):
+    ID = 0x2D
+    entity_id: VarInt
+    yaw: Angle
+    pitch: Angle
+    on_ground: Bool
+
+class SynchronizePlayerPosition(Packet):
+    ID = 0x3C
+    x: Double
+    y: Double
+    z: Double
+    yaw: Float
+    pitch: Float
+    flags: Byte
+    teleport_id: VarInt
+
+class RemoveEntities(Packet):
+    ID = 0x3E
+    entity_ids: PrefixedArray[VarInt]
+
+class SetHeadRotation(Packet):
+    ID = 0x42
+    entity_id: VarInt
+    head_yaw: Angle
+
+class UpdateSectionBlocks(Packet):
+    ID = 0x43
+    section: SectionPosition
+    blocks: SectionBlocks
+
+class SetCenterChunk(Packet):
+    ID = 0x4E
+    chunk_x: VarInt
+    chunk_z: VarInt
+
+class SetEntityVelocity(Packet):
+    ID = 0x54
+    entity_id: VarInt
+    velocity_x: Short
+    velocity_y: Short
+    velocity_z: Short
+
+class SystemChat(Packet):
+    ID = 0x64
+    content: String[262144]
+    overlay: Bool
+
+class TeleportEntity(Packet):
+    ID = 0x68
+    entity_id: VarInt
+    x: Double
+    y: Double
+    z: Double
+    yaw: Angle
+    pitch: Angle
+    on_ground: Bool
+
+# Serverbound
+
+class ConfirmTeleportation(Packet):
+    ID = 0x00
+    teleport_id: VarInt
+
+class ChatMessage(Packet):
+    """
+    Unsigned chat, has_signature must be False
+    """
+    ID = 0x05
+    message: String[256]
+    timestamp: Long
+    salt: Long
+    has_signature: Bool
+    message_count: VarInt
+    acknowledged: FixedArray[UByte, 3]
+
+class ServerboundKeepAlive(Packet):
+    ID = 0x12
+    keep_alive_id: Long
+
+class SetPlayerPosition(Packet):
+    ID = 0x14
+    x: Double
+    feet_y: Double
+    z: Double
+    on_ground: Bool
+
+class SetPlayerPositionAndRotation(Packet):
+    ID = 0x15
+    x: Double
+    feet_y: Double
+    z: Double
+    yaw: Float
+    pitch: Float
+    on_ground: Bool
+
+class SwingArm(Packet):
+    ID = 0x2F
+    hand: VarInt
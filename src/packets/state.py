@@ -0,0 +1,15 @@
+"""
+Connection states
+"""
+
+from enum import IntEnum
+
+__all__ = ["State", "PROTOCOL_VERSION"]
+
+PROTOCOL_VERSION = 763  # 1.20.1
+
+class State(IntEnum):
+    HANDSHAKING = 0
+    STATUS = 1
+    LOGIN = 2
+    PLAY = 3
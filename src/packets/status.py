@@ -0,0 +1,31 @@
+"""
+Status packets, the server list ping
+"""
+
+try:
+    from .datatypes import Long, String
+    from .packet import Packet
+except ImportError:
+    from datatypes import Long, String
+    from packet import Packet
+
+__all__ = ["StatusResponse", "PongResponse", "StatusRequest", "PingRequest"]
+
+# Clientbound
+
+class StatusResponse(Packet):
+    ID = 0x00
+    json_response: String
+
+class PongResponse(Packet):
+    ID = 0x01
+    payload: Long
+
+# Serverbound
+
+class StatusRequest(Packet):
+    ID = 0x00
+
+class PingRequest(Packet):
+    ID = 0x01
+    payload: Long
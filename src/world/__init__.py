@@ -0,0 +1,6 @@
+try:
+    from .chunks import World, Chunk, CompactSection
+    from .entities import EntityTracker, Entity
+except ImportError:
+    from chunks import World, Chunk, CompactSection
+    from entities import EntityTracker, Entity
@@ -0,0 +1,378 @@
+"""
+World store
+
+Chunks are kept in a dict keyed by chunk x and z, each holding one CompactSection per 16 blocks of height.
+A section of one block state is a shared instance holding just that state. Otherwise its indices stay packed
+in longs the way the server sent them, so loading a chunk copies longs instead of unpacking 4096 entries,
+and looking a block up is a dict lookup, a list index and a shift. Chunks further than radius from the
+center chunk are dropped, and when max_bytes is set the furthest chunks go first until the store fits.
+"""
+
+import sys
+from array import array
+
+import numpy as np
+
+try:
+    from ..packets.datatypes.codec import read_varint
+    from ..packets.datatypes.paletted import Biomes, BlockStates
+    from ..packets.play import BlockUpdate, ChunkData, SetCenterChunk, UnloadChunk, UpdateSectionBlocks
+except ImportError:
+    from src.packets.datatypes.codec import read_varint
+    from src.packets.datatypes.paletted import Biomes, BlockStates
+    from src.packets.play import BlockUpdate, ChunkData, SetCenterChunk, UnloadChunk, UpdateSectionBlocks
+
+__all__ = ["World", "Chunk", "CompactSection"]
+
+ENTRIES = BlockStates.ENTRIES
+# A block state id as a Python int
+INT_SIZE = sys.getsizeof(1 << 20)
+
+class CompactSection:
+    """
+    The block states of a 16x16x16 section, indexed y << 8 | z << 4 | x
+
+    bits is 0 for a single state, up to MAX_INDIRECT for indices into palette, DIRECT_BITS for the states
+    themselves with palette None.
+    """
+    __slots__ = ("palette", "bits", "data", "mask", "per_long", "shared", "_indices")
+
+    MIN_INDIRECT = BlockStates.MIN_INDIRECT
+    MAX_INDIRECT = BlockStates.MAX_INDIRECT
+    DIRECT_BITS = BlockStates.DIRECT_BITS
+
+    _single: dict[int, "CompactSection"] = {}
+
+    def __init__(self, palette: list[int] | None, bits: int, data: array = None, shared=False):
+        self.palette = palette
+        self.bits = bits
+        self.data = data
+        self.mask = (1 << bits) - 1
+        self.per_long = 64 // bits if bits else 0
+        self.shared = shared
+        self._indices: dict[int, int] = None
+
+    @classmethod
+    def single(cls, state: int) -> "CompactSection":
+        """
+        The one instance for sections made only of state, never changed in place
+        """
+        if (section := cls._single.get(state)) is None:
+            section = cls._single[state] = cls([state], 0, shared=True)
+        return section
+
+    @classmethod
+    def decode(cls, buffer, offset=0) -> tuple["CompactSection", int]:
+        """
+        Reads a block states paletted container, copying its longs as they are
+        """
+        bits = buffer[offset]
+        offset += 1
+        if bits == 0:
+            state, offset = read_varint(buffer, offset)
+            length, offset = read_varint(buffer, offset)
+            return cls.single(state), offset + 8 * length
+
+        palette = None
+        if bits <= cls.MAX_INDIRECT:
+            bits = max(bits, cls.MIN_INDIRECT)
+            count, offset = read_varint(buffer, offset)
+            palette = []
+            for _ in range(count):
+                state, offset = read_varint(buffer, offset)
+                palette.append(state)
+        length, offset = read_varint(buffer, offset)
+        end = offset + 8 * length
+        data = array("Q", buffer[offset:end])
+        if sys.byteorder == "little":
+            data.byteswap()
+        return cls(palette, bits, data), end
+
+    def get(self, index: int) -> int:
+        if not (bits := self.bits):
+            return self.palette[0]
+        per_long = self.per_long
+        value = self.data[index // per_long] >> (index % per_long * bits) & self.mask
+        return value if (palette := self.palette) is None else palette[value]
+
+    def set(self, index: int, state: int) -> "CompactSection":
+        """
+        Sets one block and returns the section to keep, which is a new one if this one is shared or had to grow
+        """
+        if self.shared:
+            if state == self.palette[0]:
+                return self
+            section = CompactSection(list(self.palette), self.MIN_INDIRECT, array("Q", bytes(8 * -(-ENTRIES // 16))))
+            return section.set(index, state)
+
+        value = state
+        if self.palette is not None:
+            if self._indices is None:
+                self._indices = {state: i for i, state in enumerate(self.palette)}
+            if (value := self._indices.get(state)) is None:
+                if len(self.palette) > self.mask:
+                    return self.grow().set(index, state)
+                value = self._indices[state] = len(self.palette)
+                self.palette.append(state)
+
+        per_long = self.per_long
+        shift = index % per_long * self.bits
+        long_index = index // per_long
+        self.data[long_index] = self.data[long_index] & ~(self.mask << shift) | value << shift
+        return self
+
+    def states(self) -> np.ndarray:
+        """
+        All 4096 states as a (16, 16, 16) array indexed [y, z, x]
+        """
+        if not self.bits:
+            return np.broadcast_to(np.uint32(self.palette[0]), (16, 16, 16))
+        longs = np.frombuffer(self.data, dtype=np.uint64)
+        values = ((longs[:, None] >> BlockStates.shifts(self.bits)) & np.uint64(self.mask)).reshape(-1)[:ENTRIES]
+        if self.palette is not None:
+            values = np.array(self.palette, dtype=np.uint32)[values]
+        return values.astype(np.uint32).reshape(16, 16, 16)
+
+    @classmethod
+    def pack(cls, states: np.ndarray, bits=0) -> "CompactSection":
+        """
+        The smallest section of at least bits per entry holding these states
+        """
+        palette, indices = np.unique(states, return_inverse=True)
+        if len(palette) == 1 and not bits:
+            return cls.single(int(palette[0]))
+        bits = max(int(len(palette) - 1).bit_length(), bits, cls.MIN_INDIRECT)
+        if bits > cls.MAX_INDIRECT:
+            bits, palette, indices = cls.DIRECT_BITS, None, np.asarray(states)
+        per_long = 64 // bits
+        padded = np.zeros(-(-ENTRIES // per_long) * per_long, dtype=np.uint64)
+        padded[:ENTRIES] = indices.reshape(-1)
+        longs = np.bitwise_or.reduce(padded.reshape(-1, per_long) << BlockStates.shifts(bits), axis=1)
+        return cls(None if palette is None else palette.tolist(), bits, array("Q", longs.tobytes()))
+
+    def grow(self) -> "CompactSection":
+        """
+        A copy with one more bit per entry, direct past MAX_INDIRECT
+        """
+        return self.pack(self.states(), self.bits + 1)
+
+    def nbytes(self) -> int:
+        """
+        Memory held by this section alone, shared sections count as nothing
+        """
+        if self.shared:
+            return 0
+        size = sys.getsizeof(self) + sys.getsizeof(self.data)
+        if self.palette is not None:
+            size += sys.getsizeof(self.palette) + INT_SIZE * len(self.palette)
+        if self._indices is not None:
+            size += sys.getsizeof(self._indices)
+        return size
+
+class Chunk:
+    __slots__ = ("x", "z", "sections", "nbytes")
+
+    def __init__(self, x: int, z: int, sections: list[CompactSection]):
+        self.x = x
+        self.z = z
+        self.sections = sections
+        self.nbytes = self.measure()
+
+    def measure(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.sections) + sum(section.nbytes() for section in self.sections)
+
+class World:
+    def __init__(self, radius: int = None, max_bytes: int = None, min_y=-64, height=384):
+        """
+        min_y and height are those of the dimension, the overworld's by default
+        """
+        self.radius = radius
+        self.max_bytes = max_bytes
+        self.min_y = min_y
+        self.height = height
+        self.chunks: dict[tuple[int, int], Chunk] = {}
+        self.center = (0, 0)
+        self.nbytes = 0
+        self.evicted = 0
+
+    def attach(self, client):
+        """
+        Registers the packet handlers with a Client or AsyncClient
+        """
+        client.on(ChunkData, self.chunk_data)
+        client.on(UnloadChunk, self.unload_chunk)
+        client.on(BlockUpdate, self.block_update)
+        client.on(UpdateSectionBlocks, self.section_blocks)
+        client.on(SetCenterChunk, self.center_chunk)
+
+    # Packet handlers
+
+    def chunk_data(self, packet: ChunkData):
+        self.load(packet.chunk_x, packet.chunk_z, packet.data)
+
+    def unload_chunk(self, packet: UnloadChunk):
+        self.unload(packet.chunk_x, packet.chunk_z)
+
+    def block_update(self, packet: BlockUpdate):
+        self.set_block(*packet.location, packet.block_id)
+
+    def section_blocks(self, packet: UpdateSectionBlocks):
+        section_x, section_y, section_z = packet.section
+        states, positions = packet.blocks
+        chunk = self.chunks.get((section_x, section_z))
+        if chunk is None or not 0 <= (index := section_y - (self.min_y >> 4)) < len(chunk.sections):
+            return
+        previous = chunk.sections[index]
+        size = previous.nbytes()
+        section = previous
+        for state, (x, y, z) in zip(states.tolist(), positions.tolist()):
+            section = section.set(y << 8 | z << 4 | x, state)
+        self.replace(chunk, index, section, size)
+
+    def center_chunk(self, packet: SetCenterChunk):
+        self.set_center(packet.chunk_x, packet.chunk_z)
+
+    # Store
+
+    def load(self, chunk_x: int, chunk_z: int, data) -> Chunk | None:
+        """
+        Stores a chunk from the data of a Chunk Data packet, returns None if it is outside the radius
+        """
+        if not self.within(chunk_x, chunk_z):
+            self.evicted += 1
+            return None
+        sections = []
+        offset = 0
+        count = self.height >> 4
+        while len(sections) < count and offset < len(data):
+            section, offset = CompactSection.decode(data, offset + 2)
+            sections.append(section)
+            offset = self.skip_biomes(data, offset)
+        sections.extend([CompactSection.single(0)] * (count - len(sections)))
+
+        self.unload(chunk_x, chunk_z)
+        chunk = self.chunks[chunk_x, chunk_z] = Chunk(chunk_x, chunk_z, sections)
+        self.nbytes += chunk.nbytes
+        if self.max_bytes is not None and self.nbytes > self.max_bytes:
+            self.shrink(self.max_bytes)
+        return chunk
+
+    @staticmethod
+    def skip_biomes(buffer, offset: int) -> int:
+        bits = buffer[offset]
+        offset += 1
+        if bits == 0:
+            offset = read_varint(buffer, offset)[1]
+        elif bits <= Biomes.MAX_INDIRECT:
+            count, offset = read_varint(buffer, offset)
+            for _ in range(count):
+                offset = read_varint(buffer, offset)[1]
+        length, offset = read_varint(buffer, offset)
+        return offset + 8 * length
+
+    def unload(self, chunk_x: int, chunk_z: int) -> bool:
+        if (chunk := self.chunks.pop((chunk_x, chunk_z), None)) is None:
+            return False
+        self.nbytes -= chunk.nbytes
+        return True
+
+    def block(self, x: int, y: int, z: int) -> int | None:
+        """
+        The block state at a position, None if its chunk is not loaded or y is outside the world
+        """
+        chunk = self.chunks.get((x >> 4, z >> 4))
+        if chunk is None:
+            return None
+        sections = chunk.sections
+        if not 0 <= (index := (y - self.min_y) >> 4) < len(sections):
+            return None
+        # CompactSection.get, inlined as this is the hot path
+        section = sections[index]
+        if not (bits := section.bits):
+            return section.palette[0]
+        index = (y & 15) << 8 | (z & 15) << 4 | (x & 15)
+        per_long = section.per_long
+        value = section.data[index // per_long] >> (index % per_long * bits) & section.mask
+        return value if (palette := section.palette) is None else palette[value]
+
+    def __getitem__(self, position: tuple[int, int, int]) -> int:
+        if (state := self.block(*position)) is None:
+            raise KeyError(position)
+        return state
+
+    def set_block(self, x: int, y: int, z: int, state: int) -> bool:
+        """
+        Returns False if the chunk is not loaded
+        """
+        chunk = self.chunks.get((x >> 4, z >> 4))
+        index = (y - self.min_y) >> 4
+        if chunk is None or not 0 <= index < len(chunk.sections):
+            return False
+        section = chunk.sections[index]
+        size = section.nbytes()
+        self.replace(chunk, index, section.set((y & 15) << 8 | (z & 15) << 4 | (x & 15), state), size)
+        return True
+
+    def replace(self, chunk: Chunk, index: int, section: CompactSection, size: int):
+        """
+        Stores a changed section that took size bytes before the change
+        """
+        chunk.sections[index] = section
+        change = section.nbytes() - size
+        chunk.nbytes += change
+        self.nbytes += change
+        if change > 0 and self.max_bytes is not None and self.nbytes > self.max_bytes:
+            self.shrink(self.max_bytes)
+
+    # Eviction
+
+    def distance(self, chunk_x: int, chunk_z: int) -> int:
+        """
+        Chebyshev distance in chunks from the center, the shape of the server's view distance
+        """
+        return max(abs(chunk_x - self.center[0]), abs(chunk_z - self.center[1]))
+
+    def within(self, chunk_x: int, chunk_z: int) -> bool:
+        return self.radius is None or self.distance(chunk_x, chunk_z) <= self.radius
+
+    def set_center(self, chunk_x: int, chunk_z: int):
+        """
+        Moves the center and drops chunks outside the radius
+        """
+        self.center = (chunk_x, chunk_z)
+        if self.radius is not None:
+            for key in [key for key in self.chunks if not self.within(*key)]:
+                self.unload(*key)
+                self.evicted += 1
+
+    def shrink(self, max_bytes: int):
+        """
+        Drops the furthest chunks until the store takes at most max_bytes
+        """
+        for key in sorted(self.chunks, key=lambda key: self.distance(*key), reverse=True):
+            if self.nbytes <= max_bytes:
+                break
+            self.unload(*key)
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __contains__(self, chunk: tuple[int, int]):
+        return chunk in self.chunks
+
+    def memory(self) -> dict:
+        """
+        Bytes held by the store, per chunk on average, and how many sections are single-valued and shared
+        """
+        sections = [section for chunk in self.chunks.values() for section in chunk.sections]
+        shared = sum(1 for section in sections if section.shared)
+        return {
+            "chunks": len(self.chunks),
+            "bytes": self.nbytes,
+            "bytes_per_chunk": self.nbytes / len(self.chunks) if self.chunks else 0.0,
+            "sections": len(sections),
+            "shared_sections": shared,
+            "direct_sections": sum(1 for section in sections if section.palette is None),
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,380 @@
+"""
+Entity tracker
+
+Entities are stored as structs of arrays: one numpy array per attribute, indexed by a slot that the entity keeps
+until it is removed. Freed slots go on a free list and are reused before the arrays grow. Relative moves,
+rotations and velocities are appended to pending lists by the packet handlers and applied with a few vectorized
+operations by flush(), which queries call first. Only entities whose cell changed are moved in the grid, a dict
+of sets of slots keyed by the horizontal cell, so radius and nearest queries look at nearby cells only.
+"""
+
+import math
+from collections import Counter
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    from ..packets.play import (
+        RemoveEntities, SetEntityVelocity, SetHeadRotation, SpawnEntity, SpawnPlayer, TeleportEntity,
+        UpdateEntityPosition, UpdateEntityPositionAndRotation, UpdateEntityRotation,
+    )
+except ImportError:
+    from src.packets.play import (
+        RemoveEntities, SetEntityVelocity, SetHeadRotation, SpawnEntity, SpawnPlayer, TeleportEntity,
+        UpdateEntityPosition, UpdateEntityPositionAndRotation, UpdateEntityRotation,
+    )
+
+__all__ = ["EntityTracker", "Entity"]
+
+class Entity(NamedTuple):
+    entity_id: int
+    type: int
+    position: tuple[float, float, float]
+    velocity: tuple[float, float, float]
+    yaw: float
+    pitch: float
+    head_yaw: float
+    on_ground: bool
+
+class EntityTracker:
+    # minecraft:player in the 1.20.1 entity type registry, players are spawned without a type
+    PLAYER = 122
+    # Relative moves are in 1/4096 of a block and velocities in 1/8000 of a block per tick
+    DELTA_SCALE = 4096
+    VELOCITY_SCALE = 8000
+
+    def __init__(self, capacity=1024, cell_size=16.0):
+        """
+        capacity is the initial number of slots, the arrays double when they run out
+        """
+        self.capacity = capacity
+        self.cell_size = cell_size
+
+        self.position = np.zeros((capacity, 3), dtype=np.float64)
+        self.velocity = np.zeros((capacity, 3), dtype=np.float32)
+        # Yaw, pitch and head yaw in degrees
+        self.rotation = np.zeros((capacity, 3), dtype=np.float32)
+        self.on_ground = np.zeros(capacity, dtype=bool)
+        self.type = np.full(capacity, -1, dtype=np.int32)
+        self.entity_id = np.full(capacity, -1, dtype=np.int64)
+        self.cell = np.zeros((capacity, 2), dtype=np.int64)
+
+        self.slots: dict[int, int] = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.grid: dict[tuple[int, int], set[int]] = {}
+        self.types = Counter()
+
+        # Flat lists of slot and values, see flush()
+        self.moves: list = []
+        self.rotations: list = []
+        self.head_rotations: list = []
+        self.velocities: list = []
+        # Slots with anything pending, which are flushed before the slot is reused or teleported
+        self.dirty: set[int] = set()
+
+    def attach(self, client):
+        """
+        Registers the packet handlers with a Client or AsyncClient
+        """
+        for packet_type, handler in (
+            (SpawnEntity, self.spawn_entity), (SpawnPlayer, self.spawn_player), (RemoveEntities, self.remove_entities),
+            (UpdateEntityPosition, self.update_position), (UpdateEntityPositionAndRotation, self.update_position_and_rotation),
+            (UpdateEntityRotation, self.update_rotation), (SetHeadRotation, self.head_rotation),
+            (SetEntityVelocity, self.entity_velocity), (TeleportEntity, self.teleport_entity),
+        ):
+            # Every field is read, so the packets are decoded up front
+            client.on(packet_type, handler, lazy=False)
+
+    # Packet handlers
+
+    def spawn_entity(self, packet: SpawnEntity):
+        scale = self.VELOCITY_SCALE
+        self.spawn(packet.entity_id, packet.type, packet.x, packet.y, packet.z, packet.yaw, packet.pitch, packet.head_yaw,
+                   (packet.velocity_x / scale, packet.velocity_y / scale, packet.velocity_z / scale))
+
+    def spawn_player(self, packet: SpawnPlayer):
+        self.spawn(packet.entity_id, self.PLAYER, packet.x, packet.y, packet.z, packet.yaw, packet.pitch, packet.yaw)
+
+    def remove_entities(self, packet: RemoveEntities):
+        for entity_id in packet.entity_ids:
+            self.remove(int(entity_id))
+
+    def update_position(self, packet: UpdateEntityPosition):
+        if (slot := self.slots.get(packet.entity_id)) is not None:
+            self.moves += (slot, packet.delta_x, packet.delta_y, packet.delta_z, packet.on_ground)
+            self.dirty.add(slot)
+
+    def update_position_and_rotation(self, packet: UpdateEntityPositionAndRotation):
+        if (slot := self.slots.get(packet.entity_id)) is not None:
+            self.moves += (slot, packet.delta_x, packet.delta_y, packet.delta_z, packet.on_ground)
+            self.rotations += (slot, packet.yaw, packet.pitch)
+            self.dirty.add(slot)
+
+    def update_rotation(self, packet: UpdateEntityRotation):
+        if (slot := self.slots.get(packet.entity_id)) is not None:
+            self.rotations += (slot, packet.yaw, packet.pitch)
+            self.dirty.add(slot)
+
+    def head_rotation(self, packet: SetHeadRotation):
+        if (slot := self.slots.get(packet.entity_id)) is not None:
+            self.head_rotations += (slot, packet.head_yaw)
+            self.dirty.add(slot)
+
+    def entity_velocity(self, packet: SetEntityVelocity):
+        if (slot := self.slots.get(packet.entity_id)) is not None:
+            self.velocities += (slot, packet.velocity_x, packet.velocity_y, packet.velocity_z)
+            self.dirty.add(slot)
+
+    def teleport_entity(self, packet: TeleportEntity):
+        self.teleport(packet.entity_id, packet.x, packet.y, packet.z, packet.yaw, packet.pitch, packet.on_ground)
+
+    # Updates
+
+    def spawn(self, entity_id: int, entity_type: int, x: float, y: float, z: float, yaw=0.0, pitch=0.0, head_yaw=0.0,
+              velocity=(0.0, 0.0, 0.0)) -> int:
+        """
+        Adds an entity, replacing any with the same id, and returns its slot
+        """
+        self.remove(entity_id)
+        if not self.free:
+            self.grow()
+        slot = self.free.pop()
+        self.slots[entity_id] = slot
+        self.entity_id[slot] = entity_id
+        self.type[slot] = entity_type
+        self.types[entity_type] += 1
+        self.position[slot] = (x, y, z)
+        self.velocity[slot] = velocity
+        self.rotation[slot] = (yaw, pitch, head_yaw)
+        self.on_ground[slot] = False
+        cell = (math.floor(x / self.cell_size), math.floor(z / self.cell_size))
+        self.cell[slot] = cell
+        self.grid.setdefault(cell, set()).add(slot)
+        return slot
+
+    def remove(self, entity_id: int) -> bool:
+        if (slot := self.slots.get(entity_id)) is None:
+            return False
+        if slot in self.dirty:
+            self.flush()
+        del self.slots[entity_id]
+        cell = tuple(self.cell[slot].tolist())
+        cells = self.grid[cell]
+        cells.discard(slot)
+        if not cells:
+            del self.grid[cell]
+        self.types[int(self.type[slot])] -= 1
+        self.type[slot] = -1
+        self.entity_id[slot] = -1
+        self.free.append(slot)
+        return True
+
+    def move(self, entity_id: int, dx: float, dy: float, dz: float, on_ground=False):
+        """
+        Queues a relative move in blocks
+        """
+        if (slot := self.slots.get(entity_id)) is not None:
+            scale = self.DELTA_SCALE
+            self.moves += (slot, dx * scale, dy * scale, dz * scale, on_ground)
+            self.dirty.add(slot)
+
+    def teleport(self, entity_id: int, x: float, y: float, z: float, yaw: float = None, pitch: float = None, on_ground=False):
+        if (slot := self.slots.get(entity_id)) is None:
+            return
+        if slot in self.dirty:
+            self.flush()
+        self.position[slot] = (x, y, z)
+        if yaw is not None:
+            self.rotation[slot, 0] = yaw
+        if pitch is not None:
+            self.rotation[slot, 1] = pitch
+        self.on_ground[slot] = on_ground
+        self.relocate(slot, math.floor(x / self.cell_size), math.floor(z / self.cell_size))
+
+    def relocate(self, slot: int, cell_x: int, cell_z: int):
+        previous = tuple(self.cell[slot].tolist())
+        cell = (cell_x, cell_z)
+        if cell == previous:
+            return
+        cells = self.grid[previous]
+        cells.discard(slot)
+        if not cells:
+            del self.grid[previous]
+        self.grid.setdefault(cell, set()).add(slot)
+        self.cell[slot] = cell
+
+    def grow(self):
+        """
+        Doubles every array, the new slots go on the free list
+        """
+        capacity = self.capacity
+        for name in ("position", "velocity", "rotation", "on_ground", "type", "entity_id", "cell"):
+            current = getattr(self, name)
+            grown = np.full((2 * capacity,) + current.shape[1:], -1 if name in ("type", "entity_id") else 0, dtype=current.dtype)
+            grown[:capacity] = current
+            setattr(self, name, grown)
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+        self.capacity = 2 * capacity
+
+    def flush(self):
+        """
+        Applies the pending updates, later updates of the same entity win
+        """
+        if self.moves:
+            moves = np.array(self.moves, dtype=np.float64).reshape(-1, 5)
+            self.moves = []
+            slots = moves[:, 0].astype(np.intp)
+            np.add.at(self.position, slots, moves[:, 1:4] / self.DELTA_SCALE)
+            self.on_ground[slots] = moves[:, 4].astype(bool)
+
+            moved = np.unique(slots)
+            cells = np.floor(self.position[moved][:, [0, 2]] / self.cell_size).astype(np.int64)
+            changed = np.flatnonzero((cells != self.cell[moved]).any(axis=1))
+            if len(changed):
+                grid = self.grid
+                for slot, previous, cell in zip(moved[changed].tolist(), self.cell[moved[changed]].tolist(),
+                                                cells[changed].tolist()):
+                    previous, cell = tuple(previous), tuple(cell)
+                    cells_before = grid[previous]
+                    cells_before.discard(slot)
+                    if not cells_before:
+                        del grid[previous]
+                    grid.setdefault(cell, set()).add(slot)
+                self.cell[moved[changed]] = cells[changed]
+
+        if self.rotations:
+            rotations = np.array(self.rotations, dtype=np.float64).reshape(-1, 3)
+            self.rotations = []
+            self.rotation[rotations[:, 0].astype(np.intp), :2] = rotations[:, 1:]
+        if self.head_rotations:
+            head_rotations = np.array(self.head_rotations, dtype=np.float64).reshape(-1, 2)
+            self.head_rotations = []
+            self.rotation[head_rotations[:, 0].astype(np.intp), 2] = head_rotations[:, 1]
+        if self.velocities:
+            velocities = np.array(self.velocities, dtype=np.float64).reshape(-1, 4)
+            self.velocities = []
+            self.velocity[velocities[:, 0].astype(np.intp)] = velocities[:, 1:] / self.VELOCITY_SCALE
+        self.dirty.clear()
+
+    # Queries
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, entity_id: int):
+        return entity_id in self.slots
+
+    def __getitem__(self, entity_id: int) -> Entity:
+        self.flush()
+        slot = self.slots[entity_id]
+        yaw, pitch, head_yaw = self.rotation[slot].tolist()
+        return Entity(entity_id, int(self.type[slot]), tuple(self.position[slot].tolist()),
+                      tuple(self.velocity[slot].tolist()), yaw, pitch, head_yaw, bool(self.on_ground[slot]))
+
+    def _candidates(self, cells) -> np.ndarray:
+        grid = self.grid
+        slots = [slot for cell in cells if (entries := grid.get(cell)) for slot in entries]
+        return np.array(slots, dtype=np.intp)
+
+    def _outside(self, center_x: int, center_z: int, ring: int, entity_type: int = None) -> np.ndarray:
+        """
+        The slots in cells ring or more cells away from the center cell, of one type straight from the type array
+        """
+        if entity_type is not None:
+            slots = np.flatnonzero(self.type == entity_type)
+            cells = self.cell[slots]
+            return slots[np.maximum(np.abs(cells[:, 0] - center_x), np.abs(cells[:, 1] - center_z)) >= ring]
+        return self._candidates([cell for cell in self.grid
+                                 if max(abs(cell[0] - center_x), abs(cell[1] - center_z)) >= ring])
+
+    def _filter(self, slots: np.ndarray, x: float, y: float, z: float, entity_type: int = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The slots of the given type and their squared distances
+        """
+        if entity_type is not None:
+            slots = slots[self.type[slots] == entity_type]
+        offsets = self.position[slots] - (x, y, z)
+        return slots, np.einsum("ij,ij->i", offsets, offsets)
+
+    def within(self, x: float, y: float, z: float, radius: float, entity_type: int = None) -> np.ndarray:
+        """
+        Ids of the entities at most radius blocks away, optionally only of one type
+        """
+        self.flush()
+        size = self.cell_size
+        x_range = range(math.floor((x - radius) / size), math.floor((x + radius) / size) + 1)
+        z_range = range(math.floor((z - radius) / size), math.floor((z + radius) / size) + 1)
+        if len(x_range) * len(z_range) > len(self.grid):
+            cells = [cell for cell in self.grid if cell[0] in x_range and cell[1] in z_range]
+        else:
+            cells = [(cell_x, cell_z) for cell_x in x_range for cell_z in z_range]
+        slots, distances = self._filter(self._candidates(cells), x, y, z, entity_type)
+        return self.entity_id[slots[distances <= radius * radius]]
+
+    def nearest(self, x: float, y: float, z: float, entity_type: int = None, max_distance=math.inf,
+                exclude: int = None) -> tuple[int, float] | None:
+        """
+        Id of and distance to the nearest entity, optionally of one type, searching rings of cells outwards
+
+        exclude is an entity id to skip, such as the player's own.
+        """
+        self.flush()
+        remaining = len(self.slots) if entity_type is None else self.types[entity_type]
+        if exclude is not None and exclude in self.slots:
+            if entity_type is None or self.type[self.slots[exclude]] == entity_type:
+                remaining -= 1
+        if remaining <= 0:
+            return None
+
+        size = self.cell_size
+        center_x, center_z = math.floor(x / size), math.floor(z / size)
+        # Distance from the point to the edge of its own cell, the closest anything outside ring k can be is
+        # this plus (k - 1) cells
+        edge = min(x - center_x * size, (center_x + 1) * size - x, z - center_z * size, (center_z + 1) * size - z)
+        best_slot, best = None, math.inf
+        ring = 0
+        while remaining > 0 and edge + (ring - 1) * size < min(best, max_distance):
+            # Like within(), once a ring has more cells than are occupied or than there are entities left to find,
+            # everything outside the rings searched so far is checked at once
+            ring_cells = 8 * ring or 1
+            if ring_cells > len(self.grid) or ring_cells > remaining:
+                slots, distances = self._filter(self._outside(center_x, center_z, ring, entity_type), x, y, z, entity_type)
+                if exclude is not None and len(slots):
+                    keep = self.entity_id[slots] != exclude
+                    slots, distances = slots[keep], distances[keep]
+                if len(slots):
+                    index = int(np.argmin(distances))
+                    if (distance := math.sqrt(distances[index])) < best:
+                        best_slot, best = int(slots[index]), distance
+                break
+            if ring == 0:
+                cells = [(center_x, center_z)]
+            else:
+                low_x, high_x, low_z, high_z = center_x - ring, center_x + ring, center_z - ring, center_z + ring
+                cells = [(cell_x, low_z) for cell_x in range(low_x, high_x + 1)]
+                cells += [(cell_x, high_z) for cell_x in range(low_x, high_x + 1)]
+                cells += [(low_x, cell_z) for cell_z in range(low_z + 1, high_z)]
+                cells += [(high_x, cell_z) for cell_z in range(low_z + 1, high_z)]
+            slots, distances = self._filter(self._candidates(cells), x, y, z, entity_type)
+            if exclude is not None and len(slots):
+                keep = self.entity_id[slots] != exclude
+                slots, distances = slots[keep], distances[keep]
+            if len(slots):
+                remaining -= len(slots)
+                index = int(np.argmin(distances))
+                if (distance := math.sqrt(distances[index])) < best:
+                    best_slot, best = int(slots[index]), distance
+            ring += 1
+        if best_slot is None or best > max_distance:
+            return None
+        return int(self.entity_id[best_slot]), best
+
+    def stats(self) -> dict:
+        return {
+            "entities": len(self.slots),
+            "capacity": self.capacity,
+            "cells": len(self.grid),
+            "pending": len(self.dirty),
+            "types": len(+self.types),
+        }
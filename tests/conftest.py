@@ -0,0 +1,136 @@
+"""
+A local stub of the Microsoft, Xbox Live and Minecraft endpoints MicrosoftAuth talks to, and a stand-in browser
+that follows the OAuth redirect straight away
+"""
+
+import json
+import socket
+import threading
+import time
+import urllib.request
+import webbrowser
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pytest
+
+from src.auth.microsoft_auth import MicrosoftAuth
+
+AUTH_CODE = "code-ok"
+REFRESH_TOKEN = "refresh-ok"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body: dict, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        time.sleep(stub.latency)
+        if self.path == "/token":
+            form = {key: values[0] for key, values in parse_qs(body).items()}
+            stub.requests[f"token:{form['grant_type']}"] += 1
+            if form["grant_type"] == "authorization_code" and form.get("code") == AUTH_CODE:
+                self.reply({"access_token": "ms-access", "refresh_token": REFRESH_TOKEN})
+            elif form["grant_type"] == "refresh_token" and form.get("refresh_token") == REFRESH_TOKEN:
+                # Microsoft does not always rotate the refresh token
+                self.reply({"access_token": "ms-access"})
+            else:
+                self.reply({"error": "invalid_grant", "error_description": "Bad code or refresh token"}, 400)
+            return
+        stub.requests[self.path] += 1
+        if self.path == "/xbox":
+            self.reply({"Token": "xbox-token"})
+        elif self.path == "/xsts":
+            self.reply({"Token": "xsts-token", "DisplayClaims": {"xui": [{"uhs": "user-hash"}]}})
+        elif self.path == "/login":
+            self.reply({"access_token": "minecraft-token", "expires_in": 86400})
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        stub = self.server.stub
+        time.sleep(stub.latency)
+        stub.requests[self.path] += 1
+        if self.path == "/profile" and self.headers["Authorization"] == "Bearer minecraft-token":
+            self.reply({"id": "0123456789abcdef0123456789abcdef", "name": "StubPlayer"})
+        else:
+            self.reply({"error": "Unauthorized", "errorMessage": "Bad token"}, 401)
+
+class AuthStub:
+    def __init__(self):
+        self.latency = 0.0
+        self.requests = Counter()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.browser_opens = 0
+        self.synchronous = False
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def auth_class(self) -> type[MicrosoftAuth]:
+        """
+        MicrosoftAuth pointed at the stub, with its own callback port
+        """
+        return type("StubMicrosoftAuth", (MicrosoftAuth,), {
+            "AUTHORIZE_URL": f"{self.url}/authorize",
+            "TOKEN_URL": f"{self.url}/token",
+            "XBOX_AUTH_URL": f"{self.url}/xbox",
+            "XBOX_XSTS_URL": f"{self.url}/xsts",
+            "MC_AUTH_URL": f"{self.url}/login",
+            "MC_PROFILE_URL": f"{self.url}/profile",
+            "PORT": free_port(),
+        })
+
+    def browser(self, uri: str) -> bool:
+        """
+        A signed-in browser: redirects back with the auth code at once, from a thread unless synchronous
+        """
+        self.browser_opens += 1
+        if self.synchronous:
+            self.redirect(uri)
+        else:
+            threading.Thread(target=self.redirect, args=(uri,), daemon=True).start()
+        return True
+
+    def redirect(self, uri: str):
+        """
+        Retries until the callback listens
+        """
+        parameters = {key: values[0] for key, values in parse_qs(urlparse(uri).query).items()}
+        callback = parameters["redirect_uri"] + "?" + urlencode({"code": AUTH_CODE, "state": parameters["state"]})
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                urllib.request.urlopen(callback, timeout=10).read()
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def auth_stub(monkeypatch):
+    stub = AuthStub()
+    monkeypatch.setattr(webbrowser, "open", stub.browser)
+    yield stub
+    stub.close()
@@ -0,0 +1,65 @@
+"""
+AsyncClient against a loopback server that sends frames which do not decompress
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from src.auth.profile import Profile
+from src.client import AsyncClient
+from src.packets.compression import Compression
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+from src.packets.login import LoginSuccess, SetCompression
+from src.packets.play import ClientboundKeepAlive
+
+THRESHOLD = 64
+
+BROKEN = {
+    "not zlib": VarInt.encode(1000) + b"definitely not zlib",
+    "below threshold": VarInt.encode(10) + b"\x78\x9c",
+    "too large": VarInt.encode(Compression.MAX_DATA_LENGTH + 1) + b"\x78\x9c",
+}
+
+class BrokenServer(asyncio.Protocol):
+    """
+    Logs the client in with compression, then sends one broken frame followed by a keep alive
+    """
+    def __init__(self, broken: bytes):
+        self.broken = broken
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if self.transport.is_closing():
+            return
+        compression = Compression(THRESHOLD)
+        self.transport.write(FrameReader.frame(SetCompression(THRESHOLD).serialize())
+                             + FrameReader.frame(compression.compress(LoginSuccess(uuid.uuid4(), "Bot").serialize()))
+                             + FrameReader.frame(self.broken)
+                             + FrameReader.frame(compression.compress(ClientboundKeepAlive(1).serialize())))
+        # Stays open, the client has to hang up by itself
+        self.transport.pause_reading()
+
+async def receive_broken(broken: bytes) -> tuple[str, list]:
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: BrokenServer(broken), "127.0.0.1", 0)
+    client = AsyncClient(Profile.offline("Bot"))
+    keep_alives = []
+    client.on(ClientboundKeepAlive, keep_alives.append, lazy=False)
+    await client.connect("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+    reason = await asyncio.wait_for(client.closed, 5)
+    server.close()
+    return reason, keep_alives
+
+@pytest.mark.parametrize("name", BROKEN)
+def test_broken_frame_disconnects(name):
+    reason, keep_alives = asyncio.run(receive_broken(BROKEN[name]))
+    assert reason.startswith("Could not inflate packet: ")
+    # Nothing after the broken frame is dispatched
+    assert keep_alives == []
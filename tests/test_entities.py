@@ -0,0 +1,69 @@
+"""
+EntityTracker radius and nearest queries against scanning every entity
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import math
+import time
+
+import numpy as np
+
+from src.world import EntityTracker
+
+TYPES = (EntityTracker.PLAYER, 5, 12)
+
+def crowd(count=3000, span=512, seed=0) -> tuple[EntityTracker, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    positions = np.column_stack([rng.uniform(-span, span, count), rng.uniform(-60, 120, count), rng.uniform(-span, span, count)])
+    types = rng.choice(TYPES, count)
+    tracker = EntityTracker(capacity=256)
+    for entity_id, (position, entity_type) in enumerate(zip(positions.tolist(), types.tolist())):
+        tracker.spawn(entity_id, entity_type, *position)
+    return tracker, positions, types
+
+def brute_force(positions, types, point, entity_type=None, exclude=None, max_distance=math.inf):
+    distances = np.sqrt(((positions - point) ** 2).sum(axis=1))
+    keep = np.ones(len(positions), dtype=bool) if entity_type is None else types == entity_type
+    if exclude is not None:
+        keep[exclude] = False
+    if not keep.any() or distances[keep].min() > max_distance:
+        return None
+    entity_id = int(np.flatnonzero(keep)[np.argmin(distances[keep])])
+    return entity_id, float(distances[entity_id])
+
+def test_nearest_matches_brute_force():
+    tracker, positions, types = crowd()
+    rng = np.random.default_rng(1)
+    for point in rng.uniform(-700, 700, (200, 3)):
+        for entity_type in (None, *TYPES):
+            expected = brute_force(positions, types, point, entity_type)
+            entity_id, distance = tracker.nearest(*point, entity_type=entity_type)
+            assert entity_id == expected[0]
+            assert math.isclose(distance, expected[1])
+        nearest = brute_force(positions, types, point)[0]
+        expected = brute_force(positions, types, point, exclude=nearest, max_distance=40)
+        found = tracker.nearest(*point, max_distance=40, exclude=nearest)
+        assert (found and found[0]) == (expected and expected[0])
+
+def test_within_matches_brute_force():
+    tracker, positions, types = crowd()
+    for point, radius in (((0, 64, 0), 50), ((400, 0, -300), 200), ((0, 0, 0), 5000)):
+        distances = np.sqrt(((positions - point) ** 2).sum(axis=1))
+        assert sorted(tracker.within(*point, radius).tolist()) == np.flatnonzero(distances <= radius).tolist()
+
+def test_far_and_rare_entities_are_found_quickly():
+    tracker, positions, types = crowd()
+    tracker.spawn(10_000, 999, 90_000.0, 64.0, -70_000.0)
+    start = time.perf_counter()
+    for _ in range(20):
+        assert tracker.nearest(0.0, 64.0, 0.0, entity_type=999)[0] == 10_000
+        assert tracker.nearest(0.0, 64.0, 0.0, entity_type=999, max_distance=1000) is None
+    # A ring search out to the far entity visits tens of thousands of cells per query
+    assert time.perf_counter() - start < 1
+
+    lonely = EntityTracker()
+    lonely.spawn(1, 5, 5.0, 64.0, 5.0)
+    lonely.spawn(2, 5, -50_000.0, 64.0, 80_000.0)
+    assert lonely.nearest(0.0, 64.0, 0.0, exclude=1)[0] == 2
+    assert lonely.nearest(0.0, 64.0, 0.0)[0] == 1
@@ -0,0 +1,43 @@
+"""
+LazyNBT against NBT written by pynbt
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import pynbt
+import pytest
+
+from src.packets.datatypes import LazyNBT, NBT
+
+def compound() -> pynbt.TAG_Compound:
+    return pynbt.TAG_Compound({
+        "count": pynbt.TAG_Int(7),
+        "names": pynbt.TAG_List(pynbt.TAG_String, [pynbt.TAG_String("x"), pynbt.TAG_String("y")]),
+        "heights": pynbt.TAG_Long_Array([1, 2, 3]),
+    })
+
+def test_round_trip():
+    encoded = LazyNBT.encode(compound())
+    assert encoded == NBT(compound()).serialize() == LazyNBT.encode(NBT(compound()))
+    nbt, offset = LazyNBT.decode(encoded + b"after")
+    assert offset == len(encoded)
+    assert nbt.value["count"] == 7
+    assert list(nbt.value["heights"]) == [1, 2, 3]
+    assert LazyNBT.encode(nbt) == encoded
+
+def test_end_tag():
+    nbt, offset = LazyNBT.decode(LazyNBT.encode(None))
+    assert (nbt.value, offset) == (None, 1)
+
+def test_other_values_raise():
+    with pytest.raises(TypeError):
+        LazyNBT.encode({"count": 7})
+
+def test_list_indices():
+    names = LazyNBT.decode(LazyNBT.encode(compound()))[0].value["names"]
+    assert (names[0], names[1], names[-1], names[-2]) == ("x", "y", "y", "x")
+    assert names[-5:5] == ["x", "y"]
+    for index in (2, -3, 100):
+        with pytest.raises(IndexError):
+            names[index]
+    assert list(names) == ["x", "y"]
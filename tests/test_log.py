@@ -0,0 +1,61 @@
+"""
+The background log writer
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import threading
+import time
+
+from src import log
+
+def test_records_after_stop_are_appended(tmp_path):
+    logger = log.Logger("SmoothStone.test", write_file=True, directory=tmp_path, level=log.DEBUG)
+    path = tmp_path / "SmoothStone.test.txt"
+
+    logger.info("before %s", "stop")
+    log.flush(5)
+    log._get_writer().stop()
+    assert path.read_text() == "[INFO] SmoothStone.test: before stop\n"
+
+    # Logged at exit, after the atexit stop() closed every file
+    logger.warning("after stop")
+    log.flush(5)
+    log._get_writer().stop()
+    assert path.read_text() == "[INFO] SmoothStone.test: before stop\n[WARNING] SmoothStone.test: after stop\n"
+
+def test_stop_while_logging(tmp_path, capfd):
+    # stop() runs at exit while other threads may still be logging, nothing may be lost or written to a closed file
+    loggers = [log.Logger(f"SmoothStone.busy{i}", write_file=True, directory=tmp_path, level=log.DEBUG) for i in range(4)]
+    writer = log._get_writer()
+    count = 20_000
+
+    def busy():
+        for i in range(count):
+            loggers[i % len(loggers)].info("record %d", i)
+            if i % 100 == 0:
+                time.sleep(0.001)
+
+    thread = threading.Thread(target=busy)
+    thread.start()
+    stops = 0
+    while thread.is_alive():
+        writer.stop()
+        stops += 1
+    log.flush(5)
+    writer.stop()
+
+    lines = sum(len((tmp_path / f"SmoothStone.busy{i}.txt").read_text().splitlines()) for i in range(len(loggers)))
+    assert lines == count
+    assert stops > 1
+    assert "logging failed" not in capfd.readouterr().err
+
+def test_files_are_closed_on_the_writer_thread(tmp_path, monkeypatch):
+    writer = log._get_writer()
+    threads = []
+    close = writer.close
+    monkeypatch.setattr(writer, "close", lambda: (threads.append(threading.current_thread()), close()))
+    log.Logger("SmoothStone.closing", directory=tmp_path).info("open a file")
+    writer.stop()
+    assert threads == [writer.thread]
+    assert not writer.files
@@ -0,0 +1,26 @@
+"""
+Metrics in the Prometheus text exposition format
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import re
+
+from src.client.metrics import Metrics, escape_label
+
+# A sample line: name, optional {label="value",...} with escaped values, then the value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\\n]|\\[\\"n])*",?)*\})? \S+$')
+
+def test_escape_label():
+    assert escape_label('a "b"\\c\nd') == 'a \\"b\\"\\\\c\\nd'
+    assert escape_label(25565) == "25565"
+
+def test_prometheus_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.queue('odd "queue"\n', lambda: 3)
+    text = metrics.prometheus({"server": 'play.example.com "lobby"\\1\nsecond line'})
+    assert text.endswith("\n")
+    for line in text.splitlines():
+        assert line.startswith("# TYPE ") or SAMPLE.match(line), line
+    assert 'server="play.example.com \\"lobby\\"\\\\1\\nsecond line"' in text
+    assert 'queue="odd \\"queue\\"\\n"} 3' in text
@@ -0,0 +1,49 @@
+"""
+Packet classes compiled from their annotations
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+
+from src.packets.datatypes import Bool, Double, String, VarInt
+from src.packets.packet import Packet
+
+class Fields(Packet):
+    ID = 0x42
+    # Names the compiled code used to use for its own locals
+    buffer: VarInt
+    offset: VarInt
+    cls: String[16]
+    x: Double
+    on_ground: Bool
+
+def test_string_annotations_and_field_names():
+    assert [name for name, _ in Fields.FIELDS] == ["buffer", "offset", "cls", "x", "on_ground"]
+    assert Fields.FIELDS[2][1] is String[16]
+    packet = Fields(300, -1, "name", 1.5, True)
+    data = packet.serialize()
+    assert data[0] == 0x42
+    assert Fields.decode(data, 1) == (packet, len(data))
+    assert Fields.deserialize(BytesIO(data[1:])) == packet
+
+def test_bad_annotations_raise():
+    with pytest.raises(TypeError, match="not a datatype"):
+        class NotAType(Packet):
+            a: VarInt
+            b: int
+    with pytest.raises(NameError):
+        class Unresolved(Packet):
+            a: Missing  # noqa: F821
+    with pytest.raises(TypeError, match="reserved"):
+        class Reserved(Packet):
+            _buffer: VarInt
+
+def test_hash_follows_equality():
+    first, second = Fields(1, 2, "a", 0.5, False), Fields(1, 2, "a", 0.5, False)
+    assert first == second and hash(first) == hash(second)
+    assert len({first, second, Fields(1, 2, "b", 0.5, False)}) == 2
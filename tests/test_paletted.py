@@ -0,0 +1,80 @@
+"""
+Round trips of BlockStates and Biomes through single valued, indirect and direct palettes, and chunk sections
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from src.packets.datatypes import VarInt
+from src.packets.datatypes.paletted import BlockStates, Biomes, ChunkSection, Section
+
+def values(cls, distinct: int, seed=0) -> np.ndarray:
+    """
+    A container of exactly distinct values, spread over the ids the direct palette can hold
+    """
+    rng = np.random.default_rng(seed)
+    palette = rng.choice(1 << cls.DIRECT_BITS, distinct, replace=False)
+    indices = np.concatenate([np.arange(distinct), rng.integers(0, distinct, cls.ENTRIES - distinct)])
+    return palette[rng.permutation(indices)].reshape((cls.SIDE,) * 3)
+
+def round_trip(cls, value: np.ndarray) -> bytes:
+    encoded = cls.encode(value)
+    decoded, offset = cls.decode(b"before" + encoded + b"after", 6)
+    assert offset == 6 + len(encoded)
+    assert decoded.shape == (cls.SIDE,) * 3
+    assert np.array_equal(decoded, value)
+    return encoded
+
+@pytest.mark.parametrize("cls", [BlockStates, Biomes])
+def test_single_value(cls):
+    value = np.full((cls.SIDE,) * 3, 9)
+    assert round_trip(cls, value) == b"\x00\x09\x00"
+    # Ids past 16 bits widen the array
+    decoded, offset = cls.decode(b"\x00\x80\x80\x04\x00")
+    assert (decoded.dtype, int(decoded[0, 0, 0]), offset) == (np.uint32, 1 << 16, 5)
+
+@pytest.mark.parametrize("cls", [BlockStates, Biomes])
+def test_indirect_bits(cls):
+    for bits in range(1, cls.MAX_INDIRECT + 1):
+        value = values(cls, (1 << (bits - 1)) + 1, seed=bits)
+        encoded = round_trip(cls, value)
+        assert encoded[0] == max(bits, cls.MIN_INDIRECT)
+        per_long = 64 // encoded[0]
+        longs = -(-cls.ENTRIES // per_long)
+        palette_end = 1 + len(VarInt.encode(len(np.unique(value)))) + len(VarInt.encode_many(np.unique(value).tolist()))
+        longs_start = palette_end + len(VarInt.encode(longs))
+        assert VarInt.decode(encoded, palette_end) == (longs, longs_start)
+        assert len(encoded) == longs_start + 8 * longs
+
+@pytest.mark.parametrize("cls", [BlockStates, Biomes])
+def test_direct(cls):
+    value = values(cls, min(cls.ENTRIES, (1 << cls.MAX_INDIRECT) + 1))
+    assert round_trip(cls, value)[0] == cls.DIRECT_BITS
+    value = values(cls, min(cls.ENTRIES, 1 << cls.DIRECT_BITS), seed=1)
+    assert round_trip(cls, value)[0] == cls.DIRECT_BITS
+
+def test_bits_below_min_indirect_are_clamped():
+    # Servers may announce fewer bits than the minimum, the entries are still packed at MIN_INDIRECT bits
+    value = values(BlockStates, 3)
+    palette, indices = np.unique(value, return_inverse=True)
+    packed = BlockStates.pack(indices.astype(np.uint64), BlockStates.MIN_INDIRECT)
+    for bits in range(1, BlockStates.MIN_INDIRECT):
+        encoded = bytes((bits,)) + VarInt.encode(len(palette)) + VarInt.encode_many(palette.tolist()) + packed
+        decoded, offset = BlockStates.decode(encoded)
+        assert offset == len(encoded)
+        assert np.array_equal(decoded, value)
+
+def test_chunk_section():
+    section = Section(1234, values(BlockStates, 40), values(Biomes, 3))
+    buffer = BytesIO(ChunkSection(section).serialize() * 2 + b"after")
+    first = ChunkSection.deserialize(buffer).value
+    sections, offset = ChunkSection.decode_many(buffer.getvalue(), 2)
+    assert offset == buffer.tell() * 2
+    for decoded in (first, *sections):
+        assert decoded.block_count == 1234
+        assert np.array_equal(decoded.blocks, section.blocks)
+        assert np.array_equal(decoded.biomes, section.biomes)
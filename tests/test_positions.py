@@ -0,0 +1,89 @@
+"""
+Round trips of Position, SectionPosition and SectionBlocks over their full coordinate range, scalar and batch
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import itertools
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from src.packets.datatypes import Position, SectionPosition, SectionBlocks
+
+def limits(bits: int) -> list[int]:
+    """
+    The edges of a signed bits-bit axis and the values around zero
+    """
+    low, high = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+    return [low, low + 1, -1, 0, 1, high - 1, high]
+
+def corners(x_bits: int, y_bits: int, z_bits: int) -> list[tuple[int, int, int]]:
+    return list(itertools.product(limits(x_bits), limits(y_bits), limits(z_bits)))
+
+def random_positions(x_bits: int, y_bits: int, z_bits: int, count=20_000, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.stack([rng.integers(-(1 << (bits - 1)), 1 << (bits - 1), count) for bits in (x_bits, y_bits, z_bits)], axis=1)
+
+CASES = [(Position, (26, 12, 26)), (SectionPosition, (22, 20, 22))]
+
+@pytest.mark.parametrize("cls, bits", CASES, ids=["Position", "SectionPosition"])
+def test_scalar_round_trip_at_limits(cls, bits):
+    for position in corners(*bits):
+        assert cls.unpack(cls.pack(*position)) == position
+        assert cls.decode(cls.encode(position)) == (position, 8)
+        assert cls.deserialize(BytesIO(cls(*position).serialize())).value == position
+
+@pytest.mark.parametrize("cls, bits", CASES, ids=["Position", "SectionPosition"])
+def test_batch_round_trip_at_limits(cls, bits):
+    positions = np.array(corners(*bits))
+    packed = cls.pack_many(positions)
+    assert packed.tolist() == [cls.pack(*position) for position in corners(*bits)]
+    assert np.array_equal(cls.unpack_many(packed), positions)
+    decoded, offset = cls.decode_many(cls.encode_many(positions), len(positions))
+    assert offset == 8 * len(positions)
+    assert np.array_equal(decoded, positions)
+
+@pytest.mark.parametrize("cls, bits", CASES, ids=["Position", "SectionPosition"])
+def test_random_scalar_and_batch_agree(cls, bits):
+    positions = random_positions(*bits)
+    encoded = cls.encode_many(positions)
+    assert encoded == b"".join(cls.encode(tuple(position)) for position in positions.tolist())
+    decoded, _ = cls.decode_many(encoded, len(positions))
+    assert np.array_equal(decoded, positions)
+    assert [cls.decode(encoded, 8 * i)[0] for i in range(len(positions))] == [tuple(p) for p in positions.tolist()]
+
+def test_position_axes_do_not_overlap():
+    assert Position.pack(-1, 0, 0) == 0x3FFFFFF << 38
+    assert Position.pack(0, -1, 0) == 0xFFF
+    assert Position.pack(0, 0, -1) == 0x3FFFFFF << 12
+    assert SectionPosition.pack(-1, 0, 0) == 0x3FFFFF << 42
+    assert SectionPosition.pack(0, -1, 0) == 0xFFFFF
+    assert SectionPosition.pack(0, 0, -1) == 0x3FFFFF << 20
+
+def test_section_blocks_packing():
+    rng = np.random.default_rng(1)
+    coordinates = np.array(list(itertools.product(range(16), repeat=3)))
+    states = rng.integers(0, 1 << 20, len(coordinates))
+    entries = SectionBlocks.pack(states, coordinates)
+    x, y, z = coordinates.T
+    assert np.array_equal(entries, states << 12 | x << 8 | z << 4 | y)
+
+    unpacked_states, unpacked = SectionBlocks.unpack(entries)
+    assert np.array_equal(unpacked_states, states)
+    assert np.array_equal(unpacked, coordinates)
+
+    (decoded_states, decoded), offset = SectionBlocks.decode(SectionBlocks.encode((states, coordinates)))
+    assert np.array_equal(decoded_states, states)
+    assert np.array_equal(decoded, coordinates)
+    assert np.array_equal(SectionBlocks.absolute((-2, 3, 5), decoded), coordinates + np.array([-32, 48, 80]))
+
+def test_section_blocks_serialize():
+    states, coordinates = np.array([0, 1, 0xFFFFF]), np.array([[0, 0, 0], [15, 15, 15], [3, 9, 12]])
+    buffer = BytesIO(b"prefix" + SectionBlocks((states, coordinates)).serialize() + b"after")
+    buffer.seek(6)
+    decoded_states, decoded = SectionBlocks.deserialize(buffer).value
+    assert np.array_equal(decoded_states, states)
+    assert np.array_equal(decoded, coordinates)
+    assert buffer.read() == b"after"
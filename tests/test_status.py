@@ -0,0 +1,263 @@
+"""
+StatusPinger against fake status servers and a fake DNS server on loopback, well behaved and misbehaving
+
+benchmarks.status pings thousands of targets against the same servers.
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import asyncio
+import contextlib
+import json
+import struct
+
+import pytest
+
+from src.client.resolver import Resolver, SRV, IN
+from src.client.status import StatusPinger, split_target
+from src.packets.datatypes import VarInt
+from src.packets.frame import FrameReader
+from src.packets.handshaking import Handshake
+from src.packets.state import State
+from src.packets.status import PingRequest, PongResponse, StatusResponse
+
+STATUS = json.dumps({
+    "version": {"name": "1.20.1", "protocol": 763},
+    "players": {"max": 100, "online": 42, "sample": []},
+    "description": {"text": "A ", "extra": [{"text": "fake", "bold": True}, " server"]},
+})
+
+class ModernServer(asyncio.Protocol):
+    def connection_made(self, transport):
+        self.transport = transport
+        self.reader = FrameReader()
+
+    def data_received(self, data):
+        self.reader.feed(data)
+        for frame in self.reader.frames():
+            packet_id, offset = VarInt.decode(frame)
+            if packet_id == Handshake.ID and len(frame) > 3:
+                if Handshake.decode(frame, offset)[0].next_state != State.STATUS:
+                    self.transport.close()
+            elif packet_id == PingRequest.ID:
+                payload = PingRequest.decode(frame, offset)[0].payload
+                self.transport.write(FrameReader.frame(PongResponse(payload).serialize()))
+                self.transport.close()
+            else:
+                self.transport.write(FrameReader.frame(StatusResponse(STATUS).serialize()))
+
+class LegacyServer(asyncio.Protocol):
+    """
+    A 1.6 server, which hangs up on anything but the legacy ping
+    """
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if data[0] == 0xFE:
+            message = "§1\x0078\x001.6.4\x00An old server\x003\x0020".encode("utf-16-be")
+            self.transport.write(b"\xff" + struct.pack(">H", len(message) // 2) + message)
+        self.transport.close()
+
+class MalformedLegacyServer(asyncio.Protocol):
+    """
+    Answers the legacy ping with a kick whose protocol and player counts are not numbers
+    """
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if data[0] == 0xFE:
+            message = "§1\x00abc\x001.6.4\x00A broken server\x00many\x00lots".encode("utf-16-be")
+            self.transport.write(b"\xff" + struct.pack(">H", len(message) // 2) + message)
+        self.transport.close()
+
+class SlowServer(asyncio.Protocol):
+    def connection_made(self, transport):
+        pass
+
+class GarbageServer(asyncio.Protocol):
+    """
+    A frame that is not a status response, and not a legacy kick either
+    """
+    def connection_made(self, transport):
+        transport.write(FrameReader.frame(b"\x42not a status response"))
+        transport.close()
+
+class HugeFrameServer(asyncio.Protocol):
+    def connection_made(self, transport):
+        transport.write(VarInt(1 << 28).serialize())
+
+class ClosingServer(asyncio.Protocol):
+    def connection_made(self, transport):
+        transport.close()
+
+class FakeDNS(asyncio.DatagramProtocol):
+    """
+    Answers SRV queries for names in records, NXDOMAIN for the rest, and a cut off answer for truncated names
+    """
+    def __init__(self, records: dict[str, tuple[str, int]]):
+        self.records = records
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.queries += 1
+        query_id = struct.unpack_from(">H", data)[0]
+        name, end = Resolver.name(data, 12)
+        question = data[12:end + 4]
+        if name.startswith("_minecraft._tcp.truncated"):
+            self.transport.sendto(struct.pack(">HHHHHH", query_id, 0x8180, 1, 1, 0, 0) + question + b"\xc0\x0c\x00", address)
+            return
+        if name not in self.records:
+            self.transport.sendto(struct.pack(">HHHHHH", query_id, 0x8183, 1, 0, 0, 0) + question, address)
+            return
+        target, port = self.records[name]
+        target = b"".join(bytes((len(label),)) + label.encode() for label in target.split(".")) + b"\x00"
+        answer = b"\xc0\x0c" + struct.pack(">HHIH", SRV, IN, 300, 6 + len(target)) + struct.pack(">HHH", 0, 5, port) + target
+        self.transport.sendto(struct.pack(">HHHHHH", query_id, 0x8180, 1, 1, 0, 0) + question + answer, address)
+
+async def start_servers() -> tuple[dict[str, int], list]:
+    loop = asyncio.get_running_loop()
+    ports, servers = {}, []
+    for name, protocol in (("modern", ModernServer), ("legacy", LegacyServer), ("malformed", MalformedLegacyServer),
+                           ("slow", SlowServer), ("garbage", GarbageServer), ("huge", HugeFrameServer),
+                           ("closing", ClosingServer)):
+        server = await loop.create_server(protocol, "127.0.0.1", 0, backlog=4096)
+        ports[name] = server.sockets[0].getsockname()[1]
+        servers.append(server)
+    # Bound and closed again, so nothing listens there
+    server = await loop.create_server(asyncio.Protocol, "127.0.0.1", 0)
+    ports["refused"] = server.sockets[0].getsockname()[1]
+    server.close()
+    await server.wait_closed()
+    return ports, servers
+
+UNPARSABLE = ("example.com:", "example.com:port", ":25565", "127.0.0.1:99999", "[::1]x")
+
+def check(result):
+    """
+    Every target must end in a result, the misbehaving ones with the stage they failed at
+    """
+    assert result.ok or (result.error and result.stage), result
+    assert (result.stage == "target") == (result.target in UNPARSABLE), result
+
+TIMEOUT = 0.3
+SRV_NAMES = 4
+
+@contextlib.asynccontextmanager
+async def fake_network():
+    """
+    The fake servers' ports, a StatusPinger whose resolver asks the fake DNS server, and that server
+    """
+    loop = asyncio.get_running_loop()
+    ports, servers = await start_servers()
+    records = {f"_minecraft._tcp.play{i}.server.test": ("localhost", ports["modern"]) for i in range(SRV_NAMES)}
+    transport, dns = await loop.create_datagram_endpoint(lambda: FakeDNS(records), local_addr=("127.0.0.1", 0))
+    resolver = Resolver(timeout=TIMEOUT, server="127.0.0.1", server_port=transport.get_extra_info("sockname")[1])
+    try:
+        yield ports, StatusPinger(64, TIMEOUT, TIMEOUT, TIMEOUT, TIMEOUT, resolver=resolver), dns
+    finally:
+        transport.close()
+        for server in servers:
+            server.close()
+
+async def ping(kind: str):
+    async with fake_network() as (ports, pinger, _):
+        return await pinger.ping_target(f"127.0.0.1:{ports[kind]}")
+
+def test_modern():
+    result = asyncio.run(ping("modern"))
+    check(result)
+    assert result.ok and not result.legacy
+    assert (result.version, result.protocol, result.players_online, result.players_max) == ("1.20.1", 763, 42, 100)
+    assert result.motd == "A fake server"
+    assert result.latency > 0
+
+def test_legacy():
+    result = asyncio.run(ping("legacy"))
+    check(result)
+    assert result.ok and result.legacy
+    assert (result.version, result.protocol, result.motd, result.players_online, result.players_max) == (
+        "1.6.4", 78, "An old server", 3, 20)
+
+@pytest.mark.parametrize("kind, stage, error", [
+    ("slow", "status", "status timed out"),
+    # Anything but a status response falls back to the legacy ping, which these fail too
+    ("garbage", "legacy", "ProtocolError: Expected a legacy kick"),
+    ("huge", "legacy", "ProtocolError: Expected a legacy kick"),
+    ("closing", "legacy", "IncompleteReadError"),
+    ("malformed", "legacy", "ProtocolError: Legacy status has a field that is not a number"),
+    ("refused", "connect", "ConnectionRefusedError"),
+])
+def test_failure_stages(kind, stage, error):
+    result = asyncio.run(ping(kind))
+    check(result)
+    assert not result.ok
+    assert result.stage == stage
+    assert result.error.startswith(error), result.error
+    assert result.elapsed < 5 * TIMEOUT
+
+def test_no_legacy_fallback():
+    async def run():
+        async with fake_network() as (ports, pinger, _):
+            pinger.legacy = False
+            return await pinger.ping_target(f"127.0.0.1:{ports['garbage']}")
+    result = asyncio.run(run())
+    assert (result.stage, result.error) == ("status", "ProtocolError: Expected a status response, got packet 0x42")
+
+@pytest.mark.parametrize("target", UNPARSABLE)
+def test_unparsable_targets(target):
+    with pytest.raises(ValueError):
+        split_target(target)
+    result = asyncio.run(StatusPinger(resolver=Resolver(srv=False)).ping_target(target))
+    check(result)
+    assert result.stage == "target" and result.error.startswith("ValueError: ")
+
+def test_split_target():
+    assert split_target("example.com") == ("example.com", None)
+    assert split_target("example.com:25566") == ("example.com", 25566)
+    assert split_target("[::1]") == ("::1", None)
+    assert split_target("[::1]:25566") == ("::1", 25566)
+
+def test_srv_lookup_and_cache():
+    async def run():
+        async with fake_network() as (ports, pinger, dns):
+            first = await pinger.ping_target("play0.server.test")
+            second = await pinger.ping_target("play0.server.test")
+            return ports, first, second, dns.queries, pinger.resolver.stats()
+    ports, first, second, queries, stats = asyncio.run(run())
+    for result in (first, second):
+        check(result)
+        assert result.ok
+        assert (result.host, result.port) == ("127.0.0.1", ports["modern"])
+    # One SRV query and one address lookup, both cached for the second ping
+    assert queries == 1
+    assert (stats["misses"], stats["hits"]) == (2, 2)
+
+def test_truncated_dns_answer():
+    async def run():
+        async with fake_network() as (_, pinger, dns):
+            results = [await pinger.ping_target("truncated.server.test") for _ in range(2)]
+            return results, dns.queries
+    results, queries = asyncio.run(run())
+    for result in results:
+        check(result)
+        assert result.stage == "resolve" and result.error.startswith("ResolveError: ")
+    # The failure is cached too
+    assert queries == 1
+
+def test_scan():
+    async def run():
+        async with fake_network() as (ports, pinger, _):
+            kinds = ["modern", "legacy", "malformed", "slow", "garbage", "huge", "closing", "refused"]
+            targets = [f"127.0.0.1:{ports[kind]}" for kind in kinds] * 10 + [f"play{i}.server.test" for i in range(SRV_NAMES)]
+            targets += list(UNPARSABLE)
+            return targets, [result async for result in pinger.scan(targets)]
+    targets, results = asyncio.run(run())
+    assert sorted(result.target for result in results) == sorted(targets)
+    for result in results:
+        check(result)
+    assert sum(result.ok for result in results) == 20 + SRV_NAMES
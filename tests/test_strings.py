@@ -0,0 +1,38 @@
+"""
+String length limits, also for constants encoded once and cached
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+import pytest
+
+from src.packets.datatypes import String, Identifier
+
+def test_constant_respects_each_max_length():
+    value = "a" * 40
+    assert String.constant(value) == String.encode(value)
+    with pytest.raises(ValueError):
+        String[16].constant(value)
+    assert String[40].constant(value) is String[40].constant(value)
+
+    short = "minecraft:brand"
+    assert String[16].constant(short) == Identifier.constant(short) == String.encode(short)
+    with pytest.raises(ValueError):
+        String[8].constant(short)
+
+def test_utf16_length():
+    # One code point outside the BMP is two UTF-16 code units
+    assert String[2].decode(String[2].encode("\U0001F600"))[0] == "\U0001F600"
+    with pytest.raises(ValueError):
+        String[1].encode("\U0001F600")
+
+def test_identifier_max_length():
+    value = "minecraft:stone"
+    assert Identifier.encode(value) == String.encode(value)
+    assert Identifier[15].encode(value) == String.encode(value)
+    with pytest.raises(ValueError):
+        Identifier[8].encode(value)
+    with pytest.raises(ValueError):
+        Identifier[8].constant(value)
+    with pytest.raises(ValueError):
+        Identifier.encode("minecraft:" + "a" * Identifier.MAX_LENGTH)
@@ -0,0 +1,62 @@
+"""
+MicrosoftAuth.start() against the stub endpoints: cached token, refresh grant and the browser fallback
+"""
+
+import time
+
+from src.auth.token_cache import CachedToken, TokenCache
+
+from conftest import REFRESH_TOKEN
+
+UUID = "0123456789abcdef0123456789abcdef"
+
+def start(auth_stub, cache: TokenCache):
+    auth = auth_stub.auth_class()(write_file=False, open_ms_auth=True, account="player", cache=cache)
+    auth.start()
+    return auth
+
+def test_valid_cached_token_needs_no_requests(auth_stub, tmp_path):
+    cache = TokenCache(tmp_path)
+    cache.save("player", CachedToken(REFRESH_TOKEN, "cached-token", time.time() + 3600, UUID, "Cached"))
+
+    auth = start(auth_stub, cache)
+    assert (auth.profile.UUID, auth.profile.username, auth.profile.access_token) == (UUID, "Cached", "cached-token")
+    assert not auth_stub.requests
+    assert auth_stub.browser_opens == 0
+
+def test_expired_token_is_refreshed_without_the_browser(auth_stub, tmp_path):
+    cache = TokenCache(tmp_path)
+    cache.save("player", CachedToken(REFRESH_TOKEN, "old-token", time.time() - 10, UUID, "Cached"))
+
+    auth = start(auth_stub, cache)
+    assert auth.profile.access_token == "minecraft-token"
+    assert auth.profile.username == "StubPlayer"
+    assert auth_stub.requests["token:refresh_token"] == 1
+    assert auth_stub.requests["token:authorization_code"] == 0
+    assert auth_stub.browser_opens == 0
+
+    # The endpoint did not rotate the refresh token, the old one must be cached again
+    saved = cache.load("player")
+    assert saved.refresh_token == REFRESH_TOKEN
+    assert saved.access_token == "minecraft-token"
+    assert saved.valid()
+
+def test_rejected_refresh_falls_back_to_the_browser(auth_stub, tmp_path):
+    cache = TokenCache(tmp_path)
+    cache.save("player", CachedToken("revoked", "old-token", time.time() - 10, UUID, "Cached"))
+
+    auth = start(auth_stub, cache)
+    assert auth.profile.access_token == "minecraft-token"
+    assert auth.error is None
+    assert auth_stub.requests["token:refresh_token"] == 1
+    assert auth_stub.requests["token:authorization_code"] == 1
+    assert auth_stub.browser_opens == 1
+    assert cache.load("player").refresh_token == REFRESH_TOKEN
+
+def test_no_cache_entry_uses_the_browser(auth_stub, tmp_path):
+    cache = TokenCache(tmp_path)
+    auth = start(auth_stub, cache)
+    assert auth.profile.username == "StubPlayer"
+    assert auth_stub.requests["token:refresh_token"] == 0
+    assert auth_stub.browser_opens == 1
+    assert cache.load("player").refresh_token == REFRESH_TOKEN
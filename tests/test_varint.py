@@ -0,0 +1,40 @@
+"""
+VarInt and VarLong limits, through decode and deserialize
+
+Run from the repository root with `python -m pytest tests`
+"""
+
+from io import BytesIO
+
+import pytest
+
+from src.packets.datatypes import VarInt, VarLong
+
+CASES = [(VarInt, 32, 5), (VarLong, 64, 10)]
+
+@pytest.mark.parametrize("cls, bits, max_bytes", CASES, ids=["VarInt", "VarLong"])
+def test_limits(cls, bits, max_bytes):
+    for value in (0, 1, 127, 128, 16383, 16384, -1, (1 << (bits - 1)) - 1, -(1 << (bits - 1))):
+        encoded = cls.encode(value)
+        assert len(encoded) <= max_bytes
+        assert cls.decode(b"x" + encoded + b"after", 1) == (value, 1 + len(encoded))
+        stream = BytesIO(encoded + b"after")
+        assert cls.deserialize(stream).value == value
+        assert stream.read() == b"after"
+    assert len(cls.encode(-1)) == max_bytes
+
+@pytest.mark.parametrize("cls, bits, max_bytes", CASES, ids=["VarInt", "VarLong"])
+def test_too_long(cls, bits, max_bytes):
+    # One continuation byte too many, the longest encoding of -1 followed by a terminating byte
+    encoded = b"\xff" * max_bytes + b"\x01"
+    with pytest.raises(RuntimeError, match="too big"):
+        cls.decode(encoded)
+    with pytest.raises(RuntimeError, match="too big"):
+        cls.deserialize(BytesIO(encoded))
+
+@pytest.mark.parametrize("cls", [VarInt, VarLong])
+def test_truncated(cls):
+    with pytest.raises(IndexError):
+        cls.decode(b"\xff\xff")
+    with pytest.raises(IndexError):
+        cls.deserialize(BytesIO(b"\xff\xff"))